@@ -1,36 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
+from starlette.background import BackgroundTask
 
-from app.schemas.assistant import AssistantQueryInput, AssistantResponseOutput
+from app.schemas.assistant import AssistantQueryInput, AssistantResponseOutput, AssistantThreadOutput
+from app.models.assistant_thread import AssistantThread
 from app.models.user import User
 # from app.models.session import ReadingSession # To fetch session text # Removed import
 from app.models.rsvp_session import RsvpSession
 from app.core.security import get_current_active_user
-from app.services.gemini_service import get_contextual_assistant_response
+from app.services import assistant_cache, assistant_threads, context_cache
+from app.services.context_index import build_assistant_context
+from app.services.gemini_service import (
+    ASSISTANT_FAILURE_RESPONSES,
+    ContextSource,
+    get_contextual_assistant_response,
+    stream_contextual_assistant_response,
+)
+from app.utils.sse import format_sse, SSE_HEADERS
 
 router = APIRouter(prefix="/api/assistant", tags=["AI Assistant"])
 
-@router.post("", response_model=AssistantResponseOutput)
-async def query_assistant(
-    input_data: AssistantQueryInput,
-    current_user: User = Depends(get_current_active_user)
-):
-    rsvp_session = await RsvpSession.get(input_data.rsvp_session_id)
+async def get_owned_session_with_text(rsvp_session_id: str, current_user: User) -> RsvpSession:
+    rsvp_session = await RsvpSession.get(rsvp_session_id)
     if not rsvp_session or rsvp_session.deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="RsvpSession not found")
     if rsvp_session.user_id != str(current_user.id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User does not have access to this RSVP session's content")
     if not rsvp_session.text or not rsvp_session.text.strip(): # Ensure text exists and is not empty
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="RsvpSession has no text content for context.")
+    return rsvp_session
+
+async def open_thread_or_404(input_data: AssistantQueryInput, current_user: User, rsvp_session: RsvpSession) -> Optional[AssistantThread]:
+    """The thread the query belongs to; None for a one-off query that neither names nor starts a thread."""
+    if input_data.thread_id is None and not input_data.new_thread:
+        return None
+    thread = await assistant_threads.open_thread(input_data.thread_id, current_user, rsvp_session)
+    if thread is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assistant thread not found")
+    return thread
 
-    context_to_use = rsvp_session.text
+def thread_output(thread: AssistantThread) -> AssistantThreadOutput:
+    return AssistantThreadOutput(id=str(thread.id), **thread.model_dump(exclude={"id", "user_id", "revision_id"}))
+
+async def assistant_context(rsvp_session: RsvpSession, query: str) -> Tuple[ContextSource, Optional[str]]:
+    """Inline context and cachedContent name for a query; the name is None when the context goes inline."""
+    cached_content = await context_cache.get_cached_context(rsvp_session.text)
+    if cached_content is not None:
+        # Chunks are only selected if Gemini has dropped the handle and the context must go inline
+        return lambda: build_assistant_context(rsvp_session, query), cached_content
+    return await build_assistant_context(rsvp_session, query), None
+
+async def record_turn(thread: Optional[AssistantThread], query: str, response: str) -> bool:
+    """Append the exchange to the thread, if any; True when older turns should now be rolled into the summary."""
+    if thread is None:
+        return False
+    thread = await assistant_threads.append_turn(thread, query, response)
+    return assistant_threads.needs_summary(thread)
+
+def thread_id_of(thread: Optional[AssistantThread]) -> Optional[str]:
+    return str(thread.id) if thread else None
+
+@router.post("", response_model=AssistantResponseOutput)
+async def query_assistant(
+    input_data: AssistantQueryInput,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user)
+):
+    rsvp_session = await get_owned_session_with_text(input_data.rsvp_session_id, current_user)
+    thread = await open_thread_or_404(input_data, current_user, rsvp_session)
+    history = assistant_threads.history_for_prompt(thread) if thread else None
+    # Cached answers ignore the conversation, so they are only used for a thread's first question
+    cached_response = assistant_cache.get_cached_answer(rsvp_session.text, input_data.query) if history is None else None
+    if cached_response is not None:
+        await record_turn(thread, input_data.query, cached_response)
+        return AssistantResponseOutput(response=cached_response, thread_id=thread_id_of(thread))
+    context_to_use, cached_content = await assistant_context(rsvp_session, input_data.query)
 
     try:
-        ai_response = await get_contextual_assistant_response(input_data.query, context_to_use)
-        return AssistantResponseOutput(response=ai_response)
+        ai_response = await get_contextual_assistant_response(
+            input_data.query, context_to_use, cached_content=cached_content, history=history
+        )
+        if ai_response not in ASSISTANT_FAILURE_RESPONSES:
+            if history is None:
+                assistant_cache.store_answer(rsvp_session.text, input_data.query, ai_response)
+            if await record_turn(thread, input_data.query, ai_response):
+                background_tasks.add_task(assistant_threads.summarize_thread, thread.id)
+        return AssistantResponseOutput(response=ai_response, thread_id=thread_id_of(thread))
     except Exception as e: # Catch any unexpected errors from the service
         logger.error(f"Error querying assistant for user {current_user.email}: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while processing your request with the AI assistant."
         )
+
+@router.post("/stream")
+async def stream_assistant(
+    input_data: AssistantQueryInput,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Server-Sent Events: `delta` events with partial answer text, then `done` with the full response."""
+    rsvp_session = await get_owned_session_with_text(input_data.rsvp_session_id, current_user)
+    thread = await open_thread_or_404(input_data, current_user, rsvp_session)
+    history = assistant_threads.history_for_prompt(thread) if thread else None
+    cached_response = assistant_cache.get_cached_answer(rsvp_session.text, input_data.query) if history is None else None
+    context_to_use = cached_content = None
+    if cached_response is None:
+        context_to_use, cached_content = await assistant_context(rsvp_session, input_data.query)
+    summarize = False
+
+    async def event_stream():
+        nonlocal summarize
+        if cached_response is not None:
+            await record_turn(thread, input_data.query, cached_response)
+            yield format_sse({"text": cached_response}, event="delta")
+            yield format_sse(
+                AssistantResponseOutput(response=cached_response, thread_id=thread_id_of(thread)).model_dump(), event="done"
+            )
+            return
+        fragments = []
+        try:
+            async for kind, text in stream_contextual_assistant_response(
+                input_data.query, context_to_use, cached_content=cached_content, history=history
+            ):
+                if kind == "error":
+                    yield format_sse({"detail": text}, event="error")
+                    return
+                fragments.append(text)
+                yield format_sse({"text": text}, event="delta")
+        except Exception as e: # Catch any unexpected errors from the service
+            logger.error(f"Error streaming assistant for user {current_user.email}: {e}", exc_info=True)
+            yield format_sse(
+                {"detail": "An error occurred while processing your request with the AI assistant."},
+                event="error",
+            )
+            return
+        response = "".join(fragments).strip()
+        if history is None:
+            assistant_cache.store_answer(rsvp_session.text, input_data.query, response)
+        summarize = await record_turn(thread, input_data.query, response)
+        yield format_sse(AssistantResponseOutput(response=response, thread_id=thread_id_of(thread)).model_dump(), event="done")
+
+    async def summarize_after_stream():
+        # Runs once the response is closed, like the non-streaming endpoint's background task
+        if summarize:
+            await assistant_threads.summarize_thread(thread.id)
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=SSE_HEADERS, background=BackgroundTask(summarize_after_stream)
+    )
+
+@router.get("/threads", response_model=List[AssistantThreadOutput])
+async def list_assistant_threads(
+    rsvp_session_id: str = Query(...),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user)
+):
+    """The user's conversations about a session, most recently active first."""
+    threads = await assistant_threads.list_threads(current_user, rsvp_session_id, limit)
+    return [thread_output(thread) for thread in threads]
+
+@router.get("/threads/{thread_id}", response_model=AssistantThreadOutput)
+async def get_assistant_thread(thread_id: str, current_user: User = Depends(get_current_active_user)):
+    thread = await assistant_threads.get_thread(thread_id, current_user)
+    if thread is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assistant thread not found")
+    return thread_output(thread)
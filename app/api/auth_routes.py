@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Depends, Response, status
 from fastapi.security import OAuth2PasswordRequestForm # For a more standard login form if preferred
 from starlette.responses import JSONResponse
 
 from app.schemas.user import UserCreate, UserOut
 from app.schemas.auth import Token, UserLogin
 from app.models.user import User
-from app.core.security import get_password_hash, verify_password, create_access_token, get_current_active_user
+from app.core.security import (
+    get_password_hash_async, verify_password_async, create_access_token, decode_access_token,
+    get_current_active_user, oauth2_scheme,
+)
+from app.core.revocation import revoke_token
+from app.core.token_cache import forget_token, token_digest
 # from app.services.user_service import UserService # We'll create this simple service
 from beanie.exceptions import RevisionIdWasChanged
 
@@ -26,7 +33,7 @@ class UserService:
                 detail="Email already registered",
             )
 
-        hashed_password = get_password_hash(user_create.password)
+        hashed_password = await get_password_hash_async(user_create.password)
         user = User(
             email=user_create.email,
             hashed_password=hashed_password,
@@ -62,7 +69,7 @@ async def register_user(user_in: UserCreate):
 @router.post("/login", response_model=Token)
 async def login_for_access_token(form_data: UserLogin):
     user = await UserService.get_user_by_email(form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -74,7 +81,7 @@ async def login_for_access_token(form_data: UserLogin):
             detail="Inactive user"
         )
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -107,6 +114,21 @@ async def preflight_login():
 #     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(oauth2_scheme), current_user: User = Depends(get_current_active_user)):
+    """Revoke the presented token on every worker until it expires."""
+    token_data = decode_access_token(token)
+    if token_data.jti is None or token_data.expires_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This token predates logout support and cannot be revoked; it expires on its own.",
+        )
+    expires_at = datetime.fromtimestamp(token_data.expires_at, timezone.utc).replace(tzinfo=None)
+    await revoke_token(token_data.jti, expires_at, user_id=str(current_user.id))
+    forget_token(token_digest(token))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.get("/me", response_model=UserOut)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     # The User object from get_current_active_user might not be directly convertible
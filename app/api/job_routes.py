@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, status
+
+from app.core.config import settings
+from app.core.security import get_current_active_user
+from app.models.user import User
+from app.schemas.job import JobStatusOutput
+from app.services import job_queue
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+@router.get("/{job_id}", response_model=JobStatusOutput)
+async def get_job_status(
+    job_id: str = Path(..., description="ID del trabajo en segundo plano"),
+    wait: float = Query(0, ge=0, description="Seconds to hold the request open until the job finishes (long polling)"),
+    current_user: User = Depends(get_current_active_user),
+):
+    job = await job_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if job.user_id != str(current_user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User does not own this job")
+
+    if wait and job.status not in job_queue.TERMINAL_STATUSES:
+        job = await job_queue.wait_for_job(job_id, min(wait, settings.JOB_STATUS_MAX_WAIT_SECONDS))
+
+    return JobStatusOutput(
+        job_id=str(job.id),
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
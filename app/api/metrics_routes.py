@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+
+from app.models.user import User
+from app.core.security import get_current_admin_user
+from app.core.revocation import get_revocation_stats
+from app.core.token_cache import get_token_cache_stats
+from app.core.user_cache import get_user_cache_stats
+from app.core.password_pool import get_password_pool_stats
+from app.services import assistant_cache, context_cache, context_index, llm_cache, topic_pool, job_queue
+from app.services.gemini_client import get_in_flight_stats
+from app.services.gemini_limiter import limiter as gemini_limiter
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+@router.get("")
+async def get_service_metrics(current_user: User = Depends(get_current_admin_user)):
+    """Per-worker counters for caches and background machinery; operators only."""
+    return {
+        "llm_cache": llm_cache.get_cache_stats(),
+        "gemini_limiter": gemini_limiter.stats(),
+        "gemini_single_flight": get_in_flight_stats(),
+        "topic_pool": await topic_pool.get_pool_stats(),
+        "jobs": await job_queue.get_job_stats(),
+        "assistant_cache": assistant_cache.get_cache_stats(),
+        "assistant_context_index": context_index.get_index_cache_stats(),
+        "gemini_context_cache": context_cache.get_context_cache_stats(),
+        "auth_user_cache": get_user_cache_stats(),
+        "auth_token_cache": get_token_cache_stats(),
+        "token_revocation": get_revocation_stats(),
+        "password_pool": get_password_pool_stats(),
+    }
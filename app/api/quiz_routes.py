@@ -1,18 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from loguru import logger
 
 from app.schemas.quiz import QuizCreateInput, QuizOutput, QuizQuestion, QuizValidateInput, QuizValidateOutput, QuizQuestionFeedback
 from app.models.user import User
 from app.models.rsvp_session import RsvpSession
 from app.core.security import get_current_active_user
-from app.services import quiz_service
-from app.services.gemini_service import assess_text_parameters
+from app.schemas.job import JobAccepted
+from app.services import quiz_service, job_queue
+from app.models.quiz_attempt import QuizAttempt
+from app.utils.sse import format_sse, SSE_HEADERS
 
 router = APIRouter(prefix="/api/quiz", tags=["Quiz"])
 
-@router.post("", response_model=QuizOutput, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    response_model=QuizOutput,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": JobAccepted}},
+)
 async def create_quiz(
     quiz_input: QuizCreateInput,
+    run_async: bool = Query(False, alias="async", description="Queue the generation and answer 202 with a job id"),
     current_user: User = Depends(get_current_active_user)
 ):
     rsvp_session = await RsvpSession.get(quiz_input.rsvp_session_id)
@@ -23,20 +32,22 @@ async def create_quiz(
     if not rsvp_session.text:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="RsvpSession has no text content to create a quiz from.")
 
-    try:
-        # Generate quiz questions and add them to the session
-        updated_rsvp_session = await quiz_service.create_or_update_quiz_for_session(
-            rsvp_session_id=str(rsvp_session.id),
-            text_content=rsvp_session.text,
-            user=current_user
+    if run_async and (quiz_input.regenerate or not rsvp_session.quiz_questions):
+        job_key = quiz_service.quiz_regenerate_job_key if quiz_input.regenerate else quiz_service.quiz_job_key
+        job = await job_queue.enqueue_job(
+            "quiz",
+            {"rsvp_session_id": str(rsvp_session.id), "regenerate": quiz_input.regenerate},
+            user_id=str(current_user.id),
+            dedupe_key=job_key(str(rsvp_session.id)),
         )
+        accepted = JobAccepted(job_id=str(job.id), status=job.status, status_url=f"/api/jobs/{job.id}")
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=accepted.model_dump())
 
-        # Update AI analysis fields on the RsvpSession
-        ai_params = await assess_text_parameters(updated_rsvp_session.text)
-        updated_rsvp_session.ai_estimated_ideal_reading_time_seconds = ai_params.get("ideal_time_seconds")
-        updated_rsvp_session.ai_text_difficulty = ai_params.get("difficulty", "unknown")
-        updated_rsvp_session.update_word_count()
-        await updated_rsvp_session.save()
+    try:
+        # Stored (usually prebuilt while the user was reading) questions, or generate them now
+        updated_rsvp_session = await quiz_service.get_or_create_quiz_for_session(
+            rsvp_session, user=current_user, regenerate=quiz_input.regenerate
+        )
 
         if updated_rsvp_session.quiz_questions is None:
             logger.error(f"Quiz questions field is None after generation for RsvpSession {updated_rsvp_session.id}")
@@ -94,3 +105,48 @@ async def validate_quiz_answers(
     except Exception as e:
         logger.error(f"Error validating quiz for RsvpSession {validation_input.rsvp_session_id} by user {current_user.email}: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to validate quiz answers.")
+
+
+@router.post("/validate/stream", status_code=status.HTTP_200_OK)
+async def stream_quiz_validation(
+    validation_input: QuizValidateInput,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Server-Sent Events: a `feedback` event per answer as soon as it is graded, then a `result` event."""
+    target_session = await RsvpSession.get(validation_input.rsvp_session_id)
+    if not target_session:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="RsvpSession not found")
+    if target_session.user_id != str(current_user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to validate quiz for this RsvpSession")
+
+    try:
+        session = await quiz_service.load_session_for_validation(validation_input.rsvp_session_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="RsvpSession not found for validation.")
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+    logger.info(f"User {current_user.email} streaming quiz validation for session {validation_input.rsvp_session_id}")
+
+    async def event_stream():
+        try:
+            async for item in quiz_service.iter_quiz_validation(
+                session=session,
+                user_answers=validation_input.answers,
+                user=current_user,
+                reading_time_seconds=validation_input.reading_time_seconds,
+            ):
+                if isinstance(item, QuizAttempt):
+                    result = QuizValidateOutput(
+                        rsvp_session_id=item.rsvp_session_id,
+                        overall_score=item.overall_score,
+                        results=item.results
+                    )
+                    yield format_sse(result.model_dump(), event="result")
+                else:
+                    yield format_sse(item.model_dump(), event="feedback")
+        except Exception as e:
+            logger.error(f"Error streaming quiz validation for RsvpSession {validation_input.rsvp_session_id} by user {current_user.email}: {e}", exc_info=True)
+            yield format_sse({"detail": "Failed to validate quiz answers."}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
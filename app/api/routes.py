@@ -1,8 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
-from app.schemas.prompts import PromptInput
-from app.services.gemini_service import generate_results_from_text, assess_text_parameters # Add assess_text_parameters
+from app.schemas.prompts import PromptInput, PromptOutput
+from app.services.gemini_service import generate_results_from_text, iter_analysis_sections
 from app.core.security import get_current_active_user
 from app.models.user import User
+from app.utils.sse import format_sse, SSE_HEADERS
 
 router = APIRouter()
+
+@router.post("/api/analysis", response_model=PromptOutput, tags=["Analysis"])
+async def analyze_text(input_data: PromptInput, current_user: User = Depends(get_current_active_user)):
+    if not input_data.text.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Text to analyze is empty.")
+    try:
+        return await generate_results_from_text(input_data.text)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error analyzing text for user {current_user.email}: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with AI service.")
+
+
+@router.post("/api/analysis/stream", tags=["Analysis"])
+async def stream_text_analysis(input_data: PromptInput, current_user: User = Depends(get_current_active_user)):
+    """Server-Sent Events: one event per section (summary, explanation, questions, glossary) as soon as it is ready."""
+    if not input_data.text.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Text to analyze is empty.")
+
+    async def event_stream():
+        async for section, content in iter_analysis_sections(input_data.text):
+            if section == "error":
+                yield format_sse(content, event="error")
+            else:
+                yield format_sse({"section": section, "content": content}, event=section)
+        yield format_sse({"status": "complete"}, event="done")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,9 +1,13 @@
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
-from typing import List
-from app.schemas.rsvp import RsvpInput, RsvpOutput
-from app.services.rsvp_service import ask_gemini_for_rsvp
+from typing import Optional
+from app.schemas.rsvp import RsvpInput, RsvpOutput, RsvpSessionPage
+from app.services import assistant_threads
+from app.services.rsvp_service import ask_gemini_for_rsvp, generate_rsvp_session_bundle, stream_rsvp_generation
+from app.services.session_list import list_session_summaries, parse_fields
+from app.utils.sse import format_sse, SSE_HEADERS
 from app.models.rsvp_session import RsvpSession
 from fastapi import Path
 from app.core.security import get_current_active_user
@@ -16,8 +20,10 @@ async def generate_rsvp(input_data: RsvpInput, current_user: User = Depends(get_
     try:
         # Asegurar que el user_id se pase correctamente y no sea None
         user_id = str(current_user.id)
-        logger.info(f"Generating RSVP for user {current_user.email} (ID: {user_id}) with topic: {input_data.topic}")
-        
+        logger.info(f"Generating RSVP ({input_data.mode}) for user {current_user.email} (ID: {user_id}) with topic: {input_data.topic}")
+
+        if input_data.mode == "bundle":
+            return await generate_rsvp_session_bundle(input_data.topic, user_id=user_id)
         return await ask_gemini_for_rsvp(input_data.topic, user_id=user_id)
     except ValueError as ve:
         logger.error(f"Validation error generating RSVP for user {current_user.email}: {ve}")
@@ -31,32 +37,59 @@ async def generate_rsvp(input_data: RsvpInput, current_user: User = Depends(get_
         raise HTTPException(status_code=502, detail=str(e))
 
 
-@router.get("/api/rsvp", response_model=List[RsvpOutput])
+@router.post("/api/rsvp/stream")
+async def stream_rsvp(input_data: RsvpInput, current_user: User = Depends(get_current_active_user)):
+    """Server-Sent Events: `words` events as the text is generated, then a `session` event with the saved id."""
+    user_id = str(current_user.id)
+    logger.info(f"Streaming RSVP for user {current_user.email} (ID: {user_id}) with topic: {input_data.topic}")
+    events = stream_rsvp_generation(input_data.topic, user_id=user_id)
+
+    # Wait for the first event so failures before any output still map to proper status codes
+    try:
+        first_event = await events.__anext__()
+    except ValueError as ve:
+        logger.error(f"Validation error streaming RSVP for user {current_user.email}: {ve}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error streaming RSVP for user {current_user.email}: {e}", exc_info=True)
+        raise HTTPException(status_code=502, detail=str(e))
+
+    async def event_stream():
+        event, data = first_event
+        yield format_sse(data, event=event)
+        try:
+            async for event, data in events:
+                yield format_sse(data, event=event)
+        except Exception as e:
+            logger.error(f"Error while streaming RSVP for user {current_user.email}: {e}", exc_info=True)
+            yield format_sse({"detail": str(e)}, event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/api/rsvp", response_model=RsvpSessionPage, response_model_exclude_unset=True)
 async def list_user_rsvp_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por comas: topic,snippet,word_count,quiz_score,created_at"),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Listar todas las sesiones RSVP del usuario autenticado"""
+    """Listar las sesiones RSVP del usuario autenticado, de la más reciente a la más antigua, por páginas"""
+    try:
+        requested_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     try:
-        user_sessions = await RsvpSession.find(
-            RsvpSession.user_id == str(current_user.id)
-        ).sort(-RsvpSession.created_at).to_list()
-        
-        logger.info(f"Found {len(user_sessions)} sessions for user {current_user.email}")
-        
-        return [
-            RsvpOutput(
-                id=str(session.id),
-                text=session.text,
-                words=session.words,
-            )
-            for session in user_sessions
-        ]
+        items, next_cursor = await list_session_summaries(str(current_user.id), limit, cursor, requested_fields)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
     except Exception as e:
         logger.error(f"Error fetching sessions for user {current_user.email}: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching user sessions"
         )
+    return RsvpSessionPage(items=items, next_cursor=next_cursor)
 
 
 @router.get("/api/rsvp/{session_id}", response_model=RsvpOutput)
@@ -105,5 +138,6 @@ async def delete_rsvp_session(
 
     session.deleted = True
     await session.save()
+    await assistant_threads.delete_session_threads(session_id)
 
     return {"message": "Sesión eliminada correctamente"}
@@ -7,5 +7,119 @@ class Settings:
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "default_secret_key_if_not_set")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Per-worker cache of authenticated users; the TTL bounds how stale another worker's copy can be
+    AUTH_USER_CACHE_ENABLED: bool = os.getenv("AUTH_USER_CACHE_ENABLED", "true").lower() == "true"
+    AUTH_USER_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+    AUTH_USER_CACHE_MAXSIZE: int = int(os.getenv("AUTH_USER_CACHE_MAXSIZE", "10000"))
+    # Per-worker cache of already verified tokens, each kept until its own exp
+    AUTH_TOKEN_CACHE_ENABLED: bool = os.getenv("AUTH_TOKEN_CACHE_ENABLED", "true").lower() == "true"
+    AUTH_TOKEN_CACHE_MAXSIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_MAXSIZE", "10000"))
+    # Revoked token ids: each worker keeps a Bloom filter, synced every REFRESH and rebuilt every RELOAD seconds
+    REVOCATION_BLOOM_CAPACITY: int = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_REFRESH_SECONDS: float = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+    REVOCATION_RELOAD_SECONDS: float = float(os.getenv("REVOCATION_RELOAD_SECONDS", "3600"))
+    # Accounts allowed to read GET /api/metrics (comma-separated emails); empty means nobody
+    METRICS_ADMIN_EMAILS: list = [e.strip().lower() for e in os.getenv("METRICS_ADMIN_EMAILS", "").split(",") if e.strip()]
+    # Create the models' indexes at startup; turn off when `python -m app.db.migrate` runs on deploy instead
+    MONGO_ENSURE_INDEXES: bool = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+    # bcrypt runs on a small thread pool; requests beyond workers + queue get a 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+    # Gemini HTTP client (one pooled client per worker process)
+    GEMINI_API_BASE_URL: str = os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    GEMINI_POOL_MAX_CONNECTIONS: int = int(os.getenv("GEMINI_POOL_MAX_CONNECTIONS", "20"))
+    GEMINI_POOL_MAX_KEEPALIVE: int = int(os.getenv("GEMINI_POOL_MAX_KEEPALIVE", "10"))
+    GEMINI_POOL_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("GEMINI_POOL_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    GEMINI_HTTP2: bool = os.getenv("GEMINI_HTTP2", "true").lower() == "true"
+    GEMINI_PREWARM: bool = os.getenv("GEMINI_PREWARM", "true").lower() == "true"
+    GEMINI_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("GEMINI_CONNECT_TIMEOUT_SECONDS", "10"))
+
+    # Outbound Gemini limiter: token bucket sized to the project quota, AIMD concurrency, retries
+    GEMINI_QUOTA_RPM: float = float(os.getenv("GEMINI_QUOTA_RPM", "1000"))
+    GEMINI_QUOTA_WORKERS: int = int(os.getenv("GEMINI_QUOTA_WORKERS", os.getenv("GUNICORN_WORKERS", "4")))
+    GEMINI_RATE_LIMIT_BURST: float = float(os.getenv("GEMINI_RATE_LIMIT_BURST", "10"))
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+    GEMINI_MIN_CONCURRENCY: int = int(os.getenv("GEMINI_MIN_CONCURRENCY", "1"))
+    GEMINI_CONCURRENCY_DECREASE_FACTOR: float = float(os.getenv("GEMINI_CONCURRENCY_DECREASE_FACTOR", "0.5"))
+    GEMINI_RETRY_MAX_ATTEMPTS: int = int(os.getenv("GEMINI_RETRY_MAX_ATTEMPTS", "4"))
+    GEMINI_RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("GEMINI_RETRY_BASE_DELAY_SECONDS", "0.5"))
+    GEMINI_RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("GEMINI_RETRY_MAX_DELAY_SECONDS", "8"))
+    GEMINI_RETRY_BUDGET_SECONDS: float = float(os.getenv("GEMINI_RETRY_BUDGET_SECONDS", "20"))
+
+    # LLM response cache (in-process LRU backed by the llm_cache Mongo collection)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PERSISTENT: bool = os.getenv("LLM_CACHE_PERSISTENT", "true").lower() == "true"
+    LLM_CACHE_MEMORY_MAXSIZE: int = int(os.getenv("LLM_CACHE_MEMORY_MAXSIZE", "512"))
+    LLM_CACHE_MEMORY_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_MEMORY_TTL_SECONDS", "3600"))
+
+    # Text analysis fan-out (summary, explanation, questions, glossary): prompts in flight per worker, across requests
+    ANALYSIS_MAX_CONCURRENCY: int = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "8"))
+
+    # Text assessment: local readability formulas by default, Gemini only when enabled
+    ASSESSMENT_USE_LLM: bool = os.getenv("ASSESSMENT_USE_LLM", "false").lower() == "true"
+
+    # Open-ended quiz grading
+    QUIZ_BATCH_GRADING: bool = os.getenv("QUIZ_BATCH_GRADING", "true").lower() == "true"
+    QUIZ_EVALUATION_MAX_CONCURRENCY: int = int(os.getenv("QUIZ_EVALUATION_MAX_CONCURRENCY", "5"))
+    # Local lexical pre-grading: scores at or above/below these settle the answer without Gemini
+    QUIZ_LOCAL_GRADING: bool = os.getenv("QUIZ_LOCAL_GRADING", "true").lower() == "true"
+    QUIZ_LOCAL_CORRECT_THRESHOLD: float = float(os.getenv("QUIZ_LOCAL_CORRECT_THRESHOLD", "0.8"))
+    QUIZ_LOCAL_INCORRECT_THRESHOLD: float = float(os.getenv("QUIZ_LOCAL_INCORRECT_THRESHOLD", "0.1"))
+    # Build the quiz and assessment in a background job as soon as a session is created
+    QUIZ_PREBUILD_ENABLED: bool = os.getenv("QUIZ_PREBUILD_ENABLED", "true").lower() == "true"
+    QUIZ_PREBUILD_JOIN_TIMEOUT_SECONDS: float = float(os.getenv("QUIZ_PREBUILD_JOIN_TIMEOUT_SECONDS", "60"))
+    # Question sets kept per text; regenerating beyond this rotates between them without an LLM call
+    QUIZ_VARIANT_POOL_SIZE: int = int(os.getenv("QUIZ_VARIANT_POOL_SIZE", "3"))
+
+    # Assistant context: texts over the token budget are sent as their top BM25 chunks instead of whole
+    ASSISTANT_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("ASSISTANT_CONTEXT_TOKEN_BUDGET", "2000"))
+    ASSISTANT_CONTEXT_TOP_K: int = int(os.getenv("ASSISTANT_CONTEXT_TOP_K", "6"))
+    ASSISTANT_CHUNK_MAX_CHARS: int = int(os.getenv("ASSISTANT_CHUNK_MAX_CHARS", "800"))
+    ASSISTANT_INDEX_CACHE_SIZE: int = int(os.getenv("ASSISTANT_INDEX_CACHE_SIZE", "256"))
+
+    # Assistant answers per (session text, normalized query); near-duplicate queries match by n-gram cosine
+    ASSISTANT_CACHE_ENABLED: bool = os.getenv("ASSISTANT_CACHE_ENABLED", "true").lower() == "true"
+    ASSISTANT_CACHE_MAXSIZE: int = int(os.getenv("ASSISTANT_CACHE_MAXSIZE", "2048"))
+    ASSISTANT_CACHE_TTL_SECONDS: int = int(os.getenv("ASSISTANT_CACHE_TTL_SECONDS", "86400"))
+    ASSISTANT_CACHE_NEAR_DUPLICATES: bool = os.getenv("ASSISTANT_CACHE_NEAR_DUPLICATES", "true").lower() == "true"
+    ASSISTANT_CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("ASSISTANT_CACHE_SIMILARITY_THRESHOLD", "0.9"))
+
+    # Gemini cachedContents for session texts: follow-up assistant queries send only the question
+    GEMINI_CONTEXT_CACHE_ENABLED: bool = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    # 0 = the smallest cache GEMINI_MODEL accepts (see context_cache.MODEL_MIN_CACHE_TOKENS)
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "0"))
+    GEMINI_CONTEXT_CACHE_MAX_TOKENS: int = int(os.getenv("GEMINI_CONTEXT_CACHE_MAX_TOKENS", "32000"))
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS: int = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "600"))
+    GEMINI_CONTEXT_CACHE_MAX_HANDLES: int = int(os.getenv("GEMINI_CONTEXT_CACHE_MAX_HANDLES", "100"))
+
+    # Assistant threads: prompt history (summary + newest turns) stays within this many tokens
+    ASSISTANT_HISTORY_TOKEN_BUDGET: int = int(os.getenv("ASSISTANT_HISTORY_TOKEN_BUDGET", "800"))
+    ASSISTANT_THREAD_RECENT_TURNS: int = int(os.getenv("ASSISTANT_THREAD_RECENT_TURNS", "4"))
+    ASSISTANT_THREAD_MAX_STORED_TURNS: int = int(os.getenv("ASSISTANT_THREAD_MAX_STORED_TURNS", "40"))
+    ASSISTANT_SUMMARY_MAX_WORDS: int = int(os.getenv("ASSISTANT_SUMMARY_MAX_WORDS", "150"))
+    # Threads with no activity for this long are removed by a TTL index
+    ASSISTANT_THREAD_TTL_DAYS: int = int(os.getenv("ASSISTANT_THREAD_TTL_DAYS", "30"))
+
+    # Pre-generated RSVP texts for curriculum / popular topics
+    RSVP_POOL_ENABLED: bool = os.getenv("RSVP_POOL_ENABLED", "true").lower() == "true"
+    RSVP_POOL_TOPICS: list = [t.strip() for t in os.getenv("RSVP_POOL_TOPICS", "").split(",") if t.strip()]
+    RSVP_POOL_POPULAR_TOPICS: int = int(os.getenv("RSVP_POOL_POPULAR_TOPICS", "10"))
+    RSVP_POOL_POPULAR_WINDOW_DAYS: int = int(os.getenv("RSVP_POOL_POPULAR_WINDOW_DAYS", "14"))
+    RSVP_POOL_LOW_WATER: int = int(os.getenv("RSVP_POOL_LOW_WATER", "3"))
+    RSVP_POOL_TARGET: int = int(os.getenv("RSVP_POOL_TARGET", "5"))
+    RSVP_POOL_REFILL_INTERVAL_SECONDS: float = float(os.getenv("RSVP_POOL_REFILL_INTERVAL_SECONDS", "30"))
+
+    # Background jobs (Mongo "jobs" collection, claimed with leases by every worker process)
+    JOB_WORKER_ENABLED: bool = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+    JOB_WORKER_CONCURRENCY: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_DELAY_SECONDS", "5"))
+    JOB_RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("JOB_RETRY_MAX_DELAY_SECONDS", "300"))
+    JOB_STATUS_MAX_WAIT_SECONDS: float = float(os.getenv("JOB_STATUS_MAX_WAIT_SECONDS", "30"))
 
 settings = Settings()
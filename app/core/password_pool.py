@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# bcrypt releases the GIL while hashing, so a few threads keep hashes off the event loop and run in parallel
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_stats = {"submitted": 0, "completed": 0, "rejected": 0, "running": 0, "max_queue_depth": 0}
+_in_flight = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _executor
+
+
+def _run(fn: Callable[..., T], *args) -> T:
+    with _lock:
+        _stats["running"] += 1
+    try:
+        return fn(*args)
+    finally:
+        with _lock:
+            _stats["running"] -= 1
+
+
+async def run_password_task(fn: Callable[..., T], *args) -> T:
+    """Run a bcrypt call on the password pool.
+
+    At most PASSWORD_HASH_WORKERS calls run at once; up to PASSWORD_HASH_MAX_QUEUE more wait for a
+    thread, and beyond that the request is refused with 503 instead of piling up behind a login storm.
+    """
+    global _in_flight
+    if _in_flight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE:
+        _stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts in progress, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    _stats["submitted"] += 1
+    _stats["max_queue_depth"] = max(_stats["max_queue_depth"], _in_flight - settings.PASSWORD_HASH_WORKERS)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), _run, fn, *args)
+    finally:
+        _in_flight -= 1
+        _stats["completed"] += 1
+
+
+def shutdown_password_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def get_password_pool_stats() -> dict:
+    return {
+        **_stats,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "in_flight": _in_flight,
+        "queue_depth": max(0, _in_flight - _stats["running"]),
+    }
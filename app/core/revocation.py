@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.revoked_token import RevokedToken
+from app.utils.bloom import BloomFilter
+
+# Re-read this much before the last sync: revoked_at is stamped before the insert lands, and clocks differ
+SYNC_OVERLAP = timedelta(seconds=30)
+
+_filter = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY)
+_synced_until: Optional[datetime] = None
+_refresher_task: Optional[asyncio.Task] = None
+_stats = {"checks": 0, "bloom_negatives": 0, "db_checks": 0, "false_positives": 0, "revoked": 0, "reloads": 0}
+
+
+async def reload_revocations() -> None:
+    """Rebuild the filter from every unexpired revocation (expired ones have no reason to stay in it)."""
+    global _filter, _synced_until
+    fresh = BloomFilter(settings.REVOCATION_BLOOM_CAPACITY)
+    newest = None
+    async for revoked in RevokedToken.find(RevokedToken.expires_at > datetime.utcnow()):
+        fresh.add(revoked.jti)
+        newest = max(newest, revoked.revoked_at) if newest else revoked.revoked_at
+    _filter, _synced_until = fresh, newest or datetime.utcnow()
+    _stats["reloads"] += 1
+    if fresh.count > settings.REVOCATION_BLOOM_CAPACITY:
+        logger.warning(f"{fresh.count} live revocations exceed REVOCATION_BLOOM_CAPACITY; expect more DB checks")
+
+
+async def refresh_revocations() -> int:
+    """Add revocations made since the last sync (by any worker) to this worker's filter."""
+    global _synced_until
+    if _synced_until is None:
+        await reload_revocations()
+        return _filter.count
+    added = 0
+    queried_at = datetime.utcnow()
+    since = _synced_until - SYNC_OVERLAP
+    # The overlap re-reads recent revocations on every pass; only jtis new to the filter are counted
+    async for revoked in RevokedToken.find(RevokedToken.revoked_at >= since).sort(+RevokedToken.revoked_at):
+        if _filter.add(revoked.jti):
+            added += 1
+    # Everything stamped before the query has been seen (up to the overlap), found or not
+    _synced_until = max(_synced_until, queried_at)
+    return added
+
+
+async def revoke_token(jti: str, expires_at: datetime, user_id: Optional[str] = None) -> None:
+    try:
+        await RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at).insert()
+    except DuplicateKeyError:
+        pass # Already revoked, e.g. a repeated logout
+    _filter.add(jti) # Effective on this worker at once; other workers pick it up on their next refresh
+    _stats["revoked"] += 1
+
+
+async def is_revoked(jti: str) -> bool:
+    """O(1) in-memory answer for tokens that were never revoked; only possible hits reach Mongo."""
+    _stats["checks"] += 1
+    if jti not in _filter:
+        _stats["bloom_negatives"] += 1
+        return False
+    _stats["db_checks"] += 1
+    if await RevokedToken.find_one(RevokedToken.jti == jti):
+        return True
+    _stats["false_positives"] += 1
+    return False
+
+
+async def _refresh_loop() -> None:
+    last_reload = asyncio.get_running_loop().time()
+    while True:
+        await asyncio.sleep(settings.REVOCATION_REFRESH_SECONDS)
+        try:
+            now = asyncio.get_running_loop().time()
+            if now - last_reload >= settings.REVOCATION_RELOAD_SECONDS:
+                await reload_revocations()
+                last_reload = now
+            else:
+                await refresh_revocations()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Revocation refresh failed: {e}")
+
+
+async def start_revocation_refresher() -> None:
+    global _refresher_task
+    try:
+        await reload_revocations()
+    except Exception as e:
+        logger.error(f"Initial revocation load failed; retrying in the background: {e}")
+    if _refresher_task is None:
+        _refresher_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_revocation_refresher() -> None:
+    global _refresher_task
+    if _refresher_task is not None:
+        _refresher_task.cancel()
+        try:
+            await _refresher_task
+        except asyncio.CancelledError:
+            pass
+        _refresher_task = None
+
+
+def get_revocation_stats() -> dict:
+    return {**_stats, "filter_entries": _filter.count, "filter_capacity": _filter.capacity}
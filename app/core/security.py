@@ -1,12 +1,19 @@
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+from bson import ObjectId
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+from pydantic import ValidationError
 from app.core.config import settings
 from app.schemas.auth import TokenData # Make sure this path is correct
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.models.user import User # Assuming User model is in app.models.user
+from app.core.user_cache import cache_user, get_cached_user
+from app.core.password_pool import run_password_task
+from app.core.revocation import is_revoked
+from app.core.token_cache import cache_verified_claims, get_verified_claims, token_digest
 # from app.services.user_service import UserService # If you created a separate user_service.py
 
 # If UserService is not separate, we'll need a way to get user by email here
@@ -21,6 +28,21 @@ async def get_user_by_email_for_auth(email: str) -> User | None:
     # or to avoid circular dependencies if UserService itself uses Depends.
     return await User.find_one(User.email == email)
 
+async def get_user_for_token(token_data: TokenData) -> User | None:
+    """The token's user from the per-worker cache, falling back to Mongo by id (or by email for old tokens)."""
+    if token_data.user_id is None:
+        return await get_user_by_email_for_auth(token_data.email)
+    user = get_cached_user(token_data.user_id)
+    if user is None:
+        if not ObjectId.is_valid(token_data.user_id):
+            return None
+        user = await User.get(token_data.user_id)
+        if user is None:
+            return None
+        cache_user(user)
+    # A token issued for another email no longer identifies this user
+    return user if user.email == token_data.email else None
+
 # Password Hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -30,6 +52,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# Async variants for request handlers: bcrypt takes tens of milliseconds and must not block the event loop
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_task(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await run_password_task(get_password_hash, password)
+
 # JWT Handling
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -38,18 +67,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
 def decode_access_token(token: str) -> Optional[TokenData]:
+    digest = token_digest(token)
+    claims = get_verified_claims(digest)
+    if claims is not None:
+        # Signature and email were validated when the token was first seen; skip both
+        return TokenData.model_construct(**claims)
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         email: Optional[str] = payload.get("sub") # Assuming we store email in "sub"
         if email is None:
             return None # Or raise an exception
-        return TokenData(email=email)
-    except JWTError:
+        token_data = TokenData(
+            email=email, user_id=payload.get("uid"), jti=payload.get("jti"), expires_at=payload.get("exp")
+        )
+    except (JWTError, ValidationError):
         return None # Or raise an appropriate exception
+    cache_verified_claims(digest, token_data.model_dump())
+    return token_data
 
 async def get_current_active_user(token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
@@ -60,12 +99,20 @@ async def get_current_active_user(token: str = Depends(oauth2_scheme)) -> User:
     token_data = decode_access_token(token)
     if token_data is None or token_data.email is None:
         raise credentials_exception
+    if token_data.jti and await is_revoked(token_data.jti):
+        raise credentials_exception
 
     # user = await UserService.get_user_by_email(token_data.email) # If using UserService
-    user = await get_user_by_email_for_auth(token_data.email) # Using direct model access
+    user = await get_user_for_token(token_data)
 
     if user is None:
         raise credentials_exception
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    """Operators listed in METRICS_ADMIN_EMAILS; everyone else gets 403."""
+    if current_user.email.lower() not in settings.METRICS_ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return current_user
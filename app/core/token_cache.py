@@ -0,0 +1,41 @@
+import hashlib
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.utils.lru import TTLLRUCache
+
+# sha256(token) -> TokenData fields of tokens whose signature was already verified on this worker.
+# Each entry expires with the token's own "exp", so a cached token is never accepted for longer.
+_verified = TTLLRUCache(maxsize=settings.AUTH_TOKEN_CACHE_MAXSIZE)
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def get_verified_claims(digest: bytes) -> Optional[dict]:
+    if not settings.AUTH_TOKEN_CACHE_ENABLED:
+        return None
+    return _verified.get(digest)
+
+
+def cache_verified_claims(digest: bytes, claims: dict) -> None:
+    exp = claims.get("expires_at")
+    if not settings.AUTH_TOKEN_CACHE_ENABLED or exp is None:
+        return
+    ttl = exp - time.time()
+    if ttl > 0:
+        _verified.set(digest, claims, ttl_seconds=ttl)
+
+
+def forget_token(digest: bytes) -> None:
+    _verified.pop(digest)
+
+
+def clear_token_cache() -> None:
+    _verified.clear()
+
+
+def get_token_cache_stats() -> dict:
+    return _verified.stats()
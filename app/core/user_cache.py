@@ -0,0 +1,34 @@
+from typing import Optional
+
+from app.core.config import settings
+from app.utils.lru import TTLLRUCache
+
+# Authenticated users by id. Saves on this worker invalidate their entry through the User event hooks;
+# changes made elsewhere (another worker, the shell) are seen after at most AUTH_USER_CACHE_TTL_SECONDS.
+_users = TTLLRUCache(maxsize=settings.AUTH_USER_CACHE_MAXSIZE, ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+def get_cached_user(user_id: str):
+    if not settings.AUTH_USER_CACHE_ENABLED:
+        return None
+    user = _users.get(user_id)
+    # A copy, so a request that modifies its user cannot leak the change into other requests
+    return user.model_copy(deep=True) if user is not None else None
+
+
+def cache_user(user) -> None:
+    if settings.AUTH_USER_CACHE_ENABLED and user.id is not None:
+        _users.set(str(user.id), user.model_copy(deep=True))
+
+
+def invalidate_user(user_id: Optional[str]) -> None:
+    if user_id is not None:
+        _users.pop(str(user_id))
+
+
+def clear_user_cache() -> None:
+    _users.clear()
+
+
+def get_user_cache_stats() -> dict:
+    return _users.stats()
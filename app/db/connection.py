@@ -3,12 +3,22 @@ from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 
+from app.core.config import settings
+
 from app.models.rsvp_session import RsvpSession
 from app.models.user import User
 from app.models.quiz_attempt import QuizAttempt
+from app.models.llm_cache_entry import LlmCacheEntry
+from app.models.pooled_topic_text import PooledTopicText
+from app.models.job import Job
+from app.models.quiz_variant import QuizVariant
+from app.models.assistant_thread import AssistantThread
+from app.models.revoked_token import RevokedToken
 
 load_dotenv()
 
+DOCUMENT_MODELS = [RsvpSession, User, QuizAttempt, LlmCacheEntry, PooledTopicText, Job, QuizVariant, AssistantThread, RevokedToken]
+
 async def connect_to_mongo() -> AsyncIOMotorClient:
     """Create MongoDB client and initialize Beanie."""
     mongo_url = os.getenv("MONGO_URL")
@@ -17,5 +27,6 @@ async def connect_to_mongo() -> AsyncIOMotorClient:
 
     client = AsyncIOMotorClient(mongo_url)
     db = client.get_default_database()  # ✅ forma segura y robusta
-    await init_beanie(database=db, document_models=[RsvpSession, User, QuizAttempt])
+    # Creating an index that already exists is a no-op, so this is safe on every start
+    await init_beanie(database=db, document_models=DOCUMENT_MODELS, skip_indexes=not settings.MONGO_ENSURE_INDEXES)
     return client
@@ -0,0 +1,46 @@
+"""Create (and optionally prune) the indexes declared on the Beanie models.
+
+    python -m app.db.migrate               # create missing indexes
+    python -m app.db.migrate --drop-unused # also drop indexes no model declares any more
+
+Safe to run repeatedly: indexes that already exist are left alone. Run it on deploy and set
+MONGO_ENSURE_INDEXES=false to keep index builds out of application startup.
+"""
+import argparse
+import asyncio
+import os
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from app.db.connection import DOCUMENT_MODELS
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase, drop_unused: bool = False) -> dict:
+    """Bring every model's indexes in line with its declaration; returns index names per collection."""
+    await init_beanie(database=database, document_models=DOCUMENT_MODELS, allow_index_dropping=drop_unused)
+    indexes = {}
+    for model in DOCUMENT_MODELS:
+        collection = model.get_motor_collection()
+        indexes[collection.name] = sorted((await collection.index_information()).keys())
+    return indexes
+
+
+async def main(drop_unused: bool) -> None:
+    mongo_url = os.getenv("MONGO_URL")
+    if not mongo_url:
+        raise SystemExit("MONGO_URL environment variable is not set")
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        indexes = await ensure_indexes(client.get_default_database(), drop_unused=drop_unused)
+    finally:
+        client.close()
+    for collection, names in indexes.items():
+        print(f"{collection}: {', '.join(names)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drop-unused", action="store_true", help="drop indexes that no model declares")
+    args = parser.parse_args()
+    asyncio.run(main(args.drop_unused))
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,7 +8,13 @@ from dotenv import load_dotenv
 import os
 
 from app.db.connection import connect_to_mongo
-from app.api import rsvp_routes, auth_routes, quiz_routes, stats_routes, assistant_routes
+from app.services.gemini_client import open_gemini_client, close_gemini_client
+from app.services.topic_pool import start_pool_refiller, stop_pool_refiller
+from app.services.job_queue import start_job_worker, stop_job_worker
+from app.services.context_cache import close_context_cache
+from app.core.password_pool import shutdown_password_pool
+from app.core.revocation import start_revocation_refresher, stop_revocation_refresher
+from app.api import rsvp_routes, auth_routes, quiz_routes, stats_routes, assistant_routes, metrics_routes, job_routes
 from app.api.routes import router
 
 # Cargar variables del archivo .env
@@ -32,8 +39,24 @@ if not gemini_key:
 
 print("✅ MONGO_URL y GEMINI_API_KEY cargados correctamente")
 
+# Inicializar MongoDB con Beanie y el cliente HTTP compartido de Gemini
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_to_mongo()
+    await start_revocation_refresher()
+    await open_gemini_client()
+    start_pool_refiller()
+    start_job_worker()
+    yield
+    await stop_job_worker()
+    await stop_revocation_refresher()
+    await stop_pool_refiller()
+    await close_context_cache()
+    await close_gemini_client()
+    shutdown_password_pool()
+
 # Crear instancia de la app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configurar CORS
 app.add_middleware(
@@ -64,11 +87,6 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={"detail": exc.detail},
     )
 
-# Inicializar MongoDB con Beanie
-@app.on_event("startup")
-async def app_init():
-    await connect_to_mongo()
-
 # Registrar rutas
 app.include_router(router)
 app.include_router(rsvp_routes.router)
@@ -76,3 +94,5 @@ app.include_router(auth_routes.router)
 app.include_router(quiz_routes.router)
 app.include_router(stats_routes.router)
 app.include_router(assistant_routes.router)
+app.include_router(metrics_routes.router)
+app.include_router(job_routes.router)
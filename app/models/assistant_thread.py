@@ -0,0 +1,27 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from datetime import datetime
+from typing import List
+from app.core.config import settings
+from app.schemas.assistant import AssistantTurn
+
+class AssistantThread(Document):
+    """One assistant conversation about an RsvpSession: a running summary plus the latest turns verbatim."""
+    user_id: str
+    rsvp_session_id: str
+    summary: str = Field(default="") # Older turns, rolled up by Gemini
+    summarized_turns: int = Field(default=0)
+    turns: List[AssistantTurn] = Field(default_factory=list)
+    turn_count: int = Field(default=0) # Also the seq of the next turn
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "assistant_threads"
+        indexes = [
+            # A user's threads about a session, most recently active first
+            IndexModel([("user_id", ASCENDING), ("rsvp_session_id", ASCENDING), ("updated_at", DESCENDING)]),
+            # Abandoned conversations expire; every turn moves updated_at forward
+            IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=settings.ASSISTANT_THREAD_TTL_DAYS * 86400),
+        ]
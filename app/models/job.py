@@ -0,0 +1,34 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+
+class Job(Document):
+    kind: str # Name of the registered handler, e.g. "quiz"
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    user_id: Optional[str] = None
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(default="queued")
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    lease_expires_at: Optional[datetime] = None
+    worker_id: Optional[str] = None
+    dedupe_key: Optional[str] = None
+    active_key: Optional[str] = None # Copy of dedupe_key while queued/running; unique, so one active job per key
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            # Claim query: queued jobs that are due, and running jobs whose lease has expired
+            IndexModel([("status", ASCENDING), ("run_after", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+            # Sparse: finished and key-less jobs don't store active_key at all
+            IndexModel([("active_key", ASCENDING)], unique=True, sparse=True),
+        ]
+        keep_nulls = False
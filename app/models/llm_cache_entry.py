@@ -0,0 +1,19 @@
+from beanie import Document, Indexed
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from datetime import datetime
+
+class LlmCacheEntry(Document):
+    key: Indexed(str, unique=True) # sha256 of model + task + normalized payload
+    task: str
+    model: str
+    response_text: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "llm_cache"
+        indexes = [
+            # Mongo's TTL monitor removes entries once expires_at has passed
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
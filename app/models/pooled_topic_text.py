@@ -0,0 +1,12 @@
+from beanie import Document, Indexed
+from pydantic import Field
+from datetime import datetime
+
+class PooledTopicText(Document):
+    topic_key: Indexed(str) # normalized topic, see topic_pool.normalize_topic
+    topic: str
+    text: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "topic_text_pool"
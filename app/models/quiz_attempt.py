@@ -1,5 +1,6 @@
 from beanie import Document, Indexed
 from pydantic import Field
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime
 from typing import List
 
@@ -8,10 +9,14 @@ from app.schemas.quiz import QuizQuestionFeedback
 
 class QuizAttempt(Document):
     rsvp_session_id: Indexed(str)
-    user_id: Indexed(str)
+    user_id: str
     results: List[QuizQuestionFeedback] # Stores feedback for each question answered
     overall_score: float
     attempted_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "quiz_attempts"
+        indexes = [
+            # A user's attempts, optionally for one session; also serves user_id-only queries
+            IndexModel([("user_id", ASCENDING), ("rsvp_session_id", ASCENDING)], name="user_rsvp_session"),
+        ]
@@ -0,0 +1,19 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from datetime import datetime
+from typing import List
+from app.schemas.quiz import QuizQuestion
+
+class QuizVariant(Document):
+    """One generated question set for a text; several per text let retakes rotate questions."""
+    text_hash: str # sha256 of the whitespace-normalized session text
+    questions: List[QuizQuestion]
+    served_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "quiz_variants"
+        indexes = [
+            IndexModel([("text_hash", ASCENDING), ("served_count", ASCENDING), ("created_at", ASCENDING)]),
+        ]
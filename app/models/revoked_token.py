@@ -0,0 +1,18 @@
+from beanie import Document, Indexed
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from datetime import datetime
+from typing import Optional
+
+class RevokedToken(Document):
+    jti: Indexed(str, unique=True)
+    user_id: Optional[str] = None
+    revoked_at: Indexed(datetime) = Field(default_factory=datetime.utcnow) # Workers load new revocations by this
+    expires_at: datetime # The token's own exp; after it the token is rejected anyway
+
+    class Settings:
+        name = "revoked_tokens"
+        indexes = [
+            # Mongo's TTL monitor removes revocations once the token has expired
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime
 from typing import List, Optional, Literal
 from app.schemas.quiz import QuizQuestion
@@ -12,8 +13,12 @@ class RsvpSession(Document):
     deleted: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     quiz_questions: Optional[List[QuizQuestion]] = None
+    quiz_variant_id: Optional[str] = None # QuizVariant the current quiz_questions came from
     ai_estimated_ideal_reading_time_seconds: Optional[int] = None
     ai_text_difficulty: Optional[Literal["easy", "medium", "hard", "unknown"]] = Field(default="unknown")
+    fernandez_huerta_score: Optional[float] = None
+    szigriszt_pazos_score: Optional[float] = None
+    context_chunks: Optional[List[List[int]]] = None # [start, end) offsets of the assistant retrieval chunks
     word_count: Optional[int] = None
     reading_time_seconds: Optional[int] = None
     wpm: Optional[float] = None
@@ -28,3 +33,10 @@ class RsvpSession(Document):
 
     class Settings:
         name = "rsvp_sessions"
+        indexes = [
+            # A user's live sessions, newest first: the paginated session list (_id breaks created_at ties) and /api/stats
+            IndexModel(
+                [("user_id", ASCENDING), ("deleted", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="user_deleted_created_at_id",
+            ),
+        ]
@@ -1,7 +1,8 @@
-from beanie import Document, Indexed
+from beanie import Delete, Document, Indexed, Replace, Save, SaveChanges, Update, after_event
 from pydantic import EmailStr, Field
 from typing import Optional
 from datetime import datetime
+from app.core.user_cache import invalidate_user
 
 class User(Document):
     email: Indexed(EmailStr, unique=True)
@@ -11,5 +12,10 @@ class User(Document):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow) # Will need a pre_save hook to update this
 
+    @after_event(Save, Replace, SaveChanges, Update, Delete)
+    def invalidate_cached_user(self):
+        # Only document-level writes fire this; bulk User.find(...).update() relies on the cache TTL
+        invalidate_user(self.id)
+
     class Settings:
         name = "users"
@@ -1,9 +1,12 @@
 from pydantic import BaseModel, Field, model_validator
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
 class AssistantQueryInput(BaseModel):
     query: str = Field(..., min_length=1, description="User's question or request to the assistant.")
     rsvp_session_id: str
+    thread_id: Optional[str] = Field(None, description="Continue this conversation.")
+    new_thread: bool = Field(False, description="Start a conversation thread; without it or thread_id the query is answered on its own and nothing is stored.")
 
     @model_validator(mode='before')
     @classmethod
@@ -15,3 +18,20 @@ class AssistantQueryInput(BaseModel):
 
 class AssistantResponseOutput(BaseModel):
     response: str = Field(..., description="AI-generated response to the user's query.")
+    thread_id: Optional[str] = Field(None, description="Conversation the query and response were added to, if any.")
+
+class AssistantTurn(BaseModel):
+    seq: int
+    query: str
+    response: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class AssistantThreadOutput(BaseModel):
+    id: str
+    rsvp_session_id: str
+    summary: str
+    summarized_turns: int
+    turns: List[AssistantTurn]
+    turn_count: int
+    created_at: datetime
+    updated_at: datetime
@@ -7,7 +7,9 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[EmailStr] = None
-    # Or user_id: Optional[str] = None, depending on what we store in JWT
+    user_id: Optional[str] = None # "uid" claim; absent in tokens issued before it was added
+    jti: Optional[str] = None # Token id used for revocation; absent in older tokens
+    expires_at: Optional[int] = None # "exp" claim, seconds since the epoch
 
 class UserLogin(BaseModel):
     username: EmailStr # Using email as username
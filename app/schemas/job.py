@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class JobStatusOutput(BaseModel):
+    job_id: str
+    kind: str
+    status: str # "queued", "running", "succeeded" or "failed"
+    attempts: int
+    result: Optional[Dict[str, Any]] = None # For quiz jobs, the QuizOutput body
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
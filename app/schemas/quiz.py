@@ -14,6 +14,7 @@ class QuizQuestion(BaseModel):
 
 class QuizCreateInput(BaseModel):
     rsvp_session_id: str
+    regenerate: bool = False # Replace the stored questions with a different variant
 
     @model_validator(mode='before')
     @classmethod
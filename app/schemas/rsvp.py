@@ -1,8 +1,11 @@
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Literal
 
 class RsvpInput(BaseModel):
     topic: str
+    # "bundle" also generates the quiz and the text assessment in the same Gemini call
+    mode: Literal["text", "bundle"] = "text"
     # user_id: Optional[str] = None # REMOVE THIS LINE
 
 class RsvpOutput(BaseModel):
@@ -13,3 +16,16 @@ class RsvpOutput(BaseModel):
     wpm: Optional[float] = None
     quiz_score: Optional[float] = None
     quiz_taken: bool = False
+
+class RsvpSessionSummary(BaseModel):
+    """A session in GET /api/rsvp; only the fields asked for with `fields=` are present."""
+    id: str
+    topic: Optional[str] = None
+    snippet: Optional[str] = None # First words of the text
+    word_count: Optional[int] = None
+    quiz_score: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+class RsvpSessionPage(BaseModel):
+    items: List[RsvpSessionSummary]
+    next_cursor: Optional[str] = None # Pass as `cursor` to get the next page; None on the last page
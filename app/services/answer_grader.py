@@ -0,0 +1,159 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from app.core.config import settings
+
+_TOKEN_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+# Prefix length used to match inflected forms ("planta" / "plantas", "convierte" / "convierten")
+_STEM_LENGTH = 5
+
+STOPWORDS: Set[str] = {
+    "a", "al", "algo", "ante", "como", "con", "cual", "cuando", "de", "del", "donde", "el", "ella", "ellas",
+    "ellos", "en", "entre", "era", "es", "esa", "ese", "eso", "esta", "este", "esto", "fue", "ha", "hay",
+    "la", "las", "le", "les", "lo", "los", "mas", "mi", "muy", "nos", "o", "para", "pero", "por",
+    "porque", "que", "se", "sea", "ser", "si", "sobre", "son", "su", "sus", "tambien", "te", "tiene",
+    "un", "una", "uno", "unos", "unas", "y", "ya", "yo",
+    "the", "of", "and", "to", "is", "in", "it", "that", "for", "on", "are", "with", "as", "by", "an", "be",
+}
+
+# Kept as content terms: dropping them would make "no producen oxígeno" match "producen oxígeno"
+NEGATIONS: Set[str] = {"no", "ni", "nunca", "jamas", "tampoco", "sin", "not", "never", "nor", "without"}
+
+# Answers that say nothing, whatever the question
+NON_ANSWERS = {"", "no se", "nose", "ni idea", "no lo se", "no recuerdo", "no me acuerdo", "idk"}
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents so "Fotosíntesis" and "fotosintesis" compare equal."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def is_negated(text: str) -> bool:
+    return any(token in NEGATIONS for token in tokenize(text))
+
+
+def content_terms(text: str) -> List[str]:
+    """Folded, stopword-free tokens reduced to a short prefix stem."""
+    return [token[:_STEM_LENGTH] for token in tokenize(text) if token not in STOPWORDS]
+
+
+class IdfTable:
+    """Inverse document frequencies over the sentences of the session text."""
+
+    def __init__(self, documents: Iterable[str]):
+        self.document_count = 0
+        self.document_frequency: Counter = Counter()
+        for document in documents:
+            terms = set(content_terms(document))
+            if terms:
+                self.document_count += 1
+                self.document_frequency.update(terms)
+
+    @classmethod
+    def from_text(cls, text: Optional[str]) -> "IdfTable":
+        return cls(_SENTENCE_RE.split(text) if text else [])
+
+    def idf(self, term: str) -> float:
+        # Smoothed idf; with an empty corpus every term weighs 1
+        return math.log((self.document_count + 1) / (self.document_frequency.get(term, 0) + 1)) + 1
+
+
+def tfidf_cosine(a: List[str], b: List[str], idf: IdfTable) -> float:
+    if not a or not b:
+        return 0.0
+    va = {term: count * idf.idf(term) for term, count in Counter(a).items()}
+    vb = {term: count * idf.idf(term) for term, count in Counter(b).items()}
+    dot = sum(weight * vb.get(term, 0.0) for term, weight in va.items())
+    norm = math.sqrt(sum(w * w for w in va.values())) * math.sqrt(sum(w * w for w in vb.values()))
+    return dot / norm if norm else 0.0
+
+
+def pregrade_answer(
+    question_text: str,
+    correct_answer: str,
+    user_answer: str,
+    idf: Optional[IdfTable] = None,
+    question_id: Optional[str] = None,
+) -> dict:
+    """Score an open-ended answer locally against the model answer.
+
+    Returns the lexical signals plus "evaluation": "correct" / "incorrect" when the answer is clearly
+    one or the other, or None for the ambiguous band that should go to Gemini.
+    """
+    idf = idf or IdfTable([])
+    answer_terms = content_terms(user_answer)
+    reference_terms = content_terms(correct_answer)
+    # Words already in the question are no evidence that the user understood the answer
+    question_terms = set(content_terms(question_text))
+    keywords = {term for term in reference_terms if term not in question_terms and len(term) >= 4} or set(reference_terms)
+
+    answer_set = set(answer_terms)
+    overlap = len(answer_set & set(reference_terms)) / len(set(reference_terms)) if reference_terms else 0.0
+    coverage = len(answer_set & keywords) / len(keywords) if keywords else 0.0
+    cosine = tfidf_cosine(answer_terms, reference_terms, idf)
+    score = 0.5 * cosine + 0.5 * coverage
+    # Share of the answer's terms that occur in the session text: a low score with high support
+    # may be a paraphrase using other words from the text, so it is left to Gemini
+    text_support = len(answer_set & idf.document_frequency.keys()) / len(answer_set) if answer_set else 0.0
+
+    folded_answer = " ".join(tokenize(user_answer))
+    if folded_answer == " ".join(tokenize(correct_answer)):
+        evaluation, reason = "correct", "verbatim"
+    elif folded_answer in NON_ANSWERS or not answer_terms:
+        evaluation, reason = "incorrect", "empty"
+    elif is_negated(user_answer) != is_negated(correct_answer):
+        # Same words, opposite claim: lexical similarity cannot tell, so Gemini decides
+        evaluation, reason = None, "negation_mismatch"
+    elif score >= settings.QUIZ_LOCAL_CORRECT_THRESHOLD:
+        evaluation, reason = "correct", "high_similarity"
+    elif score <= settings.QUIZ_LOCAL_INCORRECT_THRESHOLD and text_support < 0.5:
+        evaluation, reason = "incorrect", "unrelated"
+    else:
+        evaluation, reason = None, "ambiguous"
+
+    decision = {
+        "evaluation": evaluation,
+        "reason": reason,
+        "score": round(score, 3),
+        "cosine": round(cosine, 3),
+        "coverage": round(coverage, 3),
+        "overlap": round(overlap, 3),
+        "text_support": round(text_support, 3),
+    }
+    # One line per answer so the thresholds can be tuned from the logs
+    logger.info(f"Local grading question={question_id} {decision}")
+    return decision
+
+
+def local_feedback(decision: dict) -> str:
+    if decision["reason"] == "empty":
+        return "No answer was given."
+    if decision["evaluation"] == "correct":
+        return "Correct! Your answer covers the key points of the expected answer."
+    return "Incorrect. Your answer does not address the key points of the expected answer."
+
+
+def pregrade_items(items: List[dict], reference_text: Optional[str] = None) -> Dict[str, dict]:
+    """Run pregrade_answer over open-ended items, weighting terms by the session text.
+
+    Returns {question_id: decision} for every item; decision["evaluation"] is None for the
+    answers that still need Gemini.
+    """
+    idf = IdfTable.from_text(reference_text)
+    return {
+        item["question_id"]: pregrade_answer(
+            item["question_text"], item["correct_answer"], item["user_answer"], idf, item["question_id"]
+        )
+        for item in items
+    }
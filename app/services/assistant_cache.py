@@ -0,0 +1,130 @@
+import math
+import zlib
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.answer_grader import content_terms, tokenize
+from app.utils.lru import TTLLRUCache
+from app.utils.text import sha256_hex
+
+# Hashed character n-gram vectors used for near-duplicate queries
+NGRAM_SIZE = 3
+VECTOR_DIMENSIONS = 1024
+# Queries remembered per text for near-duplicate matching
+MAX_QUERIES_PER_TEXT = 64
+
+_answers = TTLLRUCache(maxsize=settings.ASSISTANT_CACHE_MAXSIZE, ttl_seconds=settings.ASSISTANT_CACHE_TTL_SECONDS)
+# text hash -> [(normalized query, content terms, vector)], most recent last
+_queries = TTLLRUCache(maxsize=settings.ASSISTANT_CACHE_MAXSIZE, ttl_seconds=settings.ASSISTANT_CACHE_TTL_SECONDS)
+_stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stores": 0}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercased, accent-folded and punctuation-free: "¿Cuál es la idea principal?" -> "cual es la idea principal"."""
+    return " ".join(tokenize(query))
+
+
+def text_hash(text: str) -> str:
+    return sha256_hex(text)
+
+
+def query_vector(normalized_query: str) -> Dict[int, float]:
+    """L2-normalized counts of the query's character n-grams, hashed into VECTOR_DIMENSIONS buckets."""
+    padded = f" {normalized_query} "
+    counts = Counter(
+        zlib.crc32(padded[i:i + NGRAM_SIZE].encode("utf-8")) % VECTOR_DIMENSIONS
+        for i in range(len(padded) - NGRAM_SIZE + 1)
+    )
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {bucket: count / norm for bucket, count in counts.items()} if norm else {}
+
+
+def query_terms(normalized_query: str) -> FrozenSet[str]:
+    """Stemmed content words, negations included: near duplicates must ask about the same things."""
+    return frozenset(content_terms(normalized_query))
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+def _answer_key(text_digest: str, normalized_query: str) -> str:
+    return f"{text_digest}:{normalized_query}"
+
+
+def _nearest_answer(text_digest: str, normalized_query: str) -> Optional[Tuple[str, float]]:
+    entries: List[Tuple[str, FrozenSet[str], Dict[int, float]]] = _queries.get(text_digest) or []
+    terms = query_terms(normalized_query)
+    vector = query_vector(normalized_query)
+    best: Optional[Tuple[str, float]] = None
+    for cached_query, cached_terms, cached_vector in entries:
+        # Character n-grams barely notice a "no": "que produce" and "que no produce" score ~0.95
+        if cached_terms != terms:
+            continue
+        similarity = cosine(vector, cached_vector)
+        if similarity >= settings.ASSISTANT_CACHE_SIMILARITY_THRESHOLD and (best is None or similarity > best[1]):
+            answer = _answers.get(_answer_key(text_digest, cached_query))
+            if answer is not None:
+                best = (answer, similarity)
+    return best
+
+
+def get_cached_answer(context_text: str, query: str) -> Optional[str]:
+    """Answer previously given for this text and the same (or, optionally, a near-identical) question."""
+    if not settings.ASSISTANT_CACHE_ENABLED:
+        return None
+    text_digest = text_hash(context_text)
+    normalized = normalize_query(query)
+
+    answer = _answers.get(_answer_key(text_digest, normalized))
+    if answer is not None:
+        _stats["exact_hits"] += 1
+        return answer
+
+    if settings.ASSISTANT_CACHE_NEAR_DUPLICATES:
+        nearest = _nearest_answer(text_digest, normalized)
+        if nearest is not None:
+            _stats["near_hits"] += 1
+            logger.debug(f"Assistant cache near-duplicate hit for '{normalized}' (similarity {nearest[1]:.3f})")
+            return nearest[0]
+
+    _stats["misses"] += 1
+    return None
+
+
+def store_answer(context_text: str, query: str, answer: str) -> None:
+    if not settings.ASSISTANT_CACHE_ENABLED or not answer:
+        return
+    text_digest = text_hash(context_text)
+    normalized = normalize_query(query)
+    _answers.set(_answer_key(text_digest, normalized), answer)
+    _stats["stores"] += 1
+
+    if settings.ASSISTANT_CACHE_NEAR_DUPLICATES:
+        entries = [e for e in (_queries.get(text_digest) or []) if e[0] != normalized]
+        entries.append((normalized, query_terms(normalized), query_vector(normalized)))
+        _queries.set(text_digest, entries[-MAX_QUERIES_PER_TEXT:])
+
+
+def clear_cache() -> None:
+    _answers.clear()
+    _queries.clear()
+    for name in _stats:
+        _stats[name] = 0
+
+
+def get_cache_stats() -> dict:
+    lookups = _stats["exact_hits"] + _stats["near_hits"] + _stats["misses"]
+    hits = _stats["exact_hits"] + _stats["near_hits"]
+    answers = _answers.stats()
+    return {
+        **_stats,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+        "size": answers["size"],
+        "maxsize": answers["maxsize"],
+    }
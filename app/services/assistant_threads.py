@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from loguru import logger
+
+from app.core.config import settings
+from app.models.assistant_thread import AssistantThread
+from app.models.rsvp_session import RsvpSession
+from app.models.user import User
+from app.schemas.assistant import AssistantTurn
+from app.services.context_index import estimate_tokens
+from app.services.gemini_service import summarize_conversation
+
+
+async def open_thread(thread_id: Optional[str], user: User, rsvp_session: RsvpSession) -> Optional[AssistantThread]:
+    """The user's thread about this session, or a new one when thread_id is None.
+
+    Returns None when thread_id does not name a thread of this user and session.
+    """
+    if thread_id is None:
+        thread = AssistantThread(user_id=str(user.id), rsvp_session_id=str(rsvp_session.id))
+        await thread.insert()
+        return thread
+    thread = await get_thread(thread_id, user)
+    return thread if thread and thread.rsvp_session_id == str(rsvp_session.id) else None
+
+
+async def get_thread(thread_id: str, user: User) -> Optional[AssistantThread]:
+    if not ObjectId.is_valid(thread_id):
+        return None
+    thread = await AssistantThread.get(thread_id)
+    return thread if thread and thread.user_id == str(user.id) else None
+
+
+async def list_threads(user: User, rsvp_session_id: str, limit: int = 20) -> List[AssistantThread]:
+    return await AssistantThread.find(
+        AssistantThread.user_id == str(user.id),
+        AssistantThread.rsvp_session_id == rsvp_session_id,
+    ).sort(-AssistantThread.updated_at).limit(limit).to_list()
+
+
+async def delete_session_threads(rsvp_session_id: str) -> int:
+    """Remove every thread about a session; returns how many were deleted."""
+    result = await AssistantThread.find(AssistantThread.rsvp_session_id == rsvp_session_id).delete()
+    return result.deleted_count if result else 0
+
+
+def _turn_text(turn: AssistantTurn) -> str:
+    return f"User: {turn.query}\nAssistant: {turn.response}"
+
+
+def history_for_prompt(thread: AssistantThread) -> Optional[str]:
+    """Running summary plus the newest turns that fit in ASSISTANT_HISTORY_TOKEN_BUDGET, oldest first."""
+    budget = settings.ASSISTANT_HISTORY_TOKEN_BUDGET
+    parts = []
+    summary = thread.summary
+    if summary:
+        # The summary may use at most half the budget so recent turns always fit
+        max_chars = budget // 2 * 4
+        if len(summary) > max_chars:
+            summary = summary[:max_chars]
+        summary = f"Summary of earlier turns: {summary}"
+        budget -= estimate_tokens(summary)
+
+    recent = []
+    for turn in reversed(thread.turns):
+        text = _turn_text(turn)
+        cost = estimate_tokens(text)
+        if cost > budget:
+            break
+        recent.append(text)
+        budget -= cost
+
+    if summary:
+        parts.append(summary)
+    parts.extend(reversed(recent))
+    return "\n".join(parts) or None
+
+
+def needs_summary(thread: AssistantThread) -> bool:
+    keep = settings.ASSISTANT_THREAD_RECENT_TURNS
+    if len(thread.turns) <= keep:
+        return False
+    tokens = estimate_tokens(thread.summary) + sum(estimate_tokens(_turn_text(t)) for t in thread.turns)
+    return tokens > settings.ASSISTANT_HISTORY_TOKEN_BUDGET or len(thread.turns) >= 2 * keep
+
+
+async def append_turn(thread: AssistantThread, query: str, response: str) -> AssistantThread:
+    """Store a query/response pair on the thread and return the thread as it now is."""
+    turn = AssistantTurn(seq=thread.turn_count, query=query, response=response)
+    now = datetime.utcnow()
+    await AssistantThread.get_motor_collection().update_one(
+        {"_id": thread.id},
+        {
+            # $slice bounds the document even if summarizing keeps failing
+            "$push": {"turns": {"$each": [turn.model_dump()], "$slice": -settings.ASSISTANT_THREAD_MAX_STORED_TURNS}},
+            "$inc": {"turn_count": 1},
+            "$set": {"updated_at": now},
+        },
+    )
+    thread.turns = (thread.turns + [turn])[-settings.ASSISTANT_THREAD_MAX_STORED_TURNS:]
+    thread.turn_count += 1
+    thread.updated_at = now
+    return thread
+
+
+async def summarize_thread(thread_id) -> bool:
+    """Fold all but the last ASSISTANT_THREAD_RECENT_TURNS turns into the running summary.
+
+    Safe to run concurrently with appends: only the summarized turns are pulled, and the update is
+    skipped if another summarization got there first.
+    """
+    thread = await AssistantThread.get(thread_id)
+    if not thread:
+        return False
+    older = thread.turns[:-settings.ASSISTANT_THREAD_RECENT_TURNS] if settings.ASSISTANT_THREAD_RECENT_TURNS else thread.turns
+    if not older:
+        return False
+
+    try:
+        summary = await summarize_conversation(
+            thread.summary, [t.model_dump() for t in older], settings.ASSISTANT_SUMMARY_MAX_WORDS
+        )
+    except Exception as e:
+        logger.warning(f"Could not summarize assistant thread {thread.id}: {e}")
+        return False
+    if not summary:
+        return False
+
+    result = await AssistantThread.get_motor_collection().update_one(
+        {"_id": thread.id, "summarized_turns": thread.summarized_turns},
+        {
+            "$set": {"summary": summary},
+            "$inc": {"summarized_turns": len(older)},
+            "$pull": {"turns": {"seq": {"$lte": older[-1].seq}}},
+        },
+    )
+    return result.modified_count == 1
@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.services import gemini_client
+from app.services.context_index import estimate_tokens
+from app.services.single_flight import SingleFlight
+from app.utils.lru import TTLLRUCache
+from app.utils.text import sha256_hex
+
+ASSISTANT_SYSTEM_INSTRUCTION = (
+    "You are a helpful AI assistant. Answer the user's query based *only* on the provided context text. "
+    "If the answer cannot be found in the context text, clearly state that. Do not use external knowledge."
+)
+# Statuses Gemini answers with when a cachedContent name has expired or was deleted
+STALE_HANDLE_STATUS_CODES = {400, 403, 404}
+# Texts Gemini refused to cache (too short for the model, unsupported model...) are not retried for this long
+FAILURE_BACKOFF_SECONDS = 3600
+# Smallest cachedContent each model family accepts, by model name prefix (Gemini API caching docs)
+MODEL_MIN_CACHE_TOKENS = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096,
+    "gemini-2.0-flash": 4096,
+}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+# estimate_tokens is a 4-characters-per-token guess; stay this far above the model's minimum
+MIN_TOKENS_MARGIN = 1.1
+
+
+class GeminiContextCacheBackend:
+    """Context caches stored by Gemini (cachedContents)."""
+
+    async def create(self, context_text: str, ttl_seconds: int) -> str:
+        contents = [{"role": "user", "parts": [{"text": f"Context Text:\n---\n{context_text}\n---"}]}]
+        resource = await gemini_client.create_cached_content(contents, ASSISTANT_SYSTEM_INSTRUCTION, ttl_seconds)
+        return resource["name"]
+
+    async def refresh(self, name: str, ttl_seconds: int) -> None:
+        await gemini_client.update_cached_content_ttl(name, ttl_seconds)
+
+    async def delete(self, name: str) -> None:
+        await gemini_client.delete_cached_content(name)
+
+
+class MockContextCacheBackend:
+    """In-memory stand-in for cachedContents, for tests and local runs without Gemini."""
+
+    def __init__(self):
+        self.contents: Dict[str, str] = {}
+        self.calls = {"create": 0, "refresh": 0, "delete": 0}
+
+    async def create(self, context_text: str, ttl_seconds: int) -> str:
+        self.calls["create"] += 1
+        name = f"cachedContents/mock-{self.calls['create']}"
+        self.contents[name] = context_text
+        return name
+
+    async def refresh(self, name: str, ttl_seconds: int) -> None:
+        self.calls["refresh"] += 1
+        if name not in self.contents:
+            raise httpx.HTTPStatusError(
+                "cached content not found",
+                request=httpx.Request("PATCH", name),
+                response=httpx.Response(404, request=httpx.Request("PATCH", name)),
+            )
+
+    async def delete(self, name: str) -> None:
+        self.calls["delete"] += 1
+        self.contents.pop(name, None)
+
+
+class _Handle:
+    def __init__(self, name: str, tokens: int, expires_at: float):
+        self.name = name
+        self.tokens = tokens
+        self.expires_at = expires_at
+
+
+_backend = GeminiContextCacheBackend()
+# text digest -> handle, least recently used first
+_handles: "OrderedDict[str, _Handle]" = OrderedDict()
+_failed = TTLLRUCache(maxsize=1024, ttl_seconds=FAILURE_BACKOFF_SECONDS)
+_creating = SingleFlight()
+_pending_deletes: set = set()
+_stats = {"created": 0, "reused": 0, "refreshed": 0, "evicted": 0, "invalidated": 0, "failures": 0, "tokens_saved": 0}
+
+
+def set_backend(backend) -> None:
+    """Swap the storage backend (e.g. MockContextCacheBackend in tests) and forget the current handles."""
+    global _backend
+    _backend = backend
+    _handles.clear()
+    _failed.clear()
+
+
+def _delete_later(name: str) -> None:
+    """Best-effort remote delete; the handle's TTL cleans up anyway if it fails."""
+
+    async def delete():
+        try:
+            await _backend.delete(name)
+        except Exception as e:
+            logger.debug(f"Could not delete cached context {name}: {e}")
+
+    task = asyncio.create_task(delete())
+    _pending_deletes.add(task)
+    task.add_done_callback(_pending_deletes.discard)
+
+
+async def _create(key: str, context_text: str) -> Optional[_Handle]:
+    ttl = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+    try:
+        name = await _backend.create(context_text, ttl)
+    except Exception as e:
+        _stats["failures"] += 1
+        _failed.set(key, True)
+        logger.warning(f"Could not create a Gemini context cache; sending context inline for now: {e}")
+        return None
+
+    handle = _Handle(name, estimate_tokens(context_text), time.monotonic() + ttl)
+    _handles[key] = handle
+    _stats["created"] += 1
+    while len(_handles) > settings.GEMINI_CONTEXT_CACHE_MAX_HANDLES:
+        _, evicted = _handles.popitem(last=False)
+        _stats["evicted"] += 1
+        _delete_later(evicted.name)
+    return handle
+
+
+def min_cache_tokens(model: str) -> int:
+    """Estimated tokens a text needs before it is worth offering to `model` as a cachedContent."""
+    if settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS:
+        return settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+    prefix = max((p for p in MODEL_MIN_CACHE_TOKENS if model.startswith(p)), key=len, default=None)
+    minimum = MODEL_MIN_CACHE_TOKENS[prefix] if prefix else DEFAULT_MIN_CACHE_TOKENS
+    return int(minimum * MIN_TOKENS_MARGIN)
+
+
+async def get_cached_context(context_text: str) -> Optional[str]:
+    """cachedContent name holding `context_text` for assistant queries, or None to send the text inline.
+
+    The first call for a text uploads it; later calls reuse the handle and extend its TTL once less
+    than half of it is left, so handles live as long as someone keeps asking about the text.
+    Only texts between the model's minimum and GEMINI_CONTEXT_CACHE_MAX_TOKENS are cached; the
+    others are sent inline, whole or as the chunks selected for each query.
+    """
+    tokens = estimate_tokens(context_text)
+    if not settings.GEMINI_CONTEXT_CACHE_ENABLED or not (
+        min_cache_tokens(settings.GEMINI_MODEL) <= tokens <= settings.GEMINI_CONTEXT_CACHE_MAX_TOKENS
+    ):
+        return None
+    key = sha256_hex(f"{settings.GEMINI_MODEL}\n{context_text}")
+    if key in _failed:
+        return None
+
+    handle = _handles.get(key)
+    now = time.monotonic()
+    if handle is not None and handle.expires_at <= now:
+        del _handles[key]
+        handle = None
+    if handle is None:
+        handle = await _creating.do(key, lambda: _create(key, context_text))
+        return handle.name if handle else None
+
+    _handles.move_to_end(key)
+    ttl = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+    if handle.expires_at - now < ttl / 2:
+        try:
+            await _backend.refresh(handle.name, ttl)
+            handle.expires_at = now + ttl
+            _stats["refreshed"] += 1
+        except Exception as e:
+            logger.info(f"Cached context {handle.name} could not be refreshed, recreating it: {e}")
+            _handles.pop(key, None)
+            handle = await _creating.do(key, lambda: _create(key, context_text))
+            return handle.name if handle else None
+
+    _stats["reused"] += 1
+    _stats["tokens_saved"] += handle.tokens
+    return handle.name
+
+
+def is_stale_handle_error(error: Exception) -> bool:
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code in STALE_HANDLE_STATUS_CODES
+
+
+def invalidate(name: str) -> None:
+    """Forget a handle Gemini no longer recognizes so the next query creates a new one."""
+    for key, handle in list(_handles.items()):
+        if handle.name == name:
+            del _handles[key]
+            _stats["invalidated"] += 1
+
+
+async def close_context_cache() -> None:
+    """Delete this worker's handles on shutdown instead of paying for storage until they expire."""
+    names = [handle.name for handle in _handles.values()]
+    _handles.clear()
+    for name in names:
+        try:
+            await _backend.delete(name)
+        except Exception as e:
+            logger.debug(f"Could not delete cached context {name}: {e}")
+    if _pending_deletes:
+        await asyncio.gather(*_pending_deletes, return_exceptions=True)
+
+
+def get_context_cache_stats() -> dict:
+    return {**_stats, "handles": len(_handles), "max_handles": settings.GEMINI_CONTEXT_CACHE_MAX_HANDLES}
@@ -0,0 +1,162 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.models.rsvp_session import RsvpSession
+from app.services.answer_grader import content_terms
+from app.utils.lru import TTLLRUCache
+
+# BM25 parameters (the usual Okapi defaults)
+K1 = 1.5
+B = 0.75
+# Rough chars-per-token ratio for Gemini on Spanish/English prose
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n|\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+_GAP_MARKER = "\n[...]\n"
+
+_index_cache = TTLLRUCache(maxsize=settings.ASSISTANT_INDEX_CACHE_SIZE)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split_long(text: str, start: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Split one paragraph into runs of whole sentences of at most max_chars (a longer sentence stays whole)."""
+    spans = []
+    chunk_start = chunk_end = start
+    position = start
+    for sentence in _SENTENCE_END_RE.split(text):
+        sentence_start = text.find(sentence, position - start) + start
+        sentence_end = sentence_start + len(sentence)
+        position = sentence_end
+        if chunk_end > chunk_start and sentence_end - chunk_start > max_chars:
+            spans.append((chunk_start, chunk_end))
+            chunk_start = sentence_start
+        chunk_end = sentence_end
+    if chunk_end > chunk_start:
+        spans.append((chunk_start, chunk_end))
+    return spans
+
+
+def chunk_offsets(text: str, max_chars: Optional[int] = None) -> List[List[int]]:
+    """[start, end) character offsets of the text's chunks: paragraphs, split by sentences when too long."""
+    max_chars = max_chars or settings.ASSISTANT_CHUNK_MAX_CHARS
+    offsets: List[List[int]] = []
+    position = 0
+    for paragraph in _PARAGRAPH_RE.split(text):
+        start = text.find(paragraph, position)
+        position = start + len(paragraph)
+        stripped = paragraph.strip()
+        if not stripped:
+            continue
+        start += paragraph.index(stripped)
+        if len(stripped) <= max_chars:
+            offsets.append([start, start + len(stripped)])
+        else:
+            offsets.extend([s, e] for s, e in _split_long(stripped, start, max_chars))
+    return offsets
+
+
+class ContextIndex:
+    """BM25 index over one session's chunks. Only the offsets are persisted; terms are rebuilt in memory."""
+
+    def __init__(self, text: str, offsets: List[List[int]]):
+        self.text = text
+        self.offsets = offsets
+        self.chunk_terms = [Counter(content_terms(text[start:end])) for start, end in offsets]
+        self.lengths = [sum(terms.values()) for terms in self.chunk_terms]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        document_frequency = Counter()
+        for terms in self.chunk_terms:
+            document_frequency.update(terms.keys())
+        n = len(offsets)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def chunk(self, i: int) -> str:
+        start, end = self.offsets[i]
+        return self.text[start:end]
+
+    def scores(self, query: str) -> List[float]:
+        query_terms = set(content_terms(query))
+        scores = []
+        for terms, length in zip(self.chunk_terms, self.lengths):
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    norm = K1 * (1 - B + B * length / (self.average_length or 1))
+                    score += self.idf[term] * tf * (K1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def select(self, query: str, token_budget: int, top_k: int) -> List[int]:
+        """Indices of the best chunks for `query` that fit in `token_budget`, in document order."""
+        scores = self.scores(query)
+        ranked = [i for i in sorted(range(len(scores)), key=lambda i: -scores[i]) if scores[i] > 0][:top_k]
+        if not ranked:
+            # Nothing matched (e.g. "resume el texto"): use the beginning of the text
+            ranked = list(range(len(self.offsets)))
+
+        selected, used = [], 0
+        for i in ranked:
+            cost = estimate_tokens(self.chunk(i))
+            if used + cost > token_budget:
+                continue
+            selected.append(i)
+            used += cost
+        return sorted(selected)
+
+
+async def get_session_index(session: RsvpSession) -> ContextIndex:
+    """The session's index from the per-worker cache, from persisted offsets, or chunked now and persisted."""
+    key = str(session.id)
+    index = _index_cache.get(key)
+    if index is not None:
+        return index
+
+    offsets = session.context_chunks
+    if offsets is None:
+        offsets = chunk_offsets(session.text)
+        try:
+            await session.set({RsvpSession.context_chunks: offsets})
+        except Exception as e:
+            logger.warning(f"Could not persist context chunks for session {key}: {e}")
+    index = ContextIndex(session.text, offsets)
+    _index_cache.set(key, index)
+    return index
+
+
+async def build_assistant_context(session: RsvpSession, query: str) -> str:
+    """Context for an assistant prompt: the whole text if it fits the token budget, else the top BM25 chunks."""
+    budget = settings.ASSISTANT_CONTEXT_TOKEN_BUDGET
+    if estimate_tokens(session.text) <= budget:
+        return session.text
+
+    index = await get_session_index(session)
+    selected = index.select(query, budget, settings.ASSISTANT_CONTEXT_TOP_K)
+    parts = []
+    previous = None
+    for i in selected:
+        if previous is not None and i != previous + 1:
+            parts.append(_GAP_MARKER)
+        elif previous is not None:
+            parts.append("\n")
+        parts.append(index.chunk(i))
+        previous = i
+    context = "".join(parts)
+    logger.info(
+        f"Assistant context for session {session.id}: {len(selected)}/{len(index.offsets)} chunks, "
+        f"~{estimate_tokens(context)} of {estimate_tokens(session.text)} tokens"
+    )
+    return context
+
+
+def get_index_cache_stats() -> dict:
+    return _index_cache.stats()
@@ -0,0 +1,345 @@
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.services import llm_cache
+from app.services.gemini_limiter import limiter, parse_retry_after, RETRYABLE_STATUS_CODES, RETRYABLE_EXCEPTIONS
+from app.services.single_flight import SingleFlight
+
+# Per-task read timeouts (seconds). The connect timeout is shared and comes from settings.
+TASK_TIMEOUTS = {
+    "default": 60.0,
+    "analysis": 60.0,
+    "assessment": 30.0,
+    "assistant": 45.0,
+    "assistant_summary": 30.0,
+    "quiz_generation": 60.0,
+    "quiz_evaluation": 30.0,
+    "rsvp": 30.0,
+    "rsvp_bundle": 60.0,
+}
+
+_client: Optional[httpx.AsyncClient] = None
+_prewarm_task: Optional[asyncio.Task] = None
+# Identical generateContent requests in flight on this worker share one upstream call
+_in_flight = SingleFlight()
+
+
+def model_url(method: str = "generateContent", model: Optional[str] = None) -> str:
+    return f"{settings.GEMINI_API_BASE_URL}/models/{model or settings.GEMINI_MODEL}:{method}"
+
+
+def task_timeout(task: str) -> httpx.Timeout:
+    read_timeout = TASK_TIMEOUTS.get(task, TASK_TIMEOUTS["default"])
+    return httpx.Timeout(read_timeout, connect=settings.GEMINI_CONNECT_TIMEOUT_SECONDS)
+
+
+def _http2_available() -> bool:
+    if not settings.GEMINI_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("GEMINI_HTTP2 is enabled but the 'h2' package is not installed; falling back to HTTP/1.1.")
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.GEMINI_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GEMINI_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.GEMINI_POOL_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=_http2_available(),
+        timeout=task_timeout("default"),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def get_gemini_client() -> httpx.AsyncClient:
+    """Return the worker's shared Gemini client, creating it lazily outside the app lifespan (scripts, tests)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def _prewarm() -> None:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return
+    client = get_gemini_client()
+    url = f"{settings.GEMINI_API_BASE_URL}/models/{settings.GEMINI_MODEL}?key={api_key}"
+    try:
+        # A cheap metadata GET opens the TCP+TLS connection so the first real request reuses it.
+        res = await client.get(url, timeout=task_timeout("default"))
+        logger.info(f"Gemini connection pre-warmed ({res.http_version}, status {res.status_code})")
+    except httpx.HTTPError as e:
+        logger.warning(f"Gemini connection pre-warm failed: {e}")
+
+
+async def open_gemini_client() -> httpx.AsyncClient:
+    """Create the pooled client for this worker and pre-warm it in the background."""
+    global _prewarm_task
+    client = get_gemini_client()
+    if settings.GEMINI_PREWARM:
+        _prewarm_task = asyncio.create_task(_prewarm())
+    return client
+
+
+async def close_gemini_client() -> None:
+    global _client, _prewarm_task
+    if _prewarm_task is not None and not _prewarm_task.done():
+        _prewarm_task.cancel()
+    _prewarm_task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def build_payload(prompt: str, generation_config: Optional[dict] = None) -> dict:
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config:
+        payload["generationConfig"] = generation_config
+    return payload
+
+
+def extract_text(data: dict) -> str:
+    return data["candidates"][0]["content"]["parts"][0]["text"]
+
+
+def response_from_text(text: str) -> dict:
+    """Rebuild the minimal generateContent body callers read from, used for cache hits."""
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+async def _post_generate_content(payload: dict, task: str, model: str) -> dict:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        logger.error(f"GEMINI_API_KEY not found for Gemini task '{task}'.")
+        raise ValueError("API key for Gemini not configured.")
+
+    client = get_gemini_client()
+    budget = limiter.new_budget()
+    while True:
+        async with limiter.slot():
+            try:
+                res = await client.post(
+                    f"{model_url(model=model)}?key={api_key}",
+                    headers={"Content-Type": "application/json"},
+                    json=payload,
+                    timeout=task_timeout(task),
+                )
+            except RETRYABLE_EXCEPTIONS as e:
+                delay = _retry_delay(budget, task, None, repr(e))
+                if delay is None:
+                    raise
+                res = None
+            else:
+                limiter.record(res.status_code)
+                delay = None
+                if res.status_code in RETRYABLE_STATUS_CODES:
+                    delay = _retry_delay(budget, task, res.headers.get("Retry-After"), str(res.status_code))
+        # Back off outside the concurrency slot so other requests can use it meanwhile
+        if delay is None:
+            break
+        await asyncio.sleep(delay)
+
+    res.raise_for_status()
+    return res.json()
+
+
+def _retry_delay(budget, task: str, retry_after: Optional[str], reason: str) -> Optional[float]:
+    delay = budget.next_delay(parse_retry_after(retry_after))
+    if delay is None:
+        limiter.exhausted += 1
+        logger.warning(f"Gemini task '{task}' failed with {reason}; retry budget exhausted after {budget.attempts} attempt(s).")
+        return None
+    limiter.retries += 1
+    logger.warning(f"Gemini task '{task}' got {reason}; retrying in {delay:.2f}s (attempt {budget.attempts}).")
+    return delay
+
+
+async def generate_content(
+    payload: dict,
+    task: str = "default",
+    model: Optional[str] = None,
+    use_cache: bool = True,
+) -> dict:
+    """POST a generateContent request through the shared client and return the decoded JSON body.
+
+    Responses for cacheable tasks are served from / stored in the LLM cache, and identical
+    requests already in flight are awaited instead of sent again. use_cache=False opts out of
+    both, for callers that want an independent answer. Raises httpx.HTTPStatusError /
+    httpx.RequestError like a direct httpx call would.
+    """
+    model = model or settings.GEMINI_MODEL
+    if not use_cache:
+        return await _post_generate_content(payload, task, model)
+
+    key = llm_cache.make_cache_key(model, task, payload)
+    cacheable = llm_cache.task_ttl_seconds(task) is not None
+    if cacheable:
+        cached_text = await llm_cache.get_cached_response(key, task)
+        if cached_text is not None:
+            return response_from_text(cached_text)
+
+    async def fetch() -> dict:
+        data = await _post_generate_content(payload, task, model)
+        if cacheable:
+            # Only well-formed, non-empty answers are worth replaying
+            try:
+                text = extract_text(data)
+            except (KeyError, IndexError, TypeError):
+                text = None
+            if text and text.strip():
+                await llm_cache.store_response(key, task, model, text)
+        return data
+
+    return await _in_flight.do(key, fetch)
+
+
+async def generate_text(
+    prompt: str,
+    task: str = "default",
+    generation_config: Optional[dict] = None,
+    use_cache: bool = True,
+) -> str:
+    data = await generate_content(build_payload(prompt, generation_config), task=task, use_cache=use_cache)
+    return extract_text(data)
+
+
+async def stream_generate_content(payload: dict, task: str = "default", model: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield text fragments from streamGenerateContent (SSE) as Gemini produces them."""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        logger.error(f"GEMINI_API_KEY not found for Gemini task '{task}'.")
+        raise ValueError("API key for Gemini not configured.")
+
+    client = get_gemini_client()
+    budget = limiter.new_budget()
+    while True:
+        # Retries are only possible before the first fragment has been handed to the caller
+        async with limiter.slot():
+            request = client.build_request(
+                "POST",
+                f"{model_url('streamGenerateContent', model=model)}?alt=sse&key={api_key}",
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                timeout=task_timeout(task),
+            )
+            try:
+                res = await client.send(request, stream=True)
+            except RETRYABLE_EXCEPTIONS as e:
+                delay = _retry_delay(budget, task, None, repr(e))
+                if delay is None:
+                    raise
+            else:
+                limiter.record(res.status_code)
+                delay = None
+                if res.status_code in RETRYABLE_STATUS_CODES:
+                    delay = _retry_delay(budget, task, res.headers.get("Retry-After"), str(res.status_code))
+                try:
+                    if delay is None:
+                        if res.is_error:
+                            await res.aread() # So HTTPStatusError handlers can log the body
+                        res.raise_for_status()
+                        async for line in res.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            chunk = json.loads(line[len("data:"):])
+                            try:
+                                text = extract_text(chunk)
+                            except (KeyError, IndexError, TypeError):
+                                continue # e.g. the final chunk only carries finishReason / usage metadata
+                            if text:
+                                yield text
+                        return
+                finally:
+                    await res.aclose()
+        await asyncio.sleep(delay)
+
+
+async def stream_text(prompt: str, task: str = "default", use_cache: bool = True) -> AsyncIterator[str]:
+    """Streaming counterpart of generate_text that shares its cache entries.
+
+    A cached answer is replayed as a single fragment; a streamed answer is cached once complete.
+    """
+    payload = build_payload(prompt)
+    model = settings.GEMINI_MODEL
+    cache_key = None
+    if use_cache and llm_cache.task_ttl_seconds(task) is not None:
+        cache_key = llm_cache.make_cache_key(model, task, payload)
+        cached_text = await llm_cache.get_cached_response(cache_key, task)
+        if cached_text is not None:
+            yield cached_text
+            return
+
+    fragments = []
+    async for fragment in stream_generate_content(payload, task=task, model=model):
+        fragments.append(fragment)
+        yield fragment
+
+    full_text = "".join(fragments)
+    if cache_key is not None and full_text.strip():
+        await llm_cache.store_response(cache_key, task, model, full_text)
+
+
+async def _cached_contents_request(method: str, path: str, payload: Optional[dict] = None, params: Optional[dict] = None) -> dict:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("API key for Gemini not configured.")
+    async with limiter.slot():
+        res = await get_gemini_client().request(
+            method,
+            f"{settings.GEMINI_API_BASE_URL}/{path}",
+            params={**(params or {}), "key": api_key},
+            json=payload,
+            timeout=task_timeout("default"),
+        )
+        limiter.record(res.status_code)
+    res.raise_for_status()
+    return res.json() if res.content else {}
+
+
+async def create_cached_content(
+    contents: list, system_instruction: Optional[str], ttl_seconds: int, model: Optional[str] = None
+) -> dict:
+    """Upload reusable prompt context (Gemini cachedContents). Returns the resource, whose "name" later
+    requests pass as "cachedContent" instead of resending the contents."""
+    payload = {
+        "model": f"models/{model or settings.GEMINI_MODEL}",
+        "contents": contents,
+        "ttl": f"{ttl_seconds}s",
+    }
+    if system_instruction:
+        payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+    return await _cached_contents_request("POST", "cachedContents", payload)
+
+
+async def update_cached_content_ttl(name: str, ttl_seconds: int) -> dict:
+    return await _cached_contents_request("PATCH", name, {"ttl": f"{ttl_seconds}s"}, params={"updateMask": "ttl"})
+
+
+async def delete_cached_content(name: str) -> None:
+    await _cached_contents_request("DELETE", name)
+
+
+def build_cached_payload(cached_content: str, prompt: str, generation_config: Optional[dict] = None) -> dict:
+    """generateContent body that continues from a cachedContents resource."""
+    payload = build_payload(prompt, generation_config)
+    payload["cachedContent"] = cached_content
+    payload["contents"][0]["role"] = "user"
+    return payload
+
+
+def get_in_flight_stats() -> dict:
+    return _in_flight.stats()
@@ -0,0 +1,173 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+# Upstream answers that mean "slow down and try again"
+RETRYABLE_STATUS_CODES = {429, 503}
+OVERLOAD_STATUS_CODES = {429, 503}
+# Failures where the request never reached Gemini, so retrying is always safe
+RETRYABLE_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        # The lock makes waiters queue in FIFO order instead of racing for each new token
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: +1 per window of successes, halved on overload responses."""
+
+    def __init__(self, initial: float, minimum: float, maximum: float, decrease_factor: float):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / max(self.limit, 1))
+
+    def on_overload(self) -> None:
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+class RetryBudget:
+    """Per-request retry allowance: a maximum number of attempts and of total backoff time."""
+
+    def __init__(self, max_attempts: int, max_total_delay: float, base_delay: float, max_delay: float):
+        self.max_attempts = max_attempts
+        self.remaining_delay = max_total_delay
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = 1
+
+    def next_delay(self, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when the budget is spent."""
+        if self.attempts >= self.max_attempts:
+            return None
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (self.attempts - 1)))
+        if delay > self.remaining_delay:
+            return None
+        self.attempts += 1
+        self.remaining_delay -= delay
+        return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as delta-seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class GeminiLimiter:
+    """Shared outbound limiter for every Gemini call made by this worker."""
+
+    def __init__(self):
+        per_worker_rpm = settings.GEMINI_QUOTA_RPM / max(settings.GEMINI_QUOTA_WORKERS, 1)
+        self.bucket = TokenBucket(rate=per_worker_rpm / 60.0, capacity=settings.GEMINI_RATE_LIMIT_BURST)
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial=settings.GEMINI_MAX_CONCURRENCY,
+            minimum=settings.GEMINI_MIN_CONCURRENCY,
+            maximum=settings.GEMINI_MAX_CONCURRENCY,
+            decrease_factor=settings.GEMINI_CONCURRENCY_DECREASE_FACTOR,
+        )
+        self.retries = 0
+        self.overloads = 0
+        self.exhausted = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a concurrency slot and spend one rate-limit token for a single upstream attempt."""
+        async with self.concurrency.slot():
+            await self.bucket.acquire()
+            yield
+
+    def record(self, status_code: int) -> None:
+        if status_code in OVERLOAD_STATUS_CODES:
+            self.overloads += 1
+            self.concurrency.on_overload()
+        elif status_code < 500:
+            self.concurrency.on_success()
+
+    def new_budget(self) -> RetryBudget:
+        return RetryBudget(
+            max_attempts=settings.GEMINI_RETRY_MAX_ATTEMPTS,
+            max_total_delay=settings.GEMINI_RETRY_BUDGET_SECONDS,
+            base_delay=settings.GEMINI_RETRY_BASE_DELAY_SECONDS,
+            max_delay=settings.GEMINI_RETRY_MAX_DELAY_SECONDS,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting,
+            "tokens_available": round(self.bucket.tokens, 2),
+            "overload_responses": self.overloads,
+            "retries": self.retries,
+            "retry_budget_exhausted": self.exhausted,
+        }
+
+
+limiter = GeminiLimiter()
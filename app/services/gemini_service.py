@@ -1,53 +1,165 @@
-import os
+import asyncio
 import httpx
 import json # Added
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from loguru import logger # Added
+from app.core.config import settings
 from app.schemas.prompts import PromptOutput
+from app.services import context_cache
+from app.services.gemini_client import (
+    build_cached_payload,
+    build_payload,
+    generate_content,
+    generate_text,
+    stream_generate_content,
+    stream_text,
+)
+from app.services.readability import analyze_text
+
+def rsvp_text_prompt(topic: str) -> str:
+    return (
+        f"Escribe un texto informativo extenso pero claro sobre el siguiente tema, "
+        f"dirigido a lectores entre 15-20 años. Usa lenguaje sencillo, 3 párrafos como máximo. Tema: {topic}"
+    )
+
+RSVP_BUNDLE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "text": {"type": "STRING"},
+        "questions": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "question_text": {"type": "STRING"},
+                    "question_type": {"type": "STRING", "enum": ["multiple_choice", "open_ended"]},
+                    "options": {"type": "ARRAY", "items": {"type": "STRING"}, "nullable": True},
+                    "correct_answer": {"type": "STRING"},
+                    "explanation": {"type": "STRING", "nullable": True},
+                },
+                "required": ["question_text", "question_type", "correct_answer"],
+            },
+        },
+        "assessment": {
+            "type": "OBJECT",
+            "properties": {
+                "ideal_time_seconds": {"type": "INTEGER"},
+                "difficulty": {"type": "STRING", "enum": ["easy", "medium", "hard"]},
+            },
+            "required": ["ideal_time_seconds", "difficulty"],
+        },
+    },
+    "required": ["text", "questions", "assessment"],
+}
+
+def rsvp_bundle_prompt(topic: str, num_questions: int = 5, num_mc_options: int = 4) -> str:
+    return f"""
+    {rsvp_text_prompt(topic)}
+
+    Then, based only on the text you wrote, also return:
+    - "questions": {num_questions} distinct quiz questions testing different aspects of the text, mixing
+      "multiple_choice" (with {num_mc_options} "options" and the exact correct option as "correct_answer")
+      and "open_ended" (with a concise model answer as "correct_answer") questions, each with an optional
+      brief "explanation". Write the questions in the same language as the text.
+    - "assessment": the ideal reading time in seconds for an average young adult ("ideal_time_seconds")
+      and the text difficulty ("difficulty": "easy", "medium" or "hard").
+
+    Put the full text in "text".
+    """
 
-GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+async def ask_gemini(prompt: str, task: str = "analysis") -> str:
+    # Goes through the shared, pooled Gemini client; raises HTTPStatusError for bad responses
+    return await generate_text(prompt, task=task)
 
-async def ask_gemini(prompt: str, model_url: str = GEMINI_URL) -> str: # Added model_url parameter
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}]
+def _analysis_prompts(text: str) -> Dict[str, str]:
+    return {
+        "summary": f"Resume este texto:\n{text}",
+        "explanation": f"Explica este texto detalladamente:\n{text}",
+        "questions": f"Genera exactamente 5 preguntas tipo test con 4 alternativas cada una (A, B, C, D) basadas en este texto. Numera las preguntas del 1 al 5. Indica claramente cuál es la alternativa correcta para cada pregunta. Formato deseado: Pregunta, seguido de las alternativas, seguido de la respuesta correcta.\nTexto:\n{text}",
+        "glossary": f"Extrae exactamente 5 palabras o términos clave de este texto que podrían ser difíciles de entender para un joven de 15-20 años. Para cada palabra/término, proporciona una breve explicación de su significado en el contexto del texto. Formato deseado: 'Palabra/Término: Explicación.'\nTexto:\n{text}",
+    }
+
+def _parse_analysis_section(section: str, raw: str) -> Any:
+    if section == "questions":
+        return [q.strip() for q in raw.split("\n") if q.strip()]
+    if section == "glossary":
+        return {str(i+1): item.strip() for i, item in enumerate(raw.split("\n")) if item.strip()}
+    return raw.strip()
+
+# Shared by every analysis request on this worker, so concurrent requests cannot multiply the fan-out
+_analysis_semaphore = asyncio.Semaphore(settings.ANALYSIS_MAX_CONCURRENCY)
+
+async def _run_analysis_section(section: str, prompt: str) -> Tuple[str, Any]:
+    async with _analysis_semaphore:
+        raw = await ask_gemini(prompt)
+    return section, _parse_analysis_section(section, raw)
+
+def _start_analysis_tasks(text: str) -> Dict[asyncio.Task, str]:
+    # The four prompts are independent; run them concurrently
+    return {
+        asyncio.create_task(_run_analysis_section(section, prompt)): section
+        for section, prompt in _analysis_prompts(text).items()
     }
-    api_key = os.getenv('GEMINI_API_KEY')
-    if not api_key:
-        logger.error("GEMINI_API_KEY not found in ask_gemini.")
-        raise ValueError("API key for Gemini not configured.")
-
-    async with httpx.AsyncClient(timeout=60.0) as client: # General timeout for ask_gemini
-        res = await client.post(
-            f"{model_url}?key={api_key}",
-            headers={"Content-Type": "application/json"},
-            json=payload
-        )
-        res.raise_for_status() # Raise HTTPStatusError for bad responses
-        data = res.json()
-        # Log the full response for debugging if needed, then extract text
-        # logger.debug(f"Full Gemini response from ask_gemini: {data}")
-        return data["candidates"][0]["content"]["parts"][0]["text"]
 
 async def generate_results_from_text(text: str) -> PromptOutput:
-    # Using GEMINI_PRO_URL for potentially more complex generation tasks if needed, or stick to GEMINI_URL
-    # For now, using the default GEMINI_URL as passed by ask_gemini's default
-    summary_prompt = f"Resume este texto:\n{text}"
-    explanation_prompt = f"Explica este texto detalladamente:\n{text}"
-    questions_prompt = f"Genera exactamente 5 preguntas tipo test con 4 alternativas cada una (A, B, C, D) basadas en este texto. Numera las preguntas del 1 al 5. Indica claramente cuál es la alternativa correcta para cada pregunta. Formato deseado: Pregunta, seguido de las alternativas, seguido de la respuesta correcta.\nTexto:\n{text}"
-    glossary_prompt = f"Extrae exactamente 5 palabras o términos clave de este texto que podrían ser difíciles de entender para un joven de 15-20 años. Para cada palabra/término, proporciona una breve explicación de su significado en el contexto del texto. Formato deseado: 'Palabra/Término: Explicación.'\nTexto:\n{text}"
-
-    summary = await ask_gemini(summary_prompt)
-    explanation = await ask_gemini(explanation_prompt)
-    questions_text = await ask_gemini(questions_prompt) # Renamed to avoid conflict
-    glossary_text = await ask_gemini(glossary_prompt)   # Renamed to avoid conflict
-
-    return PromptOutput(
-        summary=summary.strip(),
-        explanation=explanation.strip(),
-        questions=[q.strip() for q in questions_text.split("\n") if q.strip()],
-        glossary={str(i+1): item.strip() for i, item in enumerate(glossary_text.split("\n")) if item.strip()}
-    )
+    tasks = _start_analysis_tasks(text)
+    try:
+        results = dict(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+    return PromptOutput(**results)
+
+async def iter_analysis_sections(text: str) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield (section, content) pairs as each analysis prompt completes.
+
+    A failed section is yielded as ("error", {"section": ..., "detail": ...}) so the others still arrive.
+    Pending prompts are cancelled if the consumer stops early (e.g. the client disconnects).
+    """
+    sections = _start_analysis_tasks(text)
+    pending = set(sections)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    logger.error(f"Analysis section '{sections[task]}' failed: {task.exception()}")
+                    yield "error", {"section": sections[task], "detail": "Error communicating with AI service."}
+                    continue
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+def parse_assessment(parsed_data: dict) -> dict:
+    """Normalize Gemini's {"ideal_time_seconds", "difficulty"} object into the RsvpSession field values."""
+    assessment_results = {"ideal_time_seconds": None, "difficulty": "unknown"}
+    if "ideal_time_seconds" in parsed_data and "difficulty" in parsed_data:
+        assessment_results["ideal_time_seconds"] = int(parsed_data["ideal_time_seconds"]) if parsed_data["ideal_time_seconds"] is not None else None
+        raw_difficulty = parsed_data["difficulty"].lower()
+        assessment_results["difficulty"] = raw_difficulty if raw_difficulty in ["easy", "medium", "hard"] else "unknown"
+    else:
+        logger.warning(f"Gemini assessment output missing expected keys: {parsed_data}")
+    return assessment_results
 
 async def assess_text_parameters(text_content: str) -> dict:
+    """Estimate ideal reading time and difficulty.
+
+    Uses the local readability engine unless ASSESSMENT_USE_LLM is set; in that case Gemini is
+    asked and the local result is logged next to it (for calibrating the WPM bands and thresholds)
+    and used as the fallback when Gemini fails.
+    """
+    local_results = analyze_text(text_content)
+    if not settings.ASSESSMENT_USE_LLM:
+        return {"ideal_time_seconds": local_results["ideal_time_seconds"], "difficulty": local_results["difficulty"]}
+
+    llm_results = await _assess_text_parameters_with_llm(text_content)
+    logger.info(f"Text assessment calibration: llm={llm_results} local={local_results}")
+    if llm_results["ideal_time_seconds"] is None or llm_results["difficulty"] == "unknown":
+        return {"ideal_time_seconds": local_results["ideal_time_seconds"], "difficulty": local_results["difficulty"]}
+    return llm_results
+
+async def _assess_text_parameters_with_llm(text_content: str) -> dict:
     max_chars_for_assessment = 10000 # Example limit
     if len(text_content) > max_chars_for_assessment:
         text_content_for_assessment = text_content[:max_chars_for_assessment] + "..."
@@ -72,27 +184,11 @@ async def assess_text_parameters(text_content: str) -> dict:
     {text_content_for_assessment}
     ---
     """
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
     assessment_results = {"ideal_time_seconds": None, "difficulty": "unknown"}
     json_text_response = "" # Initialize for logging
 
     try:
-        gemini_endpoint_url = GEMINI_URL # Using Gemini Pro for this analysis
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            logger.error("GEMINI_API_KEY not found for text assessment.")
-            return assessment_results
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            res = await client.post(
-                f"{gemini_endpoint_url}?key={api_key}",
-                headers={"Content-Type": "application/json"},
-                json=payload
-            )
-            res.raise_for_status()
-
-        response_data = res.json()
-        json_text_response = response_data["candidates"][0]["content"]["parts"][0]["text"]
+        json_text_response = await generate_text(prompt, task="assessment")
 
         if "```json" in json_text_response:
             json_text_response = json_text_response.split("```json")[1].split("```")[0].strip()
@@ -108,12 +204,7 @@ async def assess_text_parameters(text_content: str) -> dict:
         logger.info(f"Cleaned Gemini JSON response for text assessment: {json_text_response}")
         parsed_data = json.loads(json_text_response)
 
-        if "ideal_time_seconds" in parsed_data and "difficulty" in parsed_data:
-            assessment_results["ideal_time_seconds"] = int(parsed_data["ideal_time_seconds"]) if parsed_data["ideal_time_seconds"] is not None else None
-            raw_difficulty = parsed_data["difficulty"].lower()
-            assessment_results["difficulty"] = raw_difficulty if raw_difficulty in ["easy", "medium", "hard"] else "unknown"
-        else:
-            logger.warning(f"Gemini assessment output missing expected keys: {parsed_data}")
+        assessment_results = parse_assessment(parsed_data)
 
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error calling Gemini for text assessment: {e.response.status_code} - {e.response.text}")
@@ -125,7 +216,20 @@ async def assess_text_parameters(text_content: str) -> dict:
     return assessment_results
 
 
-async def get_contextual_assistant_response(query: str, context_text: str) -> str:
+# Messages returned in place of an answer when the assistant call fails
+ASSISTANT_UNAVAILABLE = "Sorry, I couldn't process your request at the moment."
+ASSISTANT_UNEXPECTED_RESPONSE = "Sorry, I received an unexpected response from the AI."
+ASSISTANT_HTTP_ERROR = "Error communicating with AI service."
+ASSISTANT_PARSE_ERROR = "Error processing AI response."
+ASSISTANT_NOT_CONFIGURED = "Error: AI service is not configured."
+ASSISTANT_UNEXPECTED_ERROR = "An unexpected error occurred."
+ASSISTANT_FAILURE_RESPONSES = frozenset({
+    ASSISTANT_UNAVAILABLE, ASSISTANT_UNEXPECTED_RESPONSE, ASSISTANT_HTTP_ERROR,
+    ASSISTANT_PARSE_ERROR, ASSISTANT_NOT_CONFIGURED, ASSISTANT_UNEXPECTED_ERROR,
+})
+
+
+def _assistant_prompt(query: str, context_text: str, history: Optional[str] = None) -> str:
     # Basic check for context length if needed, similar to assess_text_parameters
     max_context_chars = 15000 # Example limit for context + query
 
@@ -146,37 +250,62 @@ async def get_contextual_assistant_response(query: str, context_text: str) -> st
     ---
     {context_text_for_prompt}
     ---
-
+    {_history_section(history)}
     User's Query: "{query}"
 
     Answer:
     """
+    return prompt
+
 
-    # Using the generic ask_gemini function if it's suitable, or make a direct call
-    # Assuming ask_gemini is refactored to take a model_url or uses a general one.
-    # For simplicity, let's use the direct call pattern here if ask_gemini isn't perfectly matched.
+def _history_section(history: Optional[str]) -> str:
+    if not history:
+        return ""
+    return f"\nConversation so far (use it to resolve references like \"it\" or \"the previous answer\"):\n{history}\n"
 
-    gemini_endpoint_url = GEMINI_URL # Using Gemini Pro for assistant
-    api_key = os.getenv("GEMINI_API_KEY")
 
-    if not api_key:
-        logger.error("GEMINI_API_KEY not found for assistant.")
-        return "Error: AI service is not configured."
+def _assistant_query_prompt(query: str, history: Optional[str] = None) -> str:
+    # Follow-up turn for a cachedContent that already holds the instructions and the context text
+    return f'{_history_section(history)}User\'s Query: "{query}"\n\nAnswer:'
 
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    ai_response_text = "Sorry, I couldn't process your request at the moment."
+
+# Inline context for the assistant: the text itself, or a function producing it only when needed
+ContextSource = Union[str, Callable[[], Awaitable[str]]]
+
+
+async def _inline_context(context_text: ContextSource) -> str:
+    return context_text if isinstance(context_text, str) else await context_text()
+
+
+async def _generate_assistant_content(
+    query: str, context_text: ContextSource, cached_content: Optional[str], history: Optional[str]
+) -> dict:
+    if cached_content:
+        try:
+            return await generate_content(build_cached_payload(cached_content, _assistant_query_prompt(query, history)), task="assistant")
+        except httpx.HTTPStatusError as e:
+            if not context_cache.is_stale_handle_error(e):
+                raise
+            logger.warning(f"Cached context {cached_content} rejected ({e.response.status_code}); sending context inline.")
+            context_cache.invalidate(cached_content)
+    context_text = await _inline_context(context_text)
+    return await generate_content(build_payload(_assistant_prompt(query, context_text, history)), task="assistant")
+
+
+async def get_contextual_assistant_response(
+    query: str, context_text: ContextSource, cached_content: Optional[str] = None, history: Optional[str] = None
+) -> str:
+    """Answer `query` from `context_text`, or from the cachedContent holding the session text when given.
+
+    context_text is still required with a cached_content: it is sent inline if Gemini no longer knows the
+    handle. It may be a coroutine function, so that inline context is only built in that case.
+    history is the thread's summary and recent turns, already trimmed to its token budget.
+    """
+    ai_response_text = ASSISTANT_UNAVAILABLE
     response_data_for_logging = None
 
     try:
-        async with httpx.AsyncClient(timeout=45.0) as client: # Timeout for assistant response
-            res = await client.post(
-                f"{gemini_endpoint_url}?key={api_key}",
-                headers={"Content-Type": "application/json"},
-                json=payload
-            )
-            res.raise_for_status()
-
-        response_data_for_logging = res.json()
+        response_data_for_logging = await _generate_assistant_content(query, context_text, cached_content, history)
         # Ensure "candidates" and parts exist before accessing
         if response_data_for_logging.get("candidates") and \
            response_data_for_logging["candidates"][0].get("content") and \
@@ -184,16 +313,83 @@ async def get_contextual_assistant_response(query: str, context_text: str) -> st
             ai_response_text = response_data_for_logging["candidates"][0]["content"]["parts"][0]["text"].strip()
         else:
             logger.warning(f"Unexpected Gemini response structure for assistant: {response_data_for_logging}")
-            ai_response_text = "Sorry, I received an unexpected response from the AI."
+            ai_response_text = ASSISTANT_UNEXPECTED_RESPONSE
 
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error calling Gemini for assistant: {e.response.status_code} - {e.response.text}")
-        ai_response_text = "Error communicating with AI service."
+        ai_response_text = ASSISTANT_HTTP_ERROR
     except (KeyError, IndexError, json.JSONDecodeError) as e: # Added JSONDecodeError just in case
         logger.error(f"Error processing Gemini response for assistant: {e}. Response: {response_data_for_logging if response_data_for_logging else 'N/A'}")
-        ai_response_text = "Error processing AI response."
+        ai_response_text = ASSISTANT_PARSE_ERROR
+    except ValueError as e:
+        logger.error(f"AI assistant is not configured: {e}")
+        ai_response_text = ASSISTANT_NOT_CONFIGURED
     except Exception as e:
         logger.error(f"Unexpected error in assistant response generation: {e}")
-        ai_response_text = "An unexpected error occurred."
+        ai_response_text = ASSISTANT_UNEXPECTED_ERROR
 
     return ai_response_text
+
+
+async def _stream_assistant_fragments(
+    query: str, context_text: ContextSource, cached_content: Optional[str], history: Optional[str]
+) -> AsyncIterator[str]:
+    if cached_content:
+        payload = build_cached_payload(cached_content, _assistant_query_prompt(query, history))
+        try:
+            # Status errors are raised before the first fragment, so falling back cannot duplicate output
+            async for fragment in stream_generate_content(payload, task="assistant"):
+                yield fragment
+            return
+        except httpx.HTTPStatusError as e:
+            if not context_cache.is_stale_handle_error(e):
+                raise
+            logger.warning(f"Cached context {cached_content} rejected ({e.response.status_code}); sending context inline.")
+            context_cache.invalidate(cached_content)
+    context_text = await _inline_context(context_text)
+    async for fragment in stream_text(_assistant_prompt(query, context_text, history), task="assistant"):
+        yield fragment
+
+
+async def stream_contextual_assistant_response(
+    query: str, context_text: ContextSource, cached_content: Optional[str] = None, history: Optional[str] = None
+) -> AsyncIterator[Tuple[str, str]]:
+    """Streaming variant of get_contextual_assistant_response.
+
+    Yields ("delta", text) fragments as Gemini produces them. Failures are reported as a final
+    ("error", message) pair carrying the same messages the non-streaming function returns.
+    """
+    try:
+        async for fragment in _stream_assistant_fragments(query, context_text, cached_content, history):
+            yield "delta", fragment
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error streaming Gemini for assistant: {e.response.status_code} - {e.response.text}")
+        yield "error", ASSISTANT_HTTP_ERROR
+    except json.JSONDecodeError as e:
+        logger.error(f"Error processing Gemini stream for assistant: {e}")
+        yield "error", ASSISTANT_PARSE_ERROR
+    except ValueError as e:
+        logger.error(f"AI assistant is not configured: {e}")
+        yield "error", ASSISTANT_NOT_CONFIGURED
+    except Exception as e:
+        logger.error(f"Unexpected error in assistant response streaming: {e}")
+        yield "error", ASSISTANT_UNEXPECTED_ERROR
+
+
+async def summarize_conversation(previous_summary: str, turns: List[Dict[str, str]], max_words: int) -> str:
+    """Fold older assistant turns into the thread's running summary. Raises on Gemini errors."""
+    exchanges = "\n".join(f"User: {turn['query']}\nAssistant: {turn['response']}" for turn in turns)
+    prompt = f"""
+    Update the running summary of a conversation between a student and a reading assistant.
+    Keep what the student asked about, what was answered and any facts later questions may refer to.
+    Write at most {max_words} words, in the language of the conversation, as plain text.
+
+    Current summary:
+    {previous_summary or "(empty)"}
+
+    New exchanges:
+    {exchanges}
+
+    Updated summary:
+    """
+    return (await generate_text(prompt, task="assistant_summary")).strip()
@@ -0,0 +1,267 @@
+import asyncio
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from loguru import logger
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.job import Job
+
+JobHandler = Callable[[Job], Awaitable[dict]]
+
+TERMINAL_STATUSES = {"succeeded", "failed"}
+_WAIT_POLL_SECONDS = 0.5
+
+_handlers: Dict[str, JobHandler] = {}
+_worker_tasks: List[asyncio.Task] = []
+_stats = {"claimed": 0, "succeeded": 0, "retried": 0, "failed": 0, "lease_lost": 0, "joined_inline": 0, "joined_in_backoff": 0}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed (e.g. its session was deleted)."""
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register `fn(job) -> result dict` as the handler for jobs of `kind`."""
+    def register(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+async def enqueue_job(kind: str, payload: dict, user_id: Optional[str] = None, dedupe_key: Optional[str] = None) -> Job:
+    """Insert a queued job, or return the queued/running job that already holds `dedupe_key`."""
+    job = Job(
+        kind=kind,
+        payload=payload,
+        user_id=user_id,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        dedupe_key=dedupe_key,
+        active_key=dedupe_key,
+    )
+    try:
+        await job.insert()
+    except DuplicateKeyError:
+        existing = await Job.find_one(Job.active_key == dedupe_key)
+        if existing is not None:
+            return existing
+        # The active job finished between our insert and lookup; the key is free again
+        job.id = None
+        await job.insert()
+    logger.info(f"Enqueued {kind} job {job.id} (dedupe key: {dedupe_key})")
+    return job
+
+
+def _retry_delay(attempts: int) -> float:
+    # Exponential backoff with jitter so a failing upstream isn't hammered by every worker at once
+    delay = min(settings.JOB_RETRY_MAX_DELAY_SECONDS, settings.JOB_RETRY_BASE_DELAY_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def claim_job(worker_id: str, job_id: Optional[ObjectId] = None) -> Optional[Job]:
+    """Atomically lease the oldest due job (or `job_id` only): a queued one, or a running one whose worker stopped heartbeating."""
+    now = datetime.utcnow()
+    claimable = {
+        "$or": [
+            {"status": "queued", "run_after": {"$lte": now}},
+            {"status": "running", "lease_expires_at": {"$lt": now}},
+        ]
+    }
+    if job_id is not None:
+        claimable["_id"] = job_id
+    document = await Job.get_motor_collection().find_one_and_update(
+        claimable,
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("run_after", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is None:
+        return None
+    _stats["claimed"] += 1
+    return Job.model_validate(document)
+
+
+async def _update_owned(job: Job, worker_id: str, update: dict) -> bool:
+    """Apply `update` only while this worker still holds the job's lease."""
+    result = await Job.get_motor_collection().update_one(
+        {"_id": job.id, "status": "running", "worker_id": worker_id},
+        update,
+    )
+    return result.modified_count == 1
+
+
+async def _heartbeat(job: Job, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        now = datetime.utcnow()
+        extended = await _update_owned(job, worker_id, {
+            "$set": {"lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS), "updated_at": now}
+        })
+        if not extended:
+            logger.warning(f"Worker {worker_id} lost the lease on job {job.id}")
+            return
+
+
+async def _finish(job: Job, worker_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+    now = datetime.utcnow()
+    updated = await _update_owned(job, worker_id, {
+        "$set": {
+            "status": status,
+            "result": result,
+            "error": error,
+            "lease_expires_at": None,
+            "updated_at": now,
+            "finished_at": now,
+        },
+        "$unset": {"active_key": ""},
+    })
+    if not updated:
+        _stats["lease_lost"] += 1
+        logger.warning(f"Job {job.id} finished as {status} on {worker_id} after its lease was taken over; result dropped")
+
+
+async def _retry_later(job: Job, worker_id: str, error: str) -> None:
+    now = datetime.utcnow()
+    await _update_owned(job, worker_id, {
+        "$set": {
+            "status": "queued",
+            "error": error,
+            "worker_id": None,
+            "lease_expires_at": None,
+            "run_after": now + timedelta(seconds=_retry_delay(job.attempts)),
+            "updated_at": now,
+        }
+    })
+
+
+async def run_job(job: Job, worker_id: str) -> None:
+    handler = _handlers.get(job.kind)
+    if handler is None:
+        logger.error(f"No handler registered for job {job.id} of kind '{job.kind}'")
+        await _finish(job, worker_id, "failed", error=f"Unknown job kind '{job.kind}'")
+        _stats["failed"] += 1
+        return
+    if job.attempts > job.max_attempts:
+        # Its previous worker died mid-run once too often
+        await _finish(job, worker_id, "failed", error=job.error or "Lease expired too many times")
+        _stats["failed"] += 1
+        return
+
+    heartbeat = asyncio.create_task(_heartbeat(job, worker_id))
+    started = time.monotonic()
+    try:
+        result = await handler(job)
+    except PermanentJobError as e:
+        logger.warning(f"Job {job.id} ({job.kind}) failed permanently: {e}")
+        await _finish(job, worker_id, "failed", error=str(e))
+        _stats["failed"] += 1
+    except Exception as e:
+        if job.attempts < job.max_attempts:
+            logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, will retry: {e}")
+            await _retry_later(job, worker_id, str(e))
+            _stats["retried"] += 1
+        else:
+            logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {e}", exc_info=True)
+            await _finish(job, worker_id, "failed", error=str(e))
+            _stats["failed"] += 1
+    else:
+        await _finish(job, worker_id, "succeeded", result=result)
+        _stats["succeeded"] += 1
+        logger.info(f"Job {job.id} ({job.kind}) succeeded in {time.monotonic() - started:.2f}s")
+    finally:
+        heartbeat.cancel()
+
+
+async def process_next_job(worker_id: str) -> bool:
+    """Claim and run one job. Returns False when nothing was due."""
+    job = await claim_job(worker_id)
+    if job is None:
+        return False
+    await run_job(job, worker_id)
+    return True
+
+
+async def _worker_loop(worker_id: str) -> None:
+    while True:
+        try:
+            if await process_next_job(worker_id):
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job worker {worker_id} iteration failed: {e}")
+        await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+
+
+def start_job_worker() -> None:
+    if not settings.JOB_WORKER_ENABLED or _worker_tasks:
+        return
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for n in range(settings.JOB_WORKER_CONCURRENCY):
+        _worker_tasks.append(asyncio.create_task(_worker_loop(f"{prefix}:{n}")))
+
+
+async def stop_job_worker() -> None:
+    for task in _worker_tasks:
+        task.cancel()
+    # A job interrupted here is picked up again by another worker once its lease expires
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
+
+
+async def get_job(job_id: str) -> Optional[Job]:
+    if not ObjectId.is_valid(job_id):
+        return None
+    return await Job.get(job_id)
+
+
+async def wait_for_job(job_id: str, timeout: float) -> Optional[Job]:
+    """Long-poll: return the job once it reaches a terminal status or `timeout` seconds have passed."""
+    deadline = time.monotonic() + timeout
+    job = await get_job(job_id)
+    while job is not None and job.status not in TERMINAL_STATUSES and time.monotonic() < deadline:
+        await asyncio.sleep(min(_WAIT_POLL_SECONDS, max(deadline - time.monotonic(), 0)))
+        job = await get_job(job_id)
+    return job
+
+
+async def join_job(job: Job, timeout: float) -> Optional[Job]:
+    """Wait for `job` on behalf of a request, running it inline if no worker has picked it up yet.
+
+    Returns at once, with the job still queued, when it is waiting out a retry backoff: nothing will
+    run it before `run_after`, so waiting would only burn the caller's timeout.
+    """
+    if job.status not in TERMINAL_STATUSES:
+        claimed = await claim_job(f"{socket.gethostname()}:{os.getpid()}:request", job.id)
+        if claimed is not None:
+            _stats["joined_inline"] += 1
+            await run_job(claimed, claimed.worker_id)
+        current = await get_job(str(job.id))
+        if current is not None and current.status == "queued" and current.run_after > datetime.utcnow():
+            _stats["joined_in_backoff"] += 1
+            return current
+    return await wait_for_job(str(job.id), timeout)
+
+
+async def get_job_stats() -> dict:
+    rows = await Job.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list()
+    return {
+        "workers": len(_worker_tasks),
+        "by_status": {row["_id"]: row["count"] for row in rows},
+        **_stats,
+    }
@@ -0,0 +1,111 @@
+import copy
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from beanie.odm.operators.update.general import Set
+from loguru import logger
+
+from app.core.config import settings
+from app.models.llm_cache_entry import LlmCacheEntry
+from app.utils.lru import TTLLRUCache
+from app.utils.text import normalize_whitespace, sha256_hex
+
+# Cache TTL per Gemini task, in seconds. None means the task is always sent upstream.
+TASK_CACHE_TTL_SECONDS: Dict[str, Optional[int]] = {
+    "default": None,
+    "analysis": 7 * 24 * 3600,
+    "assessment": 30 * 24 * 3600,
+    "assistant": None,
+    "assistant_summary": None,
+    "quiz_generation": 7 * 24 * 3600,
+    "quiz_evaluation": 7 * 24 * 3600,
+    "rsvp": 24 * 3600,
+    "rsvp_bundle": 24 * 3600,
+}
+
+_memory_cache = TTLLRUCache(
+    maxsize=settings.LLM_CACHE_MEMORY_MAXSIZE,
+    ttl_seconds=settings.LLM_CACHE_MEMORY_TTL_SECONDS,
+)
+_stats: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0}
+)
+
+
+def task_ttl_seconds(task: str) -> Optional[int]:
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    return TASK_CACHE_TTL_SECONDS.get(task, TASK_CACHE_TTL_SECONDS["default"])
+
+
+def _normalize_payload(payload: dict) -> dict:
+    normalized = copy.deepcopy(payload)
+    for content in normalized.get("contents", []):
+        for part in content.get("parts", []):
+            if isinstance(part.get("text"), str):
+                part["text"] = normalize_whitespace(part["text"])
+    return normalized
+
+
+def make_cache_key(model: str, task: str, payload: dict) -> str:
+    canonical = json.dumps(_normalize_payload(payload), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return sha256_hex(f"{model}\n{task}\n{canonical}")
+
+
+async def get_cached_response(key: str, task: str) -> Optional[str]:
+    text = _memory_cache.get(key)
+    if text is not None:
+        _stats[task]["memory_hits"] += 1
+        return text
+
+    if settings.LLM_CACHE_PERSISTENT:
+        try:
+            entry = await LlmCacheEntry.find_one(LlmCacheEntry.key == key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed for task '{task}': {e}")
+            entry = None
+        # The TTL monitor only runs periodically, so expired documents can still be returned
+        if entry is not None and entry.expires_at > datetime.utcnow():
+            remaining = (entry.expires_at - datetime.utcnow()).total_seconds()
+            _memory_cache.set(key, entry.response_text, ttl_seconds=min(remaining, settings.LLM_CACHE_MEMORY_TTL_SECONDS))
+            _stats[task]["mongo_hits"] += 1
+            return entry.response_text
+
+    _stats[task]["misses"] += 1
+    return None
+
+
+async def store_response(key: str, task: str, model: str, text: str) -> None:
+    ttl = task_ttl_seconds(task)
+    if ttl is None:
+        return
+    _memory_cache.set(key, text, ttl_seconds=min(ttl, settings.LLM_CACHE_MEMORY_TTL_SECONDS))
+    _stats[task]["stores"] += 1
+
+    if settings.LLM_CACHE_PERSISTENT:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        try:
+            await LlmCacheEntry.find_one(LlmCacheEntry.key == key).upsert(
+                Set({LlmCacheEntry.response_text: text, LlmCacheEntry.expires_at: expires_at}),
+                on_insert=LlmCacheEntry(
+                    key=key, task=task, model=model, response_text=text, created_at=now, expires_at=expires_at
+                ),
+            )
+        except Exception as e:
+            logger.warning(f"LLM cache write failed for task '{task}': {e}")
+
+
+def clear_memory_cache() -> None:
+    _memory_cache.clear()
+
+
+def get_cache_stats() -> dict:
+    tasks = {}
+    for task, counters in _stats.items():
+        hits = counters["memory_hits"] + counters["mongo_hits"]
+        lookups = hits + counters["misses"]
+        tasks[task] = {**counters, "hit_rate": round(hits / lookups, 4) if lookups else None}
+    return {"memory": _memory_cache.stats(), "tasks": tasks}
@@ -1,25 +1,51 @@
-import os
+import asyncio
 import httpx
 import json
 import uuid # For generating question IDs
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from loguru import logger
 
+from app.core.config import settings
+
 from app.schemas.quiz import QuizQuestion, QuizOutput, QuizAnswerInput, QuizQuestionFeedback
 from app.models.rsvp_session import RsvpSession # Added import
 from app.models.user import User # For type hinting if needed
 from app.models.quiz_attempt import QuizAttempt # import QuizAttempt
+from app.models.job import Job
+from app.models.quiz_variant import QuizVariant
+from app.services import gemini_service
+from app.services.gemini_client import generate_text
+from app.services import job_queue
+from app.services.job_queue import job_handler, PermanentJobError
+from app.services.answer_grader import pregrade_items, local_feedback
+from app.utils.text import normalize_whitespace, sha256_hex
+
+
+def parse_quiz_questions(raw_questions: List[dict], num_questions: int) -> List[QuizQuestion]:
+    """Build QuizQuestion objects from Gemini's JSON question list, skipping incomplete entries."""
+    quiz_questions: List[QuizQuestion] = []
+    for q_data in raw_questions:
+        # Ensure ID is present, generate if missing (though prompt asks for it)
+        q_id = q_data.get("id") or str(uuid.uuid4())
+        # Basic validation, Pydantic will do more
+        if not all(k in q_data for k in ["question_text", "question_type", "correct_answer"]):
+            logger.warning(f"Skipping question due to missing fields: {q_data}")
+            continue
 
-# Assuming GEMINI_URL is defined, or use a specific one for quiz generation
-# Re-using GEMINI_URL from gemini_service.py might be okay, or define a new one if needed.
-# from app.services.gemini_service import GEMINI_URL # If we want to share the constant
+        # Ensure options are a list if multiple choice, even if Gemini forgets
+        if q_data["question_type"] == "multiple_choice" and not isinstance(q_data.get("options"), list):
+            q_data["options"] = [] # Or handle as error
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-# Fallback URL if not imported
-GEMINI_QUIZ_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        q_data.pop("id", None)
+        quiz_questions.append(QuizQuestion(**q_data, id=q_id)) # Pass id explicitly
+        if len(quiz_questions) >= num_questions: # Stop if we have enough
+            break
+    return quiz_questions
 
 
-async def generate_quiz_questions_from_text(text_content: str, num_questions: int = 5, num_mc_options: int = 4) -> List[QuizQuestion]:
+async def generate_quiz_questions_from_text(
+    text_content: str, num_questions: int = 5, num_mc_options: int = 4, use_cache: bool = True
+) -> List[QuizQuestion]:
     prompt = f"""
     Based on the following text, generate a list of {num_questions} quiz questions.
     Each question should be distinct and test different aspects of the text.
@@ -58,22 +84,12 @@ async def generate_quiz_questions_from_text(text_content: str, num_questions: in
     ---
     """
 
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
     quiz_questions: List[QuizQuestion] = []
     response_data_for_logging = None # Initialize for logging in case of early error
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client: # Increased timeout
-            res = await client.post(
-                f"{GEMINI_QUIZ_URL}?key={GEMINI_API_KEY}",
-                headers={"Content-Type": "application/json"},
-                json=payload
-            )
-            res.raise_for_status() # Raise HTTPStatusError for bad responses (4xx or 5xx)
-
-        response_data_for_logging = res.json() # Store for potential error logging
         # Extract the text content which should be the JSON string
-        json_text_response = response_data_for_logging["candidates"][0]["content"]["parts"][0]["text"]
+        json_text_response = await generate_text(prompt, task="quiz_generation", use_cache=use_cache)
 
         # Clean the response to ensure it's valid JSON
         # Gemini might wrap JSON in ```json ... ``` or add other text.
@@ -81,24 +97,7 @@ async def generate_quiz_questions_from_text(text_content: str, num_questions: in
             json_text_response = json_text_response.split("```json")[1].split("```")[0].strip()
 
         logger.info(f"Cleaned Gemini JSON response for quiz: {json_text_response}")
-        raw_questions = json.loads(json_text_response)
-
-        for i, q_data in enumerate(raw_questions):
-            # Ensure ID is present, generate if missing (though prompt asks for it)
-            q_id = q_data.get("id", str(uuid.uuid4()))
-            # Basic validation, Pydantic will do more
-            if not all(k in q_data for k in ["question_text", "question_type", "correct_answer"]):
-                logger.warning(f"Skipping question due to missing fields: {q_data}")
-                continue
-
-            # Ensure options are a list if multiple choice, even if Gemini forgets
-            if q_data["question_type"] == "multiple_choice" and not isinstance(q_data.get("options"), list):
-                q_data["options"] = [] # Or handle as error
-
-            q_data.pop("id", None)
-            quiz_questions.append(QuizQuestion(**q_data, id=q_id)) # Pass id explicitly
-            if len(quiz_questions) >= num_questions: # Stop if we have enough
-                break
+        quiz_questions = parse_quiz_questions(json.loads(json_text_response), num_questions)
 
         # If not enough questions generated, log it
         if len(quiz_questions) < num_questions:
@@ -116,25 +115,162 @@ async def generate_quiz_questions_from_text(text_content: str, num_questions: in
 
     return quiz_questions
 
-async def create_or_update_quiz_for_session(rsvp_session_id: str, text_content: str, user: User) -> RsvpSession:
+async def next_quiz_variant(text_content: str, current_variant_id: Optional[str] = None, regenerate: bool = False) -> Optional[QuizVariant]:
+    """Pick the question set for a text from its variant pool, generating a new one when needed.
+
+    Without `regenerate`, the least served stored variant is reused and the LLM is only called for a
+    text seen for the first time. With `regenerate`, a new variant is generated until the pool holds
+    QUIZ_VARIANT_POOL_SIZE of them; after that retakes rotate through the stored ones.
+    Returns None when Gemini produced no questions.
+    """
+    text_hash = sha256_hex(normalize_whitespace(text_content))
+    variants = await QuizVariant.find(QuizVariant.text_hash == text_hash).sort(
+        +QuizVariant.served_count, +QuizVariant.created_at
+    ).to_list()
+    others = [v for v in variants if str(v.id) != current_variant_id]
+
+    if others and (not regenerate or len(variants) >= settings.QUIZ_VARIANT_POOL_SIZE):
+        variant = others[0]
+        await variant.inc({QuizVariant.served_count: 1})
+        logger.info(f"Reusing quiz variant {variant.id} (served {variant.served_count} times) for text {text_hash[:12]}")
+        return variant
+
+    # A cached answer would just repeat a variant we already have
+    questions = await generate_quiz_questions_from_text(text_content, use_cache=not variants)
+    if not questions:
+        return None
+    variant = QuizVariant(text_hash=text_hash, questions=questions, served_count=1)
+    await variant.insert()
+    logger.info(f"Stored quiz variant {variant.id} ({len(variants) + 1} for text {text_hash[:12]})")
+    return variant
+
+
+async def create_or_update_quiz_for_session(
+    rsvp_session_id: str, text_content: str, user: Optional[User] = None, regenerate: bool = False
+) -> RsvpSession:
+    """Give the session its quiz questions (and AI text assessment if missing), saving them in one update.
+
+    Stored questions are kept unless `regenerate` is set, in which case a different variant replaces them.
+    Raises FileNotFoundError if the session is deleted while the quiz is being generated.
+    """
     session = await RsvpSession.get(rsvp_session_id)
     if not session or session.deleted:
         raise FileNotFoundError("RsvpSession not found") # Or HTTPException
 
-    # For now, always generate new questions. Could add logic to check if quiz_questions already exist.
-    questions = await generate_quiz_questions_from_text(text_content)
+    if session.quiz_questions and not regenerate:
+        return session
 
-    if not questions:
+    if session.ai_estimated_ideal_reading_time_seconds is None:
+        # Independent Gemini calls: run them concurrently
+        variant, ai_params = await asyncio.gather(
+            next_quiz_variant(text_content, session.quiz_variant_id, regenerate),
+            gemini_service.assess_text_parameters(text_content),
+        )
+    else:
+        variant, ai_params = await next_quiz_variant(text_content, session.quiz_variant_id, regenerate), None
+
+    if variant is None:
             # Fallback or error if no questions could be generated
         logger.warning(f"No quiz questions generated for session {rsvp_session_id}")
-        session.quiz_questions = [] # Ensure it's an empty list not None
+        if not session.quiz_questions:
+            session.quiz_questions = [] # Ensure it's an empty list not None
     else:
-        session.quiz_questions = questions
-
-    await session.save()
+        session.quiz_questions = variant.questions
+        session.quiz_variant_id = str(variant.id)
+
+    if ai_params is not None:
+        session.ai_estimated_ideal_reading_time_seconds = ai_params.get("ideal_time_seconds")
+        session.ai_text_difficulty = ai_params.get("difficulty", "unknown")
+    session.update_word_count()
+
+    # Only the fields generated here: the Gemini calls take seconds, and meanwhile the session may have
+    # been deleted or had its context_chunks stored, which a full save would overwrite
+    result = await RsvpSession.get_motor_collection().update_one(
+        {"_id": session.id, "deleted": False},
+        {"$set": {
+            "quiz_questions": [q.model_dump() for q in session.quiz_questions],
+            "quiz_variant_id": session.quiz_variant_id,
+            "ai_estimated_ideal_reading_time_seconds": session.ai_estimated_ideal_reading_time_seconds,
+            "ai_text_difficulty": session.ai_text_difficulty,
+            "word_count": session.word_count,
+        }},
+    )
+    if result.matched_count == 0:
+        raise FileNotFoundError("RsvpSession was deleted while its quiz was generated")
     return session
 
 
+@job_handler("quiz")
+async def run_quiz_job(job: Job) -> dict:
+    """Background variant of POST /api/quiz; the job result is the QuizOutput body."""
+    rsvp_session_id = job.payload["rsvp_session_id"]
+    session = await RsvpSession.get(rsvp_session_id)
+    if not session or session.deleted:
+        raise PermanentJobError(f"RsvpSession {rsvp_session_id} not found")
+    if not session.text:
+        raise PermanentJobError(f"RsvpSession {rsvp_session_id} has no text content to create a quiz from")
+
+    try:
+        session = await create_or_update_quiz_for_session(
+            rsvp_session_id, session.text, regenerate=job.payload.get("regenerate", False)
+        )
+    except FileNotFoundError as e:
+        raise PermanentJobError(f"RsvpSession {rsvp_session_id} was deleted: {e}")
+    return QuizOutput(rsvp_session_id=str(session.id), questions=session.quiz_questions).model_dump()
+
+
+def quiz_job_key(rsvp_session_id: str) -> str:
+    return f"quiz:{rsvp_session_id}"
+
+
+def quiz_regenerate_job_key(rsvp_session_id: str) -> str:
+    # Separate from quiz_job_key: a pending prebuild must not absorb a request for a new variant
+    return f"quiz-regenerate:{rsvp_session_id}"
+
+
+async def prebuild_quiz(session: RsvpSession) -> None:
+    """Queue quiz generation and text assessment for a new session while the user is still reading.
+
+    Never raises: a failure here only means POST /api/quiz will generate the quiz itself.
+    """
+    if not settings.QUIZ_PREBUILD_ENABLED or session.quiz_questions or not session.text:
+        return
+    try:
+        await job_queue.enqueue_job(
+            "quiz",
+            {"rsvp_session_id": str(session.id)},
+            user_id=session.user_id,
+            dedupe_key=quiz_job_key(str(session.id)),
+        )
+    except Exception as e:
+        logger.warning(f"Could not queue quiz prebuild for session {session.id}: {e}")
+
+
+async def get_or_create_quiz_for_session(session: RsvpSession, user: Optional[User] = None, regenerate: bool = False) -> RsvpSession:
+    """Return the session with quiz questions: already stored, from the pending prebuild job, or generated now."""
+    if regenerate:
+        return await create_or_update_quiz_for_session(str(session.id), session.text, user, regenerate=True)
+    if session.quiz_questions:
+        return session
+
+    rsvp_session_id = str(session.id)
+    pending = await Job.find_one(Job.active_key == quiz_job_key(rsvp_session_id))
+    if pending is not None:
+        job = await job_queue.join_job(pending, settings.QUIZ_PREBUILD_JOIN_TIMEOUT_SECONDS)
+        if job is not None and job.status == "succeeded":
+            refreshed = await RsvpSession.get(rsvp_session_id)
+            if refreshed and not refreshed.deleted and refreshed.quiz_questions is not None:
+                logger.info(f"Quiz for session {rsvp_session_id} served from prebuild job {job.id}")
+                return refreshed
+        # Also reached at once when the job is in retry backoff: join_job does not wait for it
+        logger.warning(
+            f"Quiz prebuild job {pending.id} for session {rsvp_session_id} did not finish in time "
+            f"(status: {job.status if job else 'missing'}); generating inline"
+        )
+
+    return await create_or_update_quiz_for_session(rsvp_session_id, session.text, user)
+
+
 async def evaluate_open_ended_answer_with_gemini(question_text: str, correct_answer_criteria: str, user_answer: str) -> dict:
     prompt = f"""
     Evaluate the user's answer to an open-ended question.
@@ -155,21 +291,11 @@ async def evaluate_open_ended_answer_with_gemini(question_text: str, correct_ans
         "feedback": "Your answer mentions some key points but misses the main aspect of X."
     }}
     """
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
     evaluation_result = {"evaluation": "error", "feedback": "Could not evaluate answer."}
     response_data_for_logging = None
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client: # Shorter timeout for evaluation
-            res = await client.post(
-                f"{GEMINI_QUIZ_URL}?key={GEMINI_API_KEY}", # Using the same GEMINI_QUIZ_URL
-                headers={"Content-Type": "application/json"},
-                json=payload
-            )
-            res.raise_for_status()
-
-        response_data_for_logging = res.json()
-        json_text_response = response_data_for_logging["candidates"][0]["content"]["parts"][0]["text"]
+        json_text_response = await generate_text(prompt, task="quiz_evaluation")
 
         if "```json" in json_text_response: # Clean if necessary
             json_text_response = json_text_response.split("```json")[1].split("```")[0].strip()
@@ -197,68 +323,234 @@ async def evaluate_open_ended_answer_with_gemini(question_text: str, correct_ans
     return evaluation_result
 
 
-async def validate_and_score_quiz_answers(
-    rsvp_session_id: str,
-    user_answers: List[QuizAnswerInput],
-    user: User,
-    reading_time_seconds: Optional[int] = None,
-) -> QuizAttempt:
+BATCH_EVALUATION_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "question_id": {"type": "STRING"},
+            "evaluation": {"type": "STRING", "enum": ["correct", "partially_correct", "incorrect"]},
+            "feedback": {"type": "STRING"},
+        },
+        "required": ["question_id", "evaluation", "feedback"],
+    },
+}
+
+
+async def evaluate_open_ended_answers_batch(items: List[dict]) -> Dict[str, dict]:
+    """Grade several open-ended answers with a single structured Gemini call.
+
+    Each item needs "question_id", "question_text", "correct_answer" and "user_answer".
+    Returns {question_id: {"evaluation": ..., "feedback": ...}} for the answers Gemini graded;
+    raises on transport or parsing errors so the caller can fall back to per-question calls.
+    """
+    answers_block = "\n".join(
+        json.dumps(
+            {
+                "question_id": item["question_id"],
+                "question": item["question_text"],
+                "model_answer": item["correct_answer"],
+                "user_answer": item["user_answer"],
+            },
+            ensure_ascii=False,
+        )
+        for item in items
+    )
+    prompt = f"""
+    Evaluate each of the user's answers to the open-ended questions below.
+    For every entry, decide whether the user's answer is "correct", "partially_correct" or "incorrect"
+    based on the model answer, and give brief feedback for the user explaining your evaluation.
+
+    Return one object per entry with the same "question_id".
+
+    Answers to evaluate (one JSON object per line):
+    {answers_block}
+    """
+    generation_config = {"responseMimeType": "application/json", "responseSchema": BATCH_EVALUATION_SCHEMA}
+    json_text_response = await generate_text(prompt, task="quiz_evaluation", generation_config=generation_config)
+    logger.info(f"Gemini batch evaluation response: {json_text_response}")
+
+    expected_ids = {item["question_id"] for item in items}
+    evaluations: Dict[str, dict] = {}
+    for entry in json.loads(json_text_response):
+        question_id = entry.get("question_id")
+        if question_id in expected_ids and "evaluation" in entry and "feedback" in entry:
+            evaluations[question_id] = {"evaluation": entry["evaluation"], "feedback": entry["feedback"]}
+    return evaluations
+
+
+async def _evaluate_concurrently(items: List[dict]) -> Dict[str, dict]:
+    semaphore = asyncio.Semaphore(settings.QUIZ_EVALUATION_MAX_CONCURRENCY)
+
+    async def evaluate(item: dict) -> dict:
+        async with semaphore:
+            return await evaluate_open_ended_answer_with_gemini(
+                item["question_text"], item["correct_answer"], item["user_answer"]
+            )
+
+    results = await asyncio.gather(*(evaluate(item) for item in items))
+    return {item["question_id"]: result for item, result in zip(items, results)}
+
+
+def _pregrade_locally(items: List[dict], reference_text: Optional[str]) -> Tuple[Dict[str, dict], List[dict], Dict[str, dict]]:
+    """Split items into answers settled by the local grader and the ambiguous ones left for Gemini."""
+    if not settings.QUIZ_LOCAL_GRADING or not items:
+        return {}, items, {}
+    decisions = pregrade_items(items, reference_text)
+    evaluations = {
+        question_id: {"evaluation": decision["evaluation"], "feedback": local_feedback(decision)}
+        for question_id, decision in decisions.items()
+        if decision["evaluation"] is not None
+    }
+    remaining = [item for item in items if item["question_id"] not in evaluations]
+    logger.info(f"Local grader settled {len(evaluations)} of {len(items)} open-ended answers")
+    return evaluations, remaining, decisions
+
+
+def _log_llm_verdicts(decisions: Dict[str, dict], evaluations: Dict[str, dict]) -> None:
+    # Gemini's verdict next to the local score of each ambiguous answer, for tuning the thresholds
+    for question_id, decision in decisions.items():
+        if decision["evaluation"] is None and question_id in evaluations:
+            logger.info(
+                f"Local grading question={question_id} score={decision['score']} "
+                f"llm_evaluation={evaluations[question_id].get('evaluation')}"
+            )
+
+
+async def grade_open_ended_answers(items: List[dict], reference_text: Optional[str] = None) -> Dict[str, dict]:
+    """Grade all open-ended answers of an attempt in one LLM round trip when possible.
+
+    Clear-cut answers are settled by the local lexical grader (using `reference_text`, the session
+    text, for term weights). The rest go to one batched call, then whatever the batch missed (or
+    everything, if it failed) is graded with concurrent per-question calls.
+    """
+    if not items:
+        return {}
+
+    local_evaluations, items, decisions = _pregrade_locally(items, reference_text)
+    if not items:
+        return local_evaluations
+
+    evaluations: Dict[str, dict] = {}
+    if settings.QUIZ_BATCH_GRADING and len(items) > 1:
+        try:
+            evaluations = await evaluate_open_ended_answers_batch(items)
+        except Exception as e:
+            logger.warning(f"Batch evaluation of {len(items)} open-ended answers failed, falling back to per-question calls: {e}")
+
+    remaining = [item for item in items if item["question_id"] not in evaluations]
+    if remaining:
+        evaluations.update(await _evaluate_concurrently(remaining))
+    _log_llm_verdicts(decisions, evaluations)
+    return {**local_evaluations, **evaluations}
+
+
+async def iter_open_ended_grades(items: List[dict], reference_text: Optional[str] = None) -> AsyncIterator[Tuple[str, dict]]:
+    """Yield (question_id, evaluation) pairs in completion order.
+
+    Locally graded answers come first, then the ambiguous ones graded by one batched call (as in
+    grade_open_ended_answers); whatever the batch missed gets one concurrent Gemini call each.
+    """
+    local_evaluations, items, decisions = _pregrade_locally(items, reference_text)
+    for question_id, evaluation in local_evaluations.items():
+        yield question_id, evaluation
+
+    if settings.QUIZ_BATCH_GRADING and len(items) > 1:
+        try:
+            evaluations = await evaluate_open_ended_answers_batch(items)
+        except Exception as e:
+            logger.warning(f"Batch evaluation of {len(items)} open-ended answers failed, falling back to per-question calls: {e}")
+            evaluations = {}
+        _log_llm_verdicts(decisions, evaluations)
+        for question_id, evaluation in evaluations.items():
+            yield question_id, evaluation
+        items = [item for item in items if item["question_id"] not in evaluations]
+
+    semaphore = asyncio.Semaphore(settings.QUIZ_EVALUATION_MAX_CONCURRENCY)
+
+    async def evaluate(item: dict) -> Tuple[str, dict]:
+        async with semaphore:
+            evaluation = await evaluate_open_ended_answer_with_gemini(
+                item["question_text"], item["correct_answer"], item["user_answer"]
+            )
+        return item["question_id"], evaluation
+
+    tasks = [asyncio.create_task(evaluate(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            question_id, evaluation = await next_done
+            _log_llm_verdicts(decisions, {question_id: evaluation})
+            yield question_id, evaluation
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def load_session_for_validation(rsvp_session_id: str) -> RsvpSession:
     session = await RsvpSession.get(rsvp_session_id)
     if not session or session.deleted:
         raise FileNotFoundError("RsvpSession not found")
     if not session.quiz_questions:
         raise ValueError("No quiz questions found for this session")
+    return session
 
-    feedback_results: List[QuizQuestionFeedback] = []
-    correct_answers_count = 0
-
-    questions_map = {q.id: q for q in session.quiz_questions}
-
-    for answer_input in user_answers:
-        question = questions_map.get(answer_input.question_id)
-        if not question:
-            logger.warning(f"Question ID {answer_input.question_id} not found in session {rsvp_session_id}. Skipping.")
-            feedback_results.append(QuizQuestionFeedback(
-                question_id=answer_input.question_id,
-                is_correct=False,
-                feedback="Question not found for this attempt.",
-                correct_answer="N/A"
-            ))
-            continue
 
+def _grade_without_llm(question: Optional[QuizQuestion], answer_input: QuizAnswerInput) -> Optional[QuizQuestionFeedback]:
+    """Feedback for answers that need no AI evaluation; None for open-ended questions."""
+    if not question:
+        return QuizQuestionFeedback(
+            question_id=answer_input.question_id,
+            is_correct=False,
+            feedback="Question not found for this attempt.",
+            correct_answer="N/A"
+        )
+
+    if question.question_type == "multiple_choice":
+        is_correct = (answer_input.user_answer == question.correct_answer)
+        feedback_text = "Correct!" if is_correct else "Incorrect."
+        if question.explanation:
+            feedback_text += f" {question.explanation}"
+    elif question.question_type == "open_ended":
+        return None
+    else: # Should not happen if data is clean
         is_correct = False
-        feedback_text = ""
+        feedback_text = "Unknown question type."
 
-        if question.question_type == "multiple_choice":
-            is_correct = (answer_input.user_answer == question.correct_answer)
-            feedback_text = "Correct!" if is_correct else "Incorrect."
-            if question.explanation:
-                feedback_text += f" {question.explanation}"
+    return QuizQuestionFeedback(
+        question_id=question.id,
+        is_correct=is_correct,
+        feedback=feedback_text,
+        correct_answer=question.correct_answer
+    )
 
-        elif question.question_type == "open_ended":
-            # Use Gemini for evaluation
-            evaluation = await evaluate_open_ended_answer_with_gemini(
-                question.question_text,
-                question.correct_answer, # Model answer/criteria
-                answer_input.user_answer
-            )
-            # Define what constitutes "correct" from Gemini's evaluation
-            is_correct = evaluation["evaluation"] in ["correct", "partially_correct"]
-            feedback_text = evaluation["feedback"]
 
-        else: # Should not happen if data is clean
-            feedback_text = "Unknown question type."
+def _feedback_from_evaluation(question: QuizQuestion, evaluation: dict) -> QuizQuestionFeedback:
+    # Define what constitutes "correct" from Gemini's evaluation
+    return QuizQuestionFeedback(
+        question_id=question.id,
+        is_correct=evaluation["evaluation"] in ["correct", "partially_correct"],
+        feedback=evaluation["feedback"],
+        correct_answer=question.correct_answer
+    )
 
-        if is_correct:
-            correct_answers_count += 1
 
-        feedback_results.append(QuizQuestionFeedback(
-            question_id=question.id,
-            is_correct=is_correct,
-            feedback=feedback_text,
-            correct_answer=question.correct_answer
-        ))
+def _open_ended_item(question: QuizQuestion, answer_input: QuizAnswerInput, slot: int) -> dict:
+    # Graders key results by "question_id"; the answer slot keeps two answers to one question apart
+    return {
+        "question_id": f"{question.id}@{slot}",
+        "question_text": question.question_text,
+        "correct_answer": question.correct_answer, # Model answer/criteria
+        "user_answer": answer_input.user_answer,
+    }
 
+
+async def _save_quiz_attempt(
+    session: RsvpSession,
+    user: User,
+    feedback_results: List[QuizQuestionFeedback],
+    reading_time_seconds: Optional[int],
+) -> QuizAttempt:
+    correct_answers_count = sum(1 for feedback in feedback_results if feedback.is_correct)
     overall_score = (correct_answers_count / len(session.quiz_questions)) * 100 if session.quiz_questions else 0
 
     quiz_attempt = QuizAttempt(
@@ -278,3 +570,68 @@ async def validate_and_score_quiz_answers(
     await session.save()
 
     return quiz_attempt
+
+
+async def validate_and_score_quiz_answers(
+    rsvp_session_id: str,
+    user_answers: List[QuizAnswerInput],
+    user: User,
+    reading_time_seconds: Optional[int] = None,
+) -> QuizAttempt:
+    session = await load_session_for_validation(rsvp_session_id)
+    questions_map = {q.id: q for q in session.quiz_questions}
+
+    feedback_slots: List[Optional[QuizQuestionFeedback]] = []
+    open_ended: List[Tuple[int, QuizQuestion, QuizAnswerInput]] = []
+    for answer_input in user_answers:
+        question = questions_map.get(answer_input.question_id)
+        if not question:
+            logger.warning(f"Question ID {answer_input.question_id} not found in session {rsvp_session_id}. Skipping.")
+        feedback = _grade_without_llm(question, answer_input)
+        if feedback is None:
+            open_ended.append((len(feedback_slots), question, answer_input))
+        feedback_slots.append(feedback)
+
+    # All open-ended answers are graded together: one LLM round trip instead of one per question
+    items = {slot: _open_ended_item(question, answer_input, slot) for slot, question, answer_input in open_ended}
+    evaluations = await grade_open_ended_answers(list(items.values()), reference_text=session.text)
+    for slot, question, _ in open_ended:
+        feedback_slots[slot] = _feedback_from_evaluation(question, evaluations[items[slot]["question_id"]])
+
+    return await _save_quiz_attempt(session, user, feedback_slots, reading_time_seconds)
+
+
+async def iter_quiz_validation(
+    session: RsvpSession,
+    user_answers: List[QuizAnswerInput],
+    user: User,
+    reading_time_seconds: Optional[int] = None,
+) -> AsyncIterator[Union[QuizQuestionFeedback, QuizAttempt]]:
+    """Streaming variant of validate_and_score_quiz_answers.
+
+    Yields each QuizQuestionFeedback as soon as it is graded (locally graded answers first),
+    then the saved QuizAttempt once every answer has been graded.
+    """
+    questions_map = {q.id: q for q in session.quiz_questions}
+    feedback_results: List[QuizQuestionFeedback] = []
+    # Keyed by answer slot: a question answered twice gets feedback for both answers
+    pending: Dict[str, Tuple[QuizQuestion, dict]] = {}
+    for slot, answer_input in enumerate(user_answers):
+        question = questions_map.get(answer_input.question_id)
+        if not question:
+            logger.warning(f"Question ID {answer_input.question_id} not found in session {session.id}. Skipping.")
+        feedback = _grade_without_llm(question, answer_input)
+        if feedback is None:
+            item = _open_ended_item(question, answer_input, slot)
+            pending[item["question_id"]] = (question, item)
+            continue
+        feedback_results.append(feedback)
+        yield feedback
+
+    items = [item for _, item in pending.values()]
+    async for item_key, evaluation in iter_open_ended_grades(items, reference_text=session.text):
+        feedback = _feedback_from_evaluation(pending[item_key][0], evaluation)
+        feedback_results.append(feedback)
+        yield feedback
+
+    yield await _save_quiz_attempt(session, user, feedback_results, reading_time_seconds)
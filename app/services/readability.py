@@ -0,0 +1,84 @@
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+
+# Nucleus vowels. Accented í/ú break a diphthong, so they count as strong like a/e/o.
+# "y" is left out: inside a word it never forms a nucleus on its own ("hoy", "muy", "rayo").
+_STRONG_VOWELS = set("aeoáéíóú")
+_WEAK_VOWELS = set("iuü")
+_VOWELS = _STRONG_VOWELS | _WEAK_VOWELS
+_SENTENCE_END_RE = re.compile(r"[.!?…]+|\n\s*\n")
+
+# Inflesz scale for the Szigriszt-Pazos index: >= 65 "bastante fácil", 55-65 "normal", < 55 "algo difícil" or worse
+EASY_MIN_SCORE = 65.0
+MEDIUM_MIN_SCORE = 55.0
+
+# Silent reading speed of a 15-20 year old Spanish reader per difficulty band
+WPM_BANDS = {"easy": 240, "medium": 210, "hard": 170}
+
+
+def count_syllables(word: str) -> int:
+    """Spanish orthographic syllable count: one per vowel nucleus, treating diphthongs as one."""
+    word = word.lower()
+    syllables = 0
+    previous = ""
+    for char in word:
+        if char in _VOWELS:
+            # A vowel opens a new syllable unless it forms a diphthong with the previous one
+            if previous not in _VOWELS or (previous in _STRONG_VOWELS and char in _STRONG_VOWELS):
+                syllables += 1
+        previous = char
+    if syllables == 0 and any(c.isalpha() for c in word):
+        return 1 # Acronyms and vowel-less tokens ("y" alone, "TV") are read as one unit
+    return syllables
+
+
+def count_sentences(text: str) -> int:
+    return max(1, sum(1 for part in _SENTENCE_END_RE.split(text) if any(c.isalnum() for c in part)))
+
+
+def _clean_word(word: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFC", word) if c.isalpha())
+
+
+def fernandez_huerta(syllables: int, words: int, sentences: int) -> float:
+    """Fernández-Huerta (1959) adaptation of Flesch Reading Ease to Spanish."""
+    return 206.84 - 60 * (syllables / words) - 102 * (sentences / words)
+
+
+def szigriszt_pazos(syllables: int, words: int, sentences: int) -> float:
+    """Szigriszt-Pazos (1993) perspicuity index."""
+    return 206.835 - 62.3 * (syllables / words) - (words / sentences)
+
+
+def difficulty_from_score(score: float) -> str:
+    if score >= EASY_MIN_SCORE:
+        return "easy"
+    if score >= MEDIUM_MIN_SCORE:
+        return "medium"
+    return "hard"
+
+
+def analyze_text(text: str, words: Optional[Iterable[str]] = None) -> dict:
+    """Deterministic readability assessment of a Spanish text.
+
+    `words` lets callers pass an already split word list (e.g. RsvpSession.words). Returns the same
+    "ideal_time_seconds" / "difficulty" keys as the LLM assessment plus both readability indices.
+    """
+    cleaned: List[str] = [w for w in (_clean_word(w) for w in (words if words is not None else text.split())) if w]
+    if not cleaned:
+        return {"ideal_time_seconds": None, "difficulty": "unknown", "fernandez_huerta": None, "szigriszt_pazos": None}
+
+    word_count = len(cleaned)
+    syllables = sum(count_syllables(w) for w in cleaned)
+    sentences = count_sentences(text)
+
+    huerta = fernandez_huerta(syllables, word_count, sentences)
+    szigriszt = szigriszt_pazos(syllables, word_count, sentences)
+    difficulty = difficulty_from_score(szigriszt)
+    return {
+        "ideal_time_seconds": max(1, round(word_count / WPM_BANDS[difficulty] * 60)),
+        "difficulty": difficulty,
+        "fernandez_huerta": round(huerta, 2),
+        "szigriszt_pazos": round(szigriszt, 2),
+    }
@@ -1,34 +1,68 @@
-import os
 import json
 import httpx
+from typing import AsyncIterator, List, Tuple
 from loguru import logger
+from app.core.config import settings
 from app.schemas.rsvp import RsvpOutput
 from app.models.rsvp_session import RsvpSession
+from app.services.gemini_client import generate_content, extract_text, build_payload, stream_text
+from app.services.gemini_service import rsvp_text_prompt, rsvp_bundle_prompt, parse_assessment, RSVP_BUNDLE_SCHEMA
+from app.services.quiz_service import parse_quiz_questions, prebuild_quiz
+from app.services.readability import analyze_text
+from app.services.topic_pool import take_pooled_text, CUSTOM_TEXT_TOPIC
+
+RAW_TOPIC_PREFIX = "__raw__:"
+
+
+def _split_words(text: str) -> List[str]:
+    words = text.replace("\n", " ").split()
+    return [word for word in words if word.strip()]
+
+
+def _parse_raw_topic(topic: str) -> str:
+    raw_text = topic.replace(RAW_TOPIC_PREFIX, "", 1).strip()
+    if not raw_text:
+        raise ValueError("Texto personalizado vacío")
+    return raw_text
+
+
+async def _create_session(topic: str, text: str, words: List[str], user_id: str, **fields) -> RsvpSession:
+    # Local readability assessment, unless the caller already has one (e.g. from a bundle).
+    # With ASSESSMENT_USE_LLM it is left unset: the quiz prebuild asks Gemini, falling back to local.
+    readability = analyze_text(text, words)
+    assessed = fields.get("ai_estimated_ideal_reading_time_seconds") is not None
+    if assessed or not settings.ASSESSMENT_USE_LLM:
+        if not assessed:
+            fields["ai_estimated_ideal_reading_time_seconds"] = readability["ideal_time_seconds"]
+        if fields.get("ai_text_difficulty") in (None, "unknown"):
+            fields["ai_text_difficulty"] = readability["difficulty"]
+
+    session = RsvpSession(
+        topic=topic,
+        text=text,
+        words=words,
+        user_id=user_id,
+        fernandez_huerta_score=readability["fernandez_huerta"],
+        szigriszt_pazos_score=readability["szigriszt_pazos"],
+        **fields
+    )
+
+    session.update_word_count()
+    await session.insert()
+    # The user reads for a minute or more: build the quiz and assessment meanwhile
+    await prebuild_quiz(session)
+    return session
 
-GEMINI_RSVP_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
 
 async def ask_gemini_for_rsvp(topic: str, user_id: str) -> RsvpOutput:
     if not user_id:
         raise ValueError("user_id is required to create RSVP session")
 
     # 👉 Modo texto personalizado
-    if topic.startswith("__raw__:"):
-        raw_text = topic.replace("__raw__:", "", 1).strip()
-        if not raw_text:
-            raise ValueError("Texto personalizado vacío")
-
-        words = raw_text.replace("\n", " ").split()
-        words = [word for word in words if word.strip()]
-
-        session = RsvpSession(
-            topic="Texto personalizado",
-            text=raw_text,
-            words=words,
-            user_id=user_id
-        )
-
-        session.update_word_count()
-        await session.insert()
+    if topic.startswith(RAW_TOPIC_PREFIX):
+        raw_text = _parse_raw_topic(topic)
+        words = _split_words(raw_text)
+        session = await _create_session(CUSTOM_TEXT_TOPIC, raw_text, words, user_id)
 
         logger.info(f"Created custom RSVP session {session.id} for user {user_id} with {len(words)} words")
 
@@ -38,22 +72,23 @@ async def ask_gemini_for_rsvp(topic: str, user_id: str) -> RsvpOutput:
             words=session.words,
         )
 
-    # 👉 Modo generación con Gemini
-    prompt = (
-        f"Escribe un texto informativo extenso pero claro sobre el siguiente tema, "
-        f"dirigido a lectores entre 15-20 años. Usa lenguaje sencillo, 3 párrafos como máximo. Tema: {topic}"
-    )
+    # 👉 Texto pre-generado del pool (sin LLM en la petición)
+    pooled_text = await take_pooled_text(topic)
+    if pooled_text:
+        words = _split_words(pooled_text)
+        session = await _create_session(topic, pooled_text, words, user_id)
 
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        logger.info(f"Created RSVP session {session.id} for user {user_id} from topic pool with {len(words)} words")
 
+        return RsvpOutput(
+            id=str(session.id),
+            text=session.text,
+            words=session.words,
+        )
+
+    # 👉 Modo generación con Gemini
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            res = await client.post(
-                f"{GEMINI_RSVP_URL}?key={os.getenv('GEMINI_API_KEY')}",
-                headers={"Content-Type": "application/json"},
-                json=payload,
-            )
-            res.raise_for_status()
+        data = await generate_content(build_payload(rsvp_text_prompt(topic)), task="rsvp")
     except httpx.HTTPStatusError as e:
         logger.error(
             f"HTTP error calling Gemini for RSVP: {e.response.status_code} - {e.response.text}"
@@ -62,35 +97,160 @@ async def ask_gemini_for_rsvp(topic: str, user_id: str) -> RsvpOutput:
     except httpx.RequestError as e:
         logger.error(f"Network error calling Gemini for RSVP: {e}")
         raise Exception("Network error communicating with AI service.")
+    except json.JSONDecodeError as e:
+        logger.error(f"Malformed Gemini RSVP response: {e}")
+        raise Exception("Malformed response from AI service.")
 
     try:
-        data = res.json()
-        text = data["candidates"][0]["content"]["parts"][0]["text"]
-    except (KeyError, IndexError, TypeError, json.JSONDecodeError) as e:
-        logger.error(f"Malformed Gemini RSVP response: {e}. Response: {res.text}")
+        text = extract_text(data)
+    except (KeyError, IndexError, TypeError) as e:
+        logger.error(f"Malformed Gemini RSVP response: {e}. Response: {data}")
         raise Exception("Malformed response from AI service.")
 
     if not text or not text.strip():
         logger.error(f"Gemini returned empty text for topic: {topic}")
         raise Exception("AI service returned empty text content.")
 
-    words = text.replace("\n", " ").split()
-    words = [word for word in words if word.strip()]
+    words = _split_words(text)
+    session = await _create_session(topic, text.strip(), words, user_id)
 
-    session = RsvpSession(
-        topic=topic,
-        text=text.strip(),
-        words=words,
-        user_id=user_id
+    logger.info(f"Created RSVP session {session.id} for user {user_id} with {len(words)} words")
+
+    return RsvpOutput(
+        id=str(session.id),
+        text=session.text,
+        words=session.words,
     )
 
-    session.update_word_count()
-    await session.insert()
 
-    logger.info(f"Created RSVP session {session.id} for user {user_id} with {len(words)} words")
+async def generate_rsvp_session_bundle(topic: str, user_id: str, num_questions: int = 5) -> RsvpOutput:
+    """Generate the text, its quiz and its assessment with one structured Gemini call.
+
+    The RsvpSession is inserted once with quiz_questions and the ai_* fields already set, so
+    no separate quiz or assessment round trip (each resending the text) is needed later.
+    Custom `__raw__:` texts have nothing to generate and go through ask_gemini_for_rsvp.
+    """
+    if not user_id:
+        raise ValueError("user_id is required to create RSVP session")
+    if topic.startswith(RAW_TOPIC_PREFIX):
+        return await ask_gemini_for_rsvp(topic, user_id)
+
+    generation_config = {"responseMimeType": "application/json", "responseSchema": RSVP_BUNDLE_SCHEMA}
+    try:
+        data = await generate_content(
+            build_payload(rsvp_bundle_prompt(topic, num_questions), generation_config), task="rsvp_bundle"
+        )
+    except httpx.HTTPStatusError as e:
+        logger.error(
+            f"HTTP error calling Gemini for RSVP bundle: {e.response.status_code} - {e.response.text}"
+        )
+        raise Exception("Error communicating with AI service.")
+    except httpx.RequestError as e:
+        logger.error(f"Network error calling Gemini for RSVP bundle: {e}")
+        raise Exception("Network error communicating with AI service.")
+    except json.JSONDecodeError as e:
+        logger.error(f"Malformed Gemini RSVP bundle response: {e}")
+        raise Exception("Malformed response from AI service.")
+
+    try:
+        bundle = json.loads(extract_text(data))
+        text = (bundle.get("text") or "").strip()
+        questions = parse_quiz_questions(bundle.get("questions") or [], num_questions)
+        assessment = parse_assessment(bundle.get("assessment") or {})
+    except (KeyError, IndexError, TypeError, AttributeError, ValueError) as e:
+        logger.error(f"Malformed Gemini RSVP bundle response: {e}. Response: {data}")
+        raise Exception("Malformed response from AI service.")
+
+    if not text:
+        logger.error(f"Gemini returned empty bundle text for topic: {topic}")
+        raise Exception("AI service returned empty text content.")
+    if len(questions) < num_questions:
+        logger.warning(f"Gemini bundle contained {len(questions)} questions, expected {num_questions}.")
+
+    words = _split_words(text)
+    session = await _create_session(
+        topic,
+        text,
+        words,
+        user_id,
+        quiz_questions=questions,
+        ai_estimated_ideal_reading_time_seconds=assessment["ideal_time_seconds"],
+        ai_text_difficulty=assessment["difficulty"],
+    )
+
+    logger.info(
+        f"Created bundled RSVP session {session.id} for user {user_id} with {len(words)} words and {len(questions)} questions"
+    )
 
     return RsvpOutput(
         id=str(session.id),
         text=session.text,
         words=session.words,
     )
+
+
+async def stream_rsvp_generation(topic: str, user_id: str) -> AsyncIterator[Tuple[str, dict]]:
+    """Streaming variant of ask_gemini_for_rsvp.
+
+    Yields ("words", {"words": [...]}) as soon as complete words arrive from Gemini, then
+    ("session", {...}) once the text is finished and the RsvpSession has been inserted.
+    Raises the same exceptions as ask_gemini_for_rsvp.
+    """
+    if not user_id:
+        raise ValueError("user_id is required to create RSVP session")
+
+    if topic.startswith(RAW_TOPIC_PREFIX):
+        raw_text = _parse_raw_topic(topic)
+        words = _split_words(raw_text)
+        yield "words", {"words": words}
+        session = await _create_session(CUSTOM_TEXT_TOPIC, raw_text, words, user_id)
+        logger.info(f"Created custom RSVP session {session.id} for user {user_id} with {len(words)} words")
+        yield "session", {"id": str(session.id), "word_count": session.word_count}
+        return
+
+    pooled_text = await take_pooled_text(topic)
+    if pooled_text:
+        words = _split_words(pooled_text)
+        yield "words", {"words": words}
+        session = await _create_session(topic, pooled_text, words, user_id)
+        logger.info(f"Created streamed RSVP session {session.id} for user {user_id} from topic pool with {len(words)} words")
+        yield "session", {"id": str(session.id), "word_count": session.word_count}
+        return
+
+    fragments: List[str] = []
+    pending = "" # Trailing text that may be the first half of a word
+    try:
+        async for fragment in stream_text(rsvp_text_prompt(topic), task="rsvp"):
+            fragments.append(fragment)
+            pending += fragment
+            tokens = pending.split()
+            if tokens and not pending[-1].isspace():
+                pending = tokens.pop()
+            else:
+                pending = ""
+            if tokens:
+                yield "words", {"words": tokens}
+    except httpx.HTTPStatusError as e:
+        logger.error(
+            f"HTTP error streaming Gemini for RSVP: {e.response.status_code} - {e.response.text}"
+        )
+        raise Exception("Error communicating with AI service.")
+    except httpx.RequestError as e:
+        logger.error(f"Network error streaming Gemini for RSVP: {e}")
+        raise Exception("Network error communicating with AI service.")
+    except json.JSONDecodeError as e:
+        logger.error(f"Malformed Gemini RSVP stream chunk: {e}")
+        raise Exception("Malformed response from AI service.")
+
+    if pending.strip():
+        yield "words", {"words": [pending.strip()]}
+
+    text = "".join(fragments)
+    if not text.strip():
+        logger.error(f"Gemini returned empty text for topic: {topic}")
+        raise Exception("AI service returned empty text content.")
+
+    words = _split_words(text)
+    session = await _create_session(topic, text.strip(), words, user_id)
+    logger.info(f"Created streamed RSVP session {session.id} for user {user_id} with {len(words)} words")
+    yield "session", {"id": str(session.id), "word_count": session.word_count}
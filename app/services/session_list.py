@@ -0,0 +1,71 @@
+from typing import Iterable, List, Optional, Tuple
+
+from app.models.rsvp_session import RsvpSession
+from app.schemas.rsvp import RsvpSessionSummary
+from app.utils.pagination import after_cursor, decode_cursor, encode_cursor
+
+# Words of the session shown as its snippet; the full text comes from GET /api/rsvp/{id}
+SNIPPET_WORDS = 12
+# Served by the (user_id, deleted, created_at, _id) index without an in-memory sort
+SESSION_LIST_SORT = [("created_at", -1), ("_id", -1)]
+# Summary field -> the Mongo projection that produces it
+FIELD_PROJECTIONS = {
+    "topic": {"topic": 1},
+    "snippet": {"words": {"$slice": SNIPPET_WORDS + 1}}, # one more to know whether the text goes on
+    "word_count": {"word_count": 1},
+    "quiz_score": {"quiz_score": 1},
+    "created_at": {"created_at": 1},
+}
+SUMMARY_FIELDS = tuple(FIELD_PROJECTIONS)
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Requested summary fields from a comma-separated `fields=` value; all of them when empty."""
+    if not fields:
+        return SUMMARY_FIELDS
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in FIELD_PROJECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(SUMMARY_FIELDS)}")
+    return requested
+
+
+def session_list_query(user_id: str, cursor: Optional[str], fields: Iterable[str]) -> Tuple[dict, dict]:
+    """(filter, projection) for one page of the user's live sessions, newest first."""
+    query = {"user_id": user_id, "deleted": False}
+    if cursor:
+        query.update(after_cursor(*decode_cursor(cursor)))
+    # created_at is always read: the next cursor is built from it
+    projection = {"created_at": 1}
+    for field in fields:
+        projection.update(FIELD_PROJECTIONS[field])
+    return query, projection
+
+
+def _summary(doc: dict, fields: Iterable[str]) -> RsvpSessionSummary:
+    values = {"id": str(doc["_id"])}
+    for field in fields:
+        if field == "snippet":
+            words = doc.get("words") or []
+            values["snippet"] = " ".join(words[:SNIPPET_WORDS]) + ("..." if len(words) > SNIPPET_WORDS else "")
+        else:
+            values[field] = doc.get(field)
+    return RsvpSessionSummary(**values)
+
+
+async def list_session_summaries(
+    user_id: str, limit: int, cursor: Optional[str] = None, fields: Iterable[str] = SUMMARY_FIELDS
+) -> Tuple[List[RsvpSessionSummary], Optional[str]]:
+    """One page of session summaries and the cursor for the next page (None on the last one).
+
+    Raises ValueError for a malformed cursor.
+    """
+    fields = tuple(fields)
+    query, projection = session_list_query(user_id, cursor, fields)
+    # One extra document tells whether another page exists without counting
+    docs = await RsvpSession.get_motor_collection().find(query, projection).sort(SESSION_LIST_SORT).limit(limit + 1).to_list(None)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+    return [_summary(doc, fields) for doc in docs], next_cursor
@@ -0,0 +1,175 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+
+from app.core.config import settings
+from app.models.pooled_topic_text import PooledTopicText
+from app.models.rsvp_session import RsvpSession
+from app.services.gemini_client import generate_text
+from app.services.gemini_service import rsvp_text_prompt
+from app.utils.text import normalize_whitespace
+
+CUSTOM_TEXT_TOPIC = "Texto personalizado"
+
+def _new_counters() -> Dict[str, int]:
+    return {"hits": 0, "misses": 0, "generated": 0}
+
+
+# Counters per curriculum topic; popular topics come from users' free text, so they are only
+# counted in aggregate, like every topic outside the pool. Bounded by RSVP_POOL_TOPICS.
+_stats: Dict[str, Dict[str, int]] = defaultdict(_new_counters)
+_aggregate_stats: Dict[str, Dict[str, int]] = {"popular": _new_counters(), "other": _new_counters()}
+# Keys of the popular topics found by the last pool_topics() call
+_popular_keys: Set[str] = set()
+_refiller_task: Optional[asyncio.Task] = None
+
+
+def normalize_topic(topic: str) -> str:
+    return normalize_whitespace(topic).casefold()
+
+
+def _curriculum_keys() -> Set[str]:
+    return {normalize_topic(topic) for topic in settings.RSVP_POOL_TOPICS}
+
+
+def _counters(key: str) -> Dict[str, int]:
+    if key in _curriculum_keys():
+        return _stats[key]
+    return _aggregate_stats["popular" if key in _popular_keys else "other"]
+
+
+async def take_pooled_text(topic: str) -> Optional[str]:
+    """Atomically remove and return one pre-generated text for `topic`, or None if the pool is empty."""
+    if not settings.RSVP_POOL_ENABLED:
+        return None
+    key = normalize_topic(topic)
+    try:
+        document = await PooledTopicText.get_motor_collection().find_one_and_delete(
+            {"topic_key": key}, sort=[("created_at", 1)]
+        )
+    except Exception as e:
+        logger.warning(f"Topic pool lookup failed for '{topic}': {e}")
+        document = None
+
+    if document is None:
+        _counters(key)["misses"] += 1
+        return None
+    _counters(key)["hits"] += 1
+    return document["text"]
+
+
+async def pool_topics() -> List[str]:
+    """Configured curriculum topics plus the most requested topics of the recent window."""
+    global _popular_keys
+    topics = list(settings.RSVP_POOL_TOPICS)
+    popular = []
+    if settings.RSVP_POOL_POPULAR_TOPICS > 0:
+        since = datetime.utcnow() - timedelta(days=settings.RSVP_POOL_POPULAR_WINDOW_DAYS)
+        popular = await RsvpSession.aggregate([
+            {"$match": {"created_at": {"$gte": since}, "topic": {"$ne": CUSTOM_TEXT_TOPIC}}},
+            {"$group": {"_id": "$topic", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": settings.RSVP_POOL_POPULAR_TOPICS},
+        ]).to_list()
+        topics.extend(row["_id"] for row in popular)
+    _popular_keys = {normalize_topic(row["_id"]) for row in popular} - _curriculum_keys()
+
+    unique: Dict[str, str] = {}
+    for topic in topics:
+        unique.setdefault(normalize_topic(topic), topic)
+    return list(unique.values())
+
+
+async def refill_topic(topic: str) -> int:
+    """Top up one topic to RSVP_POOL_TARGET once it drops below RSVP_POOL_LOW_WATER."""
+    key = normalize_topic(topic)
+    depth = await PooledTopicText.find(PooledTopicText.topic_key == key).count()
+    if depth >= settings.RSVP_POOL_LOW_WATER:
+        return 0
+
+    generated = 0
+    for _ in range(settings.RSVP_POOL_TARGET - depth):
+        # Bypass the LLM cache: every pooled text must be a fresh, distinct generation
+        text = await generate_text(rsvp_text_prompt(topic), task="rsvp", use_cache=False)
+        if text and text.strip():
+            await PooledTopicText(topic_key=key, topic=topic, text=text.strip()).insert()
+            generated += 1
+            _counters(key)["generated"] += 1
+        # Re-count so texts added by other workers refilling the same topic are taken into account
+        if await PooledTopicText.find(PooledTopicText.topic_key == key).count() >= settings.RSVP_POOL_TARGET:
+            break
+    return generated
+
+
+async def refill_pool_once() -> int:
+    generated = 0
+    for topic in await pool_topics():
+        try:
+            generated += await refill_topic(topic)
+        except Exception as e:
+            logger.warning(f"Topic pool refill failed for '{topic}': {e}")
+    if generated:
+        logger.info(f"Topic pool refiller generated {generated} text(s)")
+    return generated
+
+
+async def _refill_loop() -> None:
+    while True:
+        try:
+            await refill_pool_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Topic pool refiller iteration failed: {e}")
+        await asyncio.sleep(settings.RSVP_POOL_REFILL_INTERVAL_SECONDS)
+
+
+def start_pool_refiller() -> None:
+    global _refiller_task
+    if settings.RSVP_POOL_ENABLED and _refiller_task is None:
+        _refiller_task = asyncio.create_task(_refill_loop())
+
+
+async def stop_pool_refiller() -> None:
+    global _refiller_task
+    if _refiller_task is not None:
+        _refiller_task.cancel()
+        try:
+            await _refiller_task
+        except asyncio.CancelledError:
+            pass
+        _refiller_task = None
+
+
+def _with_hit_rate(counters: Dict[str, int], depth: int) -> dict:
+    lookups = counters["hits"] + counters["misses"]
+    return {
+        "depth": depth,
+        **counters,
+        "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None,
+    }
+
+
+async def get_pool_stats() -> dict:
+    """Pool depth and hit rates per curriculum topic, with popular and other topics in aggregate."""
+    depth_rows = await PooledTopicText.aggregate([
+        {"$group": {"_id": "$topic_key", "depth": {"$sum": 1}}},
+    ]).to_list()
+    curriculum = _curriculum_keys()
+    depths = {row["_id"]: row["depth"] for row in depth_rows}
+    popular_depth = sum(depth for key, depth in depths.items() if key not in curriculum and key in _popular_keys)
+    other_depth = sum(depth for key, depth in depths.items() if key not in curriculum and key not in _popular_keys)
+
+    all_counters = list(_stats.values()) + list(_aggregate_stats.values())
+    hits = sum(c["hits"] for c in all_counters)
+    lookups = hits + sum(c["misses"] for c in all_counters)
+    return {
+        "enabled": settings.RSVP_POOL_ENABLED,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+        "topics": {key: _with_hit_rate(_stats.get(key, _new_counters()), depths.get(key, 0)) for key in curriculum},
+        "popular_topics": _with_hit_rate(_aggregate_stats["popular"], popular_depth),
+        "other_topics": _with_hit_rate(_aggregate_stats["other"], other_depth),
+    }
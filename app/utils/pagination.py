@@ -0,0 +1,29 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from bson import ObjectId
+
+
+def encode_cursor(created_at: datetime, doc_id: ObjectId) -> str:
+    """Opaque cursor for keyset pagination over (created_at desc, _id desc)."""
+    raw = f"{created_at.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError for cursors it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, doc_id = raw.split("|")
+        return datetime.fromisoformat(created_at), ObjectId(doc_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def after_cursor(created_at: datetime, doc_id: ObjectId, field: str = "created_at") -> dict:
+    """Filter for the documents that come after (created_at, doc_id) in descending order.
+
+    The _id tie-break keeps sessions created in the same millisecond from being skipped or repeated.
+    """
+    return {"$or": [{field: {"$lt": created_at}}, {field: created_at, "_id": {"$lt": doc_id}}]}
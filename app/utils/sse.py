@@ -0,0 +1,17 @@
+import json
+from typing import Any, Optional
+
+# Disable proxy buffering (nginx) so events reach the client as soon as they are written
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Serialize one Server-Sent Event with a JSON payload."""
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+    return message
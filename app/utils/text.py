@@ -0,0 +1,13 @@
+import hashlib
+import re
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of whitespace to a single space and strip the ends."""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def sha256_hex(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,80 @@
+"""Microbenchmark of the per-request auth dependency (get_current_active_user).
+
+Times --iterations calls with the same token under three configurations: no caches (JWT
+verification + pydantic validation + Mongo lookup every time), the user cache only, and the
+verified-token cache plus the user cache.
+
+    python -m benchmarks.auth_overhead                                   # mongomock
+    python -m benchmarks.auth_overhead --mongo-url mongodb://localhost:27017   # real round trips
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+CONFIGURATIONS = [
+    ("no caches", {"AUTH_TOKEN_CACHE_ENABLED": False, "AUTH_USER_CACHE_ENABLED": False}),
+    ("user cache", {"AUTH_TOKEN_CACHE_ENABLED": False, "AUTH_USER_CACHE_ENABLED": True}),
+    ("token + user cache", {"AUTH_TOKEN_CACHE_ENABLED": True, "AUTH_USER_CACHE_ENABLED": True}),
+]
+
+
+async def run(args) -> None:
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    from beanie import init_beanie
+
+    from app.core import token_cache, user_cache
+    from app.core.config import settings
+    from app.core.security import create_access_token, get_current_active_user
+    from app.db.connection import DOCUMENT_MODELS
+    from app.models.user import User
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    database = client[f"auth_benchmark_{uuid.uuid4().hex[:8]}"]
+    await init_beanie(database=database, document_models=DOCUMENT_MODELS)
+
+    user = User(email=f"bench_{uuid.uuid4().hex[:8]}@example.com", hashed_password="x")
+    await user.insert()
+    token = create_access_token({"sub": user.email, "uid": str(user.id)})
+
+    try:
+        for label, overrides in CONFIGURATIONS:
+            for name, value in overrides.items():
+                setattr(settings, name, value)
+            token_cache.clear_token_cache()
+            user_cache.clear_user_cache()
+            for _ in range(args.warmup):
+                await get_current_active_user(token)
+
+            timings = []
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                await get_current_active_user(token)
+                timings.append((time.perf_counter() - started) * 1e6)
+            timings.sort()
+            print(
+                f"{label:>20}: mean {statistics.mean(timings):8.1f}us  p50 {timings[len(timings) // 2]:8.1f}us  "
+                f"p99 {timings[int(len(timings) * 0.99) - 1]:8.1f}us"
+            )
+    finally:
+        if args.mongo_url:
+            await client.drop_database(database.name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--mongo-url", help="Use a real MongoDB instead of mongomock")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Login storm benchmark: latency of unrelated endpoints while many users sign in at once.
+
+Registers --users accounts, then runs --concurrency login loops for --seconds while a probe
+loop keeps calling --probe-path with an already issued token. Prints login throughput and the
+probe latency percentiles without and with the storm.
+
+    python -m benchmarks.login_storm                          # in-process app on mongomock
+    python -m benchmarks.login_storm --inline-bcrypt          # same, hashing on the event loop (old behaviour)
+    python -m benchmarks.login_storm --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import List
+
+import httpx
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def describe(latencies: List[float]) -> str:
+    if not latencies:
+        return "no samples"
+    ms = [v * 1000 for v in latencies]
+    return (
+        f"n={len(ms)} p50={percentile(ms, 50):.1f}ms p95={percentile(ms, 95):.1f}ms "
+        f"p99={percentile(ms, 99):.1f}ms max={max(ms):.1f}ms mean={statistics.mean(ms):.1f}ms"
+    )
+
+
+@asynccontextmanager
+async def in_process_client(inline_bcrypt: bool):
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("GEMINI_API_KEY", "unused-by-this-benchmark")
+    for name in ("GEMINI_PREWARM", "RSVP_POOL_ENABLED", "JOB_WORKER_ENABLED"):
+        os.environ.setdefault(name, "false")
+
+    from asgi_lifespan import LifespanManager
+    from beanie import init_beanie
+    from mongomock_motor import AsyncMongoMockClient
+
+    import app.main as main_module
+    from app.core import security
+    from app.db.connection import DOCUMENT_MODELS
+
+    async def fake_connect_to_mongo():
+        client = AsyncMongoMockClient()
+        await init_beanie(database=client["benchmark"], document_models=DOCUMENT_MODELS)
+        return client
+
+    main_module.connect_to_mongo = fake_connect_to_mongo
+    if inline_bcrypt:
+        async def run_inline(fn, *args):
+            return fn(*args)
+
+        security.run_password_task = run_inline
+
+    async with LifespanManager(main_module.app) as manager:
+        transport = httpx.ASGITransport(app=manager.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            yield client
+
+
+async def register_users(client: httpx.AsyncClient, count: int) -> List[str]:
+    emails = [f"storm_{uuid.uuid4().hex[:12]}@example.com" for _ in range(count)]
+    semaphore = asyncio.Semaphore(8)
+
+    async def register(email: str):
+        async with semaphore:
+            res = await client.post("/auth/register", json={"email": email, "password": PASSWORD, "full_name": "Storm"})
+            res.raise_for_status()
+
+    await asyncio.gather(*(register(email) for email in emails))
+    return emails
+
+
+async def login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post("/auth/login", json={"username": email, "password": PASSWORD})
+
+
+async def probe(client: httpx.AsyncClient, path: str, token: str, stop: asyncio.Event, interval: float) -> List[float]:
+    latencies = []
+    headers = {"Authorization": f"Bearer {token}"}
+    next_send = time.perf_counter()
+    while not stop.is_set():
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        res = await client.get(path, headers=headers)
+        # Measured from when the probe was due, so time the event loop was too busy to send it counts
+        latencies.append(time.perf_counter() - next_send)
+        res.raise_for_status()
+        next_send = time.perf_counter() + interval
+    return latencies
+
+
+async def storm(client: httpx.AsyncClient, emails: List[str], concurrency: int, stop: asyncio.Event) -> dict:
+    counts = {"ok": 0, "rejected": 0, "failed": 0}
+    started = time.perf_counter()
+
+    async def loop(worker: int):
+        i = worker
+        while not stop.is_set():
+            res = await login(client, emails[i % len(emails)])
+            key = "ok" if res.status_code == 200 else "rejected" if res.status_code == 503 else "failed"
+            counts[key] += 1
+            i += concurrency
+            # In-process requests without real I/O may never yield; let the timer and the probe run
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(loop(worker) for worker in range(concurrency)))
+    counts["elapsed"] = time.perf_counter() - started
+    return counts
+
+
+async def timed(seconds: float, stop: asyncio.Event):
+    await asyncio.sleep(seconds)
+    stop.set()
+
+
+async def run(args) -> None:
+    if args.base_url:
+        client_cm = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client_cm = in_process_client(args.inline_bcrypt)
+
+    async with client_cm as client:
+        emails = await register_users(client, args.users)
+        token = (await login(client, emails[0])).json()["access_token"]
+        if not args.base_url:
+            from app.core.config import settings
+
+            settings.METRICS_ADMIN_EMAILS.append(emails[0]) # /api/metrics is for operators only
+
+        stop = asyncio.Event()
+        baseline, _ = await asyncio.gather(probe(client, args.probe_path, token, stop, args.probe_interval), timed(args.seconds, stop))
+
+        stop = asyncio.Event()
+        during, counts, _ = await asyncio.gather(
+            probe(client, args.probe_path, token, stop, args.probe_interval),
+            storm(client, emails, args.concurrency, stop),
+            timed(args.seconds, stop),
+        )
+        response = await client.get("/api/metrics", headers={"Authorization": f"Bearer {token}"})
+        # Against a running server the benchmark user is usually not in METRICS_ADMIN_EMAILS
+        metrics = response.json() if response.status_code == 200 else {}
+
+    print(f"probe {args.probe_path} without storm: {describe(baseline)}")
+    print(f"probe {args.probe_path} during storm:  {describe(during)}")
+    print(
+        f"logins: {counts['ok'] / counts['elapsed']:.1f}/s ok over {counts['elapsed']:.1f}s, "
+        f"{counts['rejected']} rejected (503), {counts['failed']} failed with {args.concurrency} concurrent clients"
+    )
+    print(f"password pool: {metrics.get('password_pool')}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="Benchmark a running server instead of an in-process app")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent login loops")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each phase")
+    parser.add_argument("--probe-path", default="/auth/me")
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--inline-bcrypt", action="store_true", help="In-process only: hash on the event loop, as before the pool")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
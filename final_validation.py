@@ -111,8 +111,8 @@ def test_flow():
     print(f"User 2 session retrieval: {'✅ SUCCESS' if sessions2.status_code == 200 else '❌ FAILED'}")
     
     if sessions1.status_code == 200 and sessions2.status_code == 200:
-        sessions1_data = sessions1.json()
-        sessions2_data = sessions2.json()
+        sessions1_data = sessions1.json()["items"]
+        sessions2_data = sessions2.json()["items"]
         
         print(f"User 1 can see {len(sessions1_data)} session(s)")
         print(f"User 2 can see {len(sessions2_data)} session(s)")
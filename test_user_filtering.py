@@ -119,7 +119,7 @@ def main():
             print(f"      Response: {sessions1.text}")
         
         if sessions1.status_code == 200:
-            sessions1_data = sessions1.json()
+            sessions1_data = sessions1.json()["items"]
             print(f"   User 1 session count: {len(sessions1_data)}")
             for session in sessions1_data:
                 print(f"     - {session.get('topic', 'N/A')} (ID: {session.get('id', 'N/A')})")
@@ -131,7 +131,7 @@ def main():
             print(f"      Response: {sessions2.text}")
         
         if sessions2.status_code == 200:
-            sessions2_data = sessions2.json()
+            sessions2_data = sessions2.json()["items"]
             print(f"   User 2 session count: {len(sessions2_data)}")
             for session in sessions2_data:
                 print(f"     - {session.get('topic', 'N/A')} (ID: {session.get('id', 'N/A')})")
@@ -139,8 +139,8 @@ def main():
         # Verify isolation
         print("\n5. Verification Results:")
         if sessions1.status_code == 200 and sessions2.status_code == 200:
-            sessions1_data = sessions1.json()
-            sessions2_data = sessions2.json()
+            sessions1_data = sessions1.json()["items"]
+            sessions2_data = sessions2.json()["items"]
             
             # Check if sessions are properly isolated
             user1_topics = [s.get('topic') for s in sessions1_data]
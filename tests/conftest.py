@@ -4,6 +4,9 @@ import os
 os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/testdb")
 os.environ.setdefault("GEMINI_API_KEY", "test-api-key")
 os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("GEMINI_PREWARM", "false")
+os.environ.setdefault("RSVP_POOL_ENABLED", "false")
+os.environ.setdefault("JOB_WORKER_ENABLED", "false")
 
 import pytest
 import pytest_asyncio  # For async fixtures
@@ -14,9 +17,8 @@ import uuid  # For generating unique emails
 
 from mongomock_motor import AsyncMongoMockClient
 from beanie import init_beanie
-from app.models.rsvp_session import RsvpSession
-from app.models.user import User
-from app.models.quiz_attempt import QuizAttempt
+from app.db.connection import DOCUMENT_MODELS
+from app.services import llm_cache
 
 # Import your FastAPI app instance
 from app.main import app
@@ -27,7 +29,7 @@ async def fake_connect_to_mongo():
     client = AsyncMongoMockClient()
     await init_beanie(
         database=client["testdb"],
-        document_models=[RsvpSession, User, QuizAttempt],
+        document_models=DOCUMENT_MODELS,
     )
     return client
 
@@ -36,6 +38,11 @@ main_module.connect_to_mongo = fake_connect_to_mongo
 # Tests will run against the database configured by MONGO_URL.
 # For true isolation, a more complex setup would be needed.
 
+@pytest.fixture(autouse=True)
+def clear_llm_cache():
+    llm_cache.clear_memory_cache()
+    yield
+
 @pytest_asyncio.fixture(scope="session")
 async def test_app_instance():
     async with LifespanManager(app) as manager:
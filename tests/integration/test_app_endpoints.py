@@ -1,9 +1,11 @@
 import pytest
 from httpx import AsyncClient
+from app.core.config import settings
 from app.models.rsvp_session import RsvpSession
+from app.models.job import Job
 from app.schemas.quiz import QuizQuestion
 from app.schemas.rsvp import RsvpOutput
-from app.services import rsvp_service, quiz_service, gemini_service
+from app.services import rsvp_service, quiz_service, gemini_service, job_queue, assistant_cache, assistant_threads
 from app.api import rsvp_routes, assistant_routes, quiz_routes
 
 @pytest.fixture(autouse=True)
@@ -15,7 +17,7 @@ def mock_gemini(monkeypatch):
         await session.insert()
         return RsvpOutput(id=str(session.id), text=session.text, words=session.words)
 
-    async def fake_generate_quiz_questions_from_text(text_content: str, num_questions: int = 5, num_mc_options: int = 4):
+    async def fake_generate_quiz_questions_from_text(text_content: str, num_questions: int = 5, num_mc_options: int = 4, use_cache: bool = True):
         return [
             QuizQuestion(
                 id="q1",
@@ -33,24 +35,61 @@ def mock_gemini(monkeypatch):
     async def fake_assess_text_parameters(text_content: str) -> dict:
         return {"ideal_time_seconds": 10, "difficulty": "easy"}
 
-    async def fake_assistant_response(query: str, context: str) -> str:
+    async def fake_assistant_response(query: str, context: str, cached_content=None, history=None) -> str:
         return "Mock assistant response"
 
+    async def fake_stream_assistant_response(query: str, context: str, cached_content=None, history=None):
+        for fragment in ["Mock ", "assistant ", "response"]:
+            yield "delta", fragment
+
     monkeypatch.setattr(rsvp_service, "ask_gemini_for_rsvp", fake_ask_gemini_for_rsvp)
     monkeypatch.setattr(rsvp_routes, "ask_gemini_for_rsvp", fake_ask_gemini_for_rsvp)
 
     monkeypatch.setattr(quiz_service, "generate_quiz_questions_from_text", fake_generate_quiz_questions_from_text)
     monkeypatch.setattr(quiz_service, "evaluate_open_ended_answer_with_gemini", fake_evaluate_open_ended)
-    monkeypatch.setattr(quiz_routes, "assess_text_parameters", fake_assess_text_parameters)
     monkeypatch.setattr(gemini_service, "assess_text_parameters", fake_assess_text_parameters)
     monkeypatch.setattr(gemini_service, "get_contextual_assistant_response", fake_assistant_response)
     monkeypatch.setattr(assistant_routes, "get_contextual_assistant_response", fake_assistant_response)
+    monkeypatch.setattr(assistant_routes, "stream_contextual_assistant_response", fake_stream_assistant_response)
+    assistant_cache.clear_cache()
 
 
 def get_headers(token: dict) -> dict:
     return {"Authorization": token["Authorization"]}
 
 
+@pytest.mark.asyncio
+async def test_rsvp_list_pages_summaries(client: AsyncClient, authenticated_user_token: dict):
+    headers = get_headers(authenticated_user_token)
+    created = []
+    for topic in ["uno", "dos", "tres", "cuatro", "cinco"]:
+        created.append((await client.post("/api/rsvp", json={"topic": topic}, headers=headers)).json()["id"])
+    deleted_id = created.pop(2)
+    assert (await client.delete(f"/api/rsvp/{deleted_id}", headers=headers)).status_code == 200
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/rsvp", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    items = [item for page in pages for item in page]
+    assert [len(page) for page in pages] == [2, 2]
+    assert [item["id"] for item in items] == created[::-1]
+    assert items[0]["topic"] == "cinco" and items[0]["snippet"] == "Mock text"
+    assert "text" not in items[0] and "words" not in items[0]
+
+    response = await client.get("/api/rsvp", params={"fields": "topic"}, headers=headers)
+    assert set(response.json()["items"][0]) == {"id", "topic"}
+    assert (await client.get("/api/rsvp", params={"fields": "text"}, headers=headers)).status_code == 400
+    assert (await client.get("/api/rsvp", params={"cursor": "nonsense"}, headers=headers)).status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_rsvp_generation(client: AsyncClient, authenticated_user_token: dict):
     headers = get_headers(authenticated_user_token)
@@ -114,6 +153,122 @@ async def test_assistant_endpoint(client: AsyncClient, authenticated_user_token:
     assert assistant_resp.status_code == 200
     assert assistant_resp.json()["response"] == "Mock assistant response"
 
+    stream_resp = await client.post(
+        "/api/assistant/stream",
+        json={"query": "Summarize", "rsvp_session_id": session_id},
+        headers=headers,
+    )
+    assert stream_resp.status_code == 200
+    events = [line.split(": ", 1)[1] for line in stream_resp.text.splitlines() if line.startswith("event: ")]
+    assert events == ["delta", "delta", "delta", "done"]
+    assert '"response": "Mock assistant response"' in stream_resp.text
+
+
+@pytest.mark.asyncio
+async def test_assistant_answers_are_cached(client: AsyncClient, authenticated_user_token: dict, monkeypatch):
+    headers = get_headers(authenticated_user_token)
+    calls = []
+
+    async def counting_assistant_response(query: str, context: str, cached_content=None, history=None) -> str:
+        calls.append(query)
+        return "Cached answer"
+
+    monkeypatch.setattr(assistant_routes, "get_contextual_assistant_response", counting_assistant_response)
+    rsvp_resp = await client.post("/api/rsvp", json={"topic": "math"}, headers=headers)
+    session_id = rsvp_resp.json()["id"]
+
+    for query in ["¿Cuál es la idea principal?", "cual es la idea principal", "¿Y cuál es la idea principal?"]:
+        resp = await client.post("/api/assistant", json={"query": query, "rsvp_session_id": session_id}, headers=headers)
+        assert resp.json()["response"] == "Cached answer"
+    assert calls == ["¿Cuál es la idea principal?"]
+
+    stream_resp = await client.post(
+        "/api/assistant/stream",
+        json={"query": "¿CUÁL es la idea principal?", "rsvp_session_id": session_id},
+        headers=headers,
+    )
+    events = [line.split(": ", 1)[1] for line in stream_resp.text.splitlines() if line.startswith("event: ")]
+    assert events == ["delta", "done"]
+    assert '"response": "Cached answer"' in stream_resp.text
+
+    other = await client.post(
+        "/api/assistant", json={"query": "¿Quién escribió el texto?", "rsvp_session_id": session_id}, headers=headers
+    )
+    assert other.status_code == 200
+    assert len(calls) == 2
+
+    monkeypatch.setattr(settings, "METRICS_ADMIN_EMAILS", [authenticated_user_token["email"].lower()])
+    metrics = (await client.get("/api/metrics", headers=headers)).json()["assistant_cache"]
+    assert metrics["exact_hits"] == 2 and metrics["near_hits"] == 1 and metrics["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_for_operators_only(client: AsyncClient, authenticated_user_token: dict, monkeypatch):
+    headers = get_headers(authenticated_user_token)
+    monkeypatch.setattr(settings, "METRICS_ADMIN_EMAILS", [])
+    assert (await client.get("/api/metrics", headers=headers)).status_code == 403
+    assert (await client.get("/api/metrics")).status_code == 401
+
+    monkeypatch.setattr(settings, "METRICS_ADMIN_EMAILS", [authenticated_user_token["email"]])
+    response = await client.get("/api/metrics", headers=headers)
+    assert response.status_code == 200
+    assert "gemini_limiter" in response.json()
+
+
+@pytest.mark.asyncio
+async def test_assistant_thread_keeps_summarized_history(client: AsyncClient, authenticated_user_token: dict, monkeypatch):
+    headers = get_headers(authenticated_user_token)
+    histories = []
+
+    async def fake_assistant_response(query: str, context: str, cached_content=None, history=None) -> str:
+        histories.append(history)
+        return f"Answer to {query}"
+
+    async def fake_summarize(previous_summary, turns, max_words):
+        return " ".join(filter(None, [previous_summary] + [t["query"] for t in turns]))
+
+    monkeypatch.setattr(assistant_routes, "get_contextual_assistant_response", fake_assistant_response)
+    monkeypatch.setattr(assistant_threads, "summarize_conversation", fake_summarize)
+    monkeypatch.setattr(assistant_threads.settings, "ASSISTANT_THREAD_RECENT_TURNS", 2)
+    rsvp_resp = await client.post("/api/rsvp", json={"topic": "math"}, headers=headers)
+    session_id = rsvp_resp.json()["id"]
+
+    one_off = await client.post("/api/assistant", json={"query": "suelta", "rsvp_session_id": session_id}, headers=headers)
+    assert one_off.json()["thread_id"] is None
+
+    first = await client.post(
+        "/api/assistant", json={"query": "q0", "rsvp_session_id": session_id, "new_thread": True}, headers=headers
+    )
+    thread_id = first.json()["thread_id"]
+    for i in range(1, 5):
+        resp = await client.post(
+            "/api/assistant", json={"query": f"q{i}", "rsvp_session_id": session_id, "thread_id": thread_id}, headers=headers
+        )
+        assert resp.json()["thread_id"] == thread_id
+
+    histories = histories[1:]  # the one-off query
+    assert histories[0] is None
+    assert histories[1] == "User: q0\nAssistant: Answer to q0"
+    # After four turns the two oldest were rolled into the summary
+    assert histories[4] == "Summary of earlier turns: q0 q1\nUser: q2\nAssistant: Answer to q2\nUser: q3\nAssistant: Answer to q3"
+
+    thread = (await client.get(f"/api/assistant/threads/{thread_id}", headers=headers)).json()
+    assert thread["turn_count"] == 5
+    assert thread["summary"] == "q0 q1"
+    assert [t["seq"] for t in thread["turns"]] == [2, 3, 4]
+
+    listed = (await client.get(f"/api/assistant/threads?rsvp_session_id={session_id}", headers=headers)).json()
+    assert [t["id"] for t in listed] == [thread_id]
+
+    missing = await client.post(
+        "/api/assistant", json={"query": "q", "rsvp_session_id": session_id, "thread_id": "not-an-id"}, headers=headers
+    )
+    assert missing.status_code == 404
+
+    # Deleting the session removes its conversations
+    await client.delete(f"/api/rsvp/{session_id}", headers=headers)
+    assert (await client.get(f"/api/assistant/threads/{thread_id}", headers=headers)).status_code == 404
+
 
 @pytest.mark.asyncio
 async def test_delete_rsvp_session(client: AsyncClient, authenticated_user_token: dict):
@@ -133,3 +288,166 @@ async def test_delete_rsvp_session(client: AsyncClient, authenticated_user_token
 
     get_resp = await client.get(f"/api/rsvp/{session_id}", headers=headers)
     assert get_resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_text_analysis_endpoints(client: AsyncClient, authenticated_user_token: dict, monkeypatch):
+    async def fake_ask_gemini(prompt: str, task: str = "analysis") -> str:
+        if prompt.startswith("Resume"):
+            return "Resumen"
+        if prompt.startswith("Explica"):
+            return "Explicación"
+        if "preguntas" in prompt:
+            return "1. Pregunta\n2. Pregunta"
+        return "Término: significado"
+
+    monkeypatch.setattr(gemini_service, "ask_gemini", fake_ask_gemini)
+    headers = get_headers(authenticated_user_token)
+
+    response = await client.post("/api/analysis", json={"text": "Un texto"}, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["summary"] == "Resumen"
+    assert data["questions"] == ["1. Pregunta", "2. Pregunta"]
+    assert data["glossary"] == {"1": "Término: significado"}
+
+    stream_resp = await client.post("/api/analysis/stream", json={"text": "Un texto"}, headers=headers)
+    assert stream_resp.status_code == 200
+    assert stream_resp.headers["content-type"].startswith("text/event-stream")
+    events = [line.split(": ", 1)[1] for line in stream_resp.text.splitlines() if line.startswith("event: ")]
+    assert sorted(events[:-1]) == ["explanation", "glossary", "questions", "summary"]
+    assert events[-1] == "done"
+
+
+@pytest.mark.asyncio
+async def test_quiz_validation_stream(client: AsyncClient, authenticated_user_token: dict):
+    headers = get_headers(authenticated_user_token)
+    rsvp_resp = await client.post("/api/rsvp", json={"topic": "math"}, headers=headers)
+    session_id = rsvp_resp.json()["id"]
+    await client.post("/api/quiz", json={"rsvp_session_id": session_id}, headers=headers)
+
+    validate_payload = {
+        "rsvp_session_id": session_id,
+        "answers": [{"question_id": "q1", "user_answer": "4"}],
+    }
+    stream_resp = await client.post("/api/quiz/validate/stream", json=validate_payload, headers=headers)
+    assert stream_resp.status_code == 200
+    events = [line.split(": ", 1)[1] for line in stream_resp.text.splitlines() if line.startswith("event: ")]
+    assert events == ["feedback", "result"]
+    assert '"overall_score": 100.0' in stream_resp.text
+
+
+@pytest.mark.asyncio
+async def test_async_quiz_job(client: AsyncClient, authenticated_user_token: dict):
+    headers = get_headers(authenticated_user_token)
+    rsvp_resp = await client.post("/api/rsvp", json={"topic": "math"}, headers=headers)
+    session_id = rsvp_resp.json()["id"]
+
+    accepted = await client.post("/api/quiz?async=true", json={"rsvp_session_id": session_id}, headers=headers)
+    assert accepted.status_code == 202
+    job_id = accepted.json()["job_id"]
+    assert accepted.json()["status_url"] == f"/api/jobs/{job_id}"
+
+    # A second request while the job is pending joins it instead of queueing another one
+    again = await client.post("/api/quiz?async=true", json={"rsvp_session_id": session_id}, headers=headers)
+    assert again.json()["job_id"] == job_id
+
+    pending = await client.get(f"/api/jobs/{job_id}", headers=headers)
+    assert pending.json()["status"] == "queued"
+
+    assert await job_queue.process_next_job("test-worker") is True
+
+    done = await client.get(f"/api/jobs/{job_id}?wait=1", headers=headers)
+    assert done.status_code == 200
+    body = done.json()
+    assert body["status"] == "succeeded"
+    assert body["attempts"] == 1
+    assert body["result"]["rsvp_session_id"] == session_id
+    assert [q["id"] for q in body["result"]["questions"]] == ["q1"]
+
+    session = await RsvpSession.get(session_id)
+    assert session.ai_text_difficulty == "easy"
+
+
+@pytest.mark.asyncio
+async def test_async_regenerate_is_not_absorbed_by_pending_prebuild(client: AsyncClient, authenticated_user_token: dict):
+    headers = get_headers(authenticated_user_token)
+    me = await client.get("/auth/me", headers=headers)
+    session = await rsvp_service._create_session("math", "Texto para regenerar", ["Texto", "para", "regenerar"], me.json()["id"])
+    prebuild = await Job.find_one(Job.active_key == quiz_service.quiz_job_key(str(session.id)))
+    assert prebuild is not None and prebuild.status == "queued"
+
+    payload = {"rsvp_session_id": str(session.id), "regenerate": True}
+    accepted = await client.post("/api/quiz?async=true", json=payload, headers=headers)
+    assert accepted.status_code == 202
+    job_id = accepted.json()["job_id"]
+    assert job_id != str(prebuild.id)
+    assert (await Job.get(job_id)).payload["regenerate"] is True
+    # Repeated regenerate requests still share one job
+    again = await client.post("/api/quiz?async=true", json=payload, headers=headers)
+    assert again.json()["job_id"] == job_id
+
+    for job in (prebuild, await Job.get(job_id)):
+        assert (await job_queue.join_job(job, 1)).status == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_quiz_is_prebuilt_and_reused(client: AsyncClient, authenticated_user_token: dict, monkeypatch):
+    headers = get_headers(authenticated_user_token)
+    me = await client.get("/auth/me", headers=headers)
+    generated = []
+
+    async def counting_generate(text_content: str, num_questions: int = 5, num_mc_options: int = 4, use_cache: bool = True):
+        generated.append(text_content)
+        return [QuizQuestion(id="p1", question_text="¿Qué?", question_type="open_ended", correct_answer="Algo")]
+
+    monkeypatch.setattr(quiz_service, "generate_quiz_questions_from_text", counting_generate)
+
+    # Session creation queues the prebuild job (no job worker runs in tests)
+    session = await rsvp_service._create_session("math", "Texto de prueba", ["Texto", "de", "prueba"], me.json()["id"])
+    job = await Job.find_one(Job.active_key == quiz_service.quiz_job_key(str(session.id)))
+    assert job is not None and job.status == "queued"
+
+    # The quiz request joins the pending job, running it inline since no worker claimed it
+    quiz_resp = await client.post("/api/quiz", json={"rsvp_session_id": str(session.id)}, headers=headers)
+    assert quiz_resp.status_code == 201
+    assert [q["id"] for q in quiz_resp.json()["questions"]] == ["p1"]
+    assert (await Job.get(job.id)).status == "succeeded"
+
+    # Later requests reuse the stored questions
+    again = await client.post("/api/quiz", json={"rsvp_session_id": str(session.id)}, headers=headers)
+    assert [q["id"] for q in again.json()["questions"]] == ["p1"]
+    assert len(generated) == 1
+
+
+@pytest.mark.asyncio
+async def test_quiz_regenerate_rotates_variants(client: AsyncClient, authenticated_user_token: dict, monkeypatch):
+    headers = get_headers(authenticated_user_token)
+    me = await client.get("/auth/me", headers=headers)
+    calls = []
+
+    async def variant_generate(text_content: str, num_questions: int = 5, num_mc_options: int = 4, use_cache: bool = True):
+        calls.append(use_cache)
+        return [QuizQuestion(id=f"v{len(calls)}", question_text="¿Qué?", question_type="open_ended", correct_answer="Algo")]
+
+    monkeypatch.setattr(quiz_service, "generate_quiz_questions_from_text", variant_generate)
+    monkeypatch.setattr(quiz_service.settings, "QUIZ_VARIANT_POOL_SIZE", 2)
+    monkeypatch.setattr(quiz_service.settings, "QUIZ_PREBUILD_ENABLED", False)
+
+    async def quiz_ids(session_id: str, regenerate: bool = False):
+        resp = await client.post("/api/quiz", json={"rsvp_session_id": session_id, "regenerate": regenerate}, headers=headers)
+        assert resp.status_code == 201
+        return [q["id"] for q in resp.json()["questions"]]
+
+    first = await rsvp_service._create_session("math", "Texto con variantes", ["Texto"], me.json()["id"])
+    assert await quiz_ids(str(first.id)) == ["v1"]
+    assert await quiz_ids(str(first.id)) == ["v1"]
+    assert await quiz_ids(str(first.id), regenerate=True) == ["v2"]
+    # Pool is full: retakes rotate between stored variants without calling Gemini
+    assert await quiz_ids(str(first.id), regenerate=True) == ["v1"]
+    assert await quiz_ids(str(first.id), regenerate=True) == ["v2"]
+
+    # Another session with the same text reuses a stored variant
+    second = await rsvp_service._create_session("math", "Texto  con variantes", ["Texto"], me.json()["id"])
+    assert await quiz_ids(str(second.id)) in (["v1"], ["v2"])
+    assert calls == [True, False]
@@ -35,3 +35,17 @@ async def test_get_me(client: AsyncClient, authenticated_user_token: dict):
     assert response.status_code == 200, response.text
     response_data = response.json()
     assert response_data["email"] == authenticated_user_token["email"]
+
+@pytest.mark.asyncio
+async def test_logout_revokes_the_token(client: AsyncClient, authenticated_user_token: dict):
+    headers = {"Authorization": authenticated_user_token["Authorization"]}
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+
+    response = await client.post("/auth/logout", headers=headers)
+    assert response.status_code == 204, response.text
+    assert (await client.get("/auth/me", headers=headers)).status_code == 401
+    assert (await client.post("/auth/logout", headers=headers)).status_code == 401
+
+    login_data = {"username": authenticated_user_token["email"], "password": "testpassword123"}
+    new_token = (await client.post("/auth/login", json=login_data)).json()["access_token"]
+    assert (await client.get("/auth/me", headers={"Authorization": f"Bearer {new_token}"})).status_code == 200
@@ -0,0 +1,96 @@
+"""Explain plans of the hot per-user queries.
+
+mongomock has no query planner, so the explain tests need a real server: set TEST_MONGO_URL
+(e.g. mongodb://localhost:27017) to run them. They use and then drop a scratch database.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db.migrate import ensure_indexes
+from app.models.quiz_attempt import QuizAttempt
+from app.models.rsvp_session import RsvpSession
+from app.services.session_list import SESSION_LIST_SORT, SUMMARY_FIELDS, session_list_query
+from app.utils.pagination import encode_cursor
+
+TEST_MONGO_URL = os.getenv("TEST_MONGO_URL")
+
+
+def plan_stages(plan: dict) -> list:
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+async def winning_stages(cursor) -> list:
+    explain = await cursor.explain()
+    return plan_stages(explain["queryPlanner"]["winningPlan"])
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_declared_indexes():
+    database = AsyncMongoMockClient()["indexestest"]
+    indexes = await ensure_indexes(database)
+    assert "user_deleted_created_at_id" in indexes["rsvp_sessions"]
+    assert "user_rsvp_session" in indexes["quiz_attempts"]
+    assert await ensure_indexes(database) == indexes  # idempotent
+
+
+@pytest_asyncio.fixture
+async def real_database():
+    if not TEST_MONGO_URL:
+        pytest.skip("TEST_MONGO_URL is not set; explain plans need a real MongoDB")
+    client = AsyncIOMotorClient(TEST_MONGO_URL, serverSelectionTimeoutMS=2000)
+    database = client[f"ria_plans_{uuid.uuid4().hex[:8]}"]
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        client.close()
+        pytest.skip(f"MongoDB at TEST_MONGO_URL is unreachable: {e}")
+    await ensure_indexes(database)
+    now = datetime.utcnow()
+    for user in ("a", "b"):
+        for i in range(50):
+            await RsvpSession(
+                topic="t", text="x", words=["x"], user_id=user, deleted=i % 5 == 0,
+                created_at=now - timedelta(minutes=i),
+            ).insert()
+            await QuizAttempt(rsvp_session_id=str(i), user_id=user, results=[], overall_score=1.0).insert()
+    yield database
+    await client.drop_database(database.name)
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_session_queries_use_index_without_sorting(real_database):
+    collection = RsvpSession.get_motor_collection()
+    first = await collection.find_one({"user_id": "a"}, sort=SESSION_LIST_SORT)
+    pages = [session_list_query("a", cursor, SUMMARY_FIELDS) for cursor in (None, encode_cursor(first["created_at"], first["_id"]))]
+    cursors = [collection.find(query, projection).sort(SESSION_LIST_SORT).limit(21) for query, projection in pages]
+    # StatsService.get_user_stats
+    cursors.append(
+        RsvpSession.find(RsvpSession.user_id == "a", RsvpSession.deleted == False).sort(-RsvpSession.created_at).motor_cursor
+    )
+    for cursor in cursors:
+        stages = await winning_stages(cursor)
+        assert "IXSCAN" in stages and "COLLSCAN" not in stages
+        assert "SORT" not in stages
+
+
+@pytest.mark.asyncio
+async def test_quiz_attempt_lookups_use_index(real_database):
+    for query in (
+        QuizAttempt.find(QuizAttempt.user_id == "a"),
+        QuizAttempt.find(QuizAttempt.user_id == "a", QuizAttempt.rsvp_session_id == "3"),
+    ):
+        stages = await winning_stages(query.motor_cursor)
+        assert "IXSCAN" in stages and "COLLSCAN" not in stages
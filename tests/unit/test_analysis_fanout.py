@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from app.services import gemini_service
+
+
+@pytest.mark.asyncio
+async def test_analysis_prompts_are_bounded_across_requests(monkeypatch):
+    in_flight = peak = 0
+
+    async def fake_ask_gemini(prompt, *args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return "uno\ndos"
+
+    monkeypatch.setattr(gemini_service, "ask_gemini", fake_ask_gemini)
+    monkeypatch.setattr(gemini_service, "_analysis_semaphore", asyncio.Semaphore(3))
+
+    results = await asyncio.gather(*(gemini_service.generate_results_from_text("Texto") for _ in range(3)))
+    assert all(r.questions == ["uno", "dos"] for r in results)
+    assert peak == 3
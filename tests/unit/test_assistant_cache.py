@@ -0,0 +1,51 @@
+import pytest
+
+from app.services import assistant_cache
+from app.services.assistant_cache import get_cached_answer, normalize_query, store_answer
+
+TEXT = "La fotosíntesis convierte la luz solar en energía química."
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    assistant_cache.clear_cache()
+    yield
+    assistant_cache.clear_cache()
+
+
+def test_normalize_query():
+    assert normalize_query("  ¿Cuál es la IDEA principal?! ") == "cual es la idea principal"
+
+
+def test_exact_and_near_duplicate_hits():
+    store_answer(TEXT, "¿Cuál es la idea principal?", "La fotosíntesis.")
+    assert get_cached_answer(TEXT, "cual es la idea principal") == "La fotosíntesis."
+    assert get_cached_answer(TEXT, "¿Y cuál es la idea principal?") == "La fotosíntesis."
+    assert get_cached_answer(TEXT, "¿Qué produce la planta?") is None
+    # Answers are scoped to the text they were given for
+    assert get_cached_answer(TEXT + " Fin.", "¿Cuál es la idea principal?") is None
+
+    stats = assistant_cache.get_cache_stats()
+    assert (stats["exact_hits"], stats["near_hits"], stats["misses"]) == (1, 1, 2)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_near_duplicates_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(assistant_cache.settings, "ASSISTANT_CACHE_NEAR_DUPLICATES", False)
+    store_answer(TEXT, "¿Cuál es la idea principal?", "La fotosíntesis.")
+    assert get_cached_answer(TEXT, "¿Y cuál es la idea principal?") is None
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    monkeypatch.setattr(assistant_cache.settings, "ASSISTANT_CACHE_ENABLED", False)
+    store_answer(TEXT, "¿Cuál es la idea principal?", "La fotosíntesis.")
+    monkeypatch.setattr(assistant_cache.settings, "ASSISTANT_CACHE_ENABLED", True)
+    assert get_cached_answer(TEXT, "¿Cuál es la idea principal?") is None
+
+
+def test_negated_query_is_not_a_near_duplicate():
+    store_answer(TEXT, "¿Qué produce la fotosíntesis en las plantas?", "Oxígeno y glucosa.")
+    store_answer(TEXT, "¿Cuál es la idea principal del texto?", "La fotosíntesis.")
+    assert get_cached_answer(TEXT, "¿Qué no produce la fotosíntesis en las plantas?") is None
+    assert get_cached_answer(TEXT, "¿Cuál no es la idea principal del texto?") is None
+    assert assistant_cache.get_cache_stats()["near_hits"] == 0
@@ -0,0 +1,59 @@
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+from beanie import init_beanie
+
+from app.db.connection import DOCUMENT_MODELS
+from app.models.assistant_thread import AssistantThread
+from app.schemas.assistant import AssistantTurn
+from app.services import assistant_threads
+
+
+@pytest_asyncio.fixture
+async def threads_db():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["threadstest"], document_models=DOCUMENT_MODELS)
+    yield
+
+
+@pytest.mark.asyncio
+async def test_history_stays_within_token_budget(threads_db, monkeypatch):
+    monkeypatch.setattr(assistant_threads.settings, "ASSISTANT_HISTORY_TOKEN_BUDGET", 100)
+    turns = [AssistantTurn(seq=i, query=f"pregunta {i}", response="respuesta " * 10) for i in range(10)]
+    thread = AssistantThread(user_id="u", rsvp_session_id="s", summary="resumen " * 200, turns=turns)
+
+    history = assistant_threads.history_for_prompt(thread)
+    assert assistant_threads.estimate_tokens(history) <= 100
+    assert history.startswith("Summary of earlier turns: resumen")
+    # The newest turns are the ones kept, oldest first
+    assert history.endswith("User: pregunta 9\nAssistant: " + "respuesta " * 10)
+    assert "pregunta 0" not in history
+
+
+@pytest.mark.asyncio
+async def test_summarize_keeps_turns_appended_meanwhile(threads_db, monkeypatch):
+    monkeypatch.setattr(assistant_threads.settings, "ASSISTANT_THREAD_RECENT_TURNS", 1)
+    thread = AssistantThread(user_id="u", rsvp_session_id="s")
+    await thread.insert()
+    for i in range(3):
+        thread = await assistant_threads.append_turn(thread, f"q{i}", f"a{i}")
+
+    async def summarize_while_user_asks(previous_summary, turns, max_words):
+        await assistant_threads.append_turn(thread, "q3", "a3")
+        return "resumen"
+
+    monkeypatch.setattr(assistant_threads, "summarize_conversation", summarize_while_user_asks)
+    assert await assistant_threads.summarize_thread(thread.id) is True
+
+    stored = await AssistantThread.get(thread.id)
+    assert stored.summary == "resumen" and stored.summarized_turns == 2
+    assert [t.query for t in stored.turns] == ["q2", "q3"]
+    assert stored.turn_count == 4
+
+
+@pytest.mark.asyncio
+async def test_delete_session_threads(threads_db):
+    for session_id in ["s", "s", "other"]:
+        await AssistantThread(user_id="u", rsvp_session_id=session_id).insert()
+    assert await assistant_threads.delete_session_threads("s") == 2
+    assert [t.rsvp_session_id for t in await AssistantThread.find_all().to_list()] == ["other"]
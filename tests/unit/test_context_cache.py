@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services import context_cache, gemini_service
+from app.services.context_cache import MockContextCacheBackend, get_cached_context
+
+SENTENCE = "La fotosíntesis convierte la luz solar en energía química. "
+# About 4,700 estimated tokens: above the default model's 4,096-token minimum plus margin
+LONG_TEXT = SENTENCE * 320
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(context_cache.settings, "GEMINI_CONTEXT_CACHE_ENABLED", True)
+    # The shipped defaults, whatever the local environment sets
+    monkeypatch.setattr(context_cache.settings, "GEMINI_MODEL", "gemini-2.0-flash")
+    monkeypatch.setattr(context_cache.settings, "GEMINI_CONTEXT_CACHE_MIN_TOKENS", 0)
+    monkeypatch.setattr(context_cache.settings, "GEMINI_CONTEXT_CACHE_MAX_TOKENS", 32000)
+    monkeypatch.setattr(context_cache.settings, "ASSISTANT_CONTEXT_TOKEN_BUDGET", 2000)
+    monkeypatch.setattr(context_cache.settings, "GEMINI_CONTEXT_CACHE_TTL_SECONDS", 600)
+    mock = MockContextCacheBackend()
+    context_cache.set_backend(mock)
+    for name in context_cache._stats:
+        context_cache._stats[name] = 0
+    yield mock
+    context_cache.set_backend(context_cache.GeminiContextCacheBackend())
+
+
+@pytest.mark.asyncio
+async def test_handle_is_created_once_and_reused(backend):
+    assert await get_cached_context("Texto corto.") is None
+
+    first, second = await asyncio.gather(get_cached_context(LONG_TEXT), get_cached_context(LONG_TEXT))
+    assert first == second == "cachedContents/mock-1"
+    assert await get_cached_context(LONG_TEXT) == first
+    assert backend.contents[first] == LONG_TEXT
+    assert backend.calls["create"] == 1
+
+    stats = context_cache.get_context_cache_stats()
+    assert stats["created"] == 1 and stats["reused"] == 1 and stats["tokens_saved"] > 0
+
+
+@pytest.mark.asyncio
+async def test_only_texts_the_model_accepts_are_offered(backend):
+    # A typical generated RSVP text (~500 words) and one just over the 2,000-token context budget
+    # are both below gemini-2.0-flash's minimum: no create call that Gemini would refuse
+    assert await get_cached_context(SENTENCE * 45) is None
+    assert await get_cached_context(SENTENCE * 150) is None
+    assert await get_cached_context(SENTENCE * 2500) is None  # over GEMINI_CONTEXT_CACHE_MAX_TOKENS
+    assert backend.calls["create"] == 0
+    assert await get_cached_context(LONG_TEXT) == "cachedContents/mock-1"
+
+
+def test_minimum_depends_on_the_model(monkeypatch):
+    monkeypatch.setattr(context_cache.settings, "GEMINI_CONTEXT_CACHE_MIN_TOKENS", 0)
+    assert context_cache.min_cache_tokens("gemini-2.5-flash-lite") == 1126
+    assert context_cache.min_cache_tokens("gemini-2.0-flash") == 4505
+    assert context_cache.min_cache_tokens("some-future-model") == 4505
+    monkeypatch.setattr(context_cache.settings, "GEMINI_CONTEXT_CACHE_MIN_TOKENS", 2048)
+    assert context_cache.min_cache_tokens("gemini-2.0-flash") == 2048
+
+
+@pytest.mark.asyncio
+async def test_activity_extends_the_handle_ttl(backend):
+    name = await get_cached_context(LONG_TEXT)
+    handle = next(iter(context_cache._handles.values()))
+    handle.expires_at = time.monotonic() + 60  # less than half the TTL left
+
+    assert await get_cached_context(LONG_TEXT) == name
+    assert backend.calls["refresh"] == 1
+    assert handle.expires_at > time.monotonic() + 500
+
+
+@pytest.mark.asyncio
+async def test_lru_cap_deletes_evicted_handles(backend, monkeypatch):
+    monkeypatch.setattr(context_cache.settings, "GEMINI_CONTEXT_CACHE_MAX_HANDLES", 2)
+    names = [await get_cached_context(f"{i} {LONG_TEXT}") for i in range(3)]
+
+    await asyncio.sleep(0)
+    assert backend.calls["delete"] == 1
+    assert names[0] not in backend.contents
+    assert context_cache.get_context_cache_stats()["handles"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_creation_falls_back_to_inline(backend):
+    async def refuse(context_text, ttl_seconds):
+        raise ValueError("model does not support caching")
+
+    backend.create = refuse
+    assert await get_cached_context(LONG_TEXT) is None
+    # Not retried while backing off
+    backend.create = MockContextCacheBackend().create
+    assert await get_cached_context(LONG_TEXT) is None
+
+
+@pytest.mark.asyncio
+async def test_assistant_uses_handle_and_recovers_from_stale_one(backend, monkeypatch):
+    payloads = []
+
+    async def fake_generate_content(payload, task="default", model=None, use_cache=True):
+        payloads.append(payload)
+        if "cachedContent" in payload and payload["cachedContent"] not in backend.contents:
+            request = httpx.Request("POST", "https://gemini.test")
+            raise httpx.HTTPStatusError("not found", request=request, response=httpx.Response(404, request=request))
+        return {"candidates": [{"content": {"parts": [{"text": "Respuesta"}]}}]}
+
+    monkeypatch.setattr(gemini_service, "generate_content", fake_generate_content)
+    name = await get_cached_context(LONG_TEXT)
+    selections = []
+
+    async def select_chunks():
+        selections.append(1)
+        return "Fragmento seleccionado."
+
+    assert await gemini_service.get_contextual_assistant_response("¿Qué convierte?", select_chunks, cached_content=name) == "Respuesta"
+    assert payloads[-1]["cachedContent"] == name
+    assert SENTENCE not in payloads[-1]["contents"][0]["parts"][0]["text"]
+    assert selections == []  # no chunk selection while the handle works
+
+    await backend.delete(name)  # expired on Gemini's side
+    assert await gemini_service.get_contextual_assistant_response("¿Qué convierte?", select_chunks, cached_content=name) == "Respuesta"
+    assert "cachedContent" not in payloads[-1]
+    assert "Fragmento seleccionado." in payloads[-1]["contents"][0]["parts"][0]["text"]
+    assert context_cache.get_context_cache_stats()["invalidated"] == 1
@@ -0,0 +1,74 @@
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+from beanie import init_beanie
+
+from app.db.connection import DOCUMENT_MODELS
+from app.models.rsvp_session import RsvpSession
+from app.services import context_index
+from app.services.context_index import ContextIndex, chunk_offsets, build_assistant_context
+
+PARAGRAPHS = [
+    "La fotosíntesis es el proceso por el cual las plantas convierten la luz solar en energía química.",
+    "Los volcanes se forman cuando el magma asciende desde el manto hasta la superficie terrestre.",
+    "Las mitocondrias producen la energía de la célula mediante la respiración celular.",
+    "El río Amazonas es el más caudaloso del mundo y atraviesa varios países de Sudamérica.",
+]
+TEXT = "\n\n".join(PARAGRAPHS)
+
+
+def test_chunks_follow_paragraphs():
+    offsets = chunk_offsets(TEXT)
+    assert [TEXT[start:end] for start, end in offsets] == PARAGRAPHS
+
+
+def test_long_paragraph_is_split_at_sentences():
+    paragraph = " ".join(PARAGRAPHS)
+    offsets = chunk_offsets(paragraph, max_chars=200)
+    chunks = [paragraph[start:end] for start, end in offsets]
+    assert len(chunks) == 2
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[0].startswith("La fotosíntesis") and chunks[1].startswith("Las mitocondrias")
+
+
+def test_bm25_ranks_matching_chunk_first():
+    index = ContextIndex(TEXT, chunk_offsets(TEXT))
+    scores = index.scores("¿Cómo se forman los volcanes?")
+    assert scores.index(max(scores)) == 1
+    assert index.select("¿Qué producen las mitocondrias?", token_budget=30, top_k=3) == [2]
+
+
+def test_select_without_matches_uses_opening_chunks():
+    index = ContextIndex(TEXT, chunk_offsets(TEXT))
+    assert index.select("resume", token_budget=50, top_k=3) == [0, 1]
+
+
+@pytest_asyncio.fixture
+async def index_db(monkeypatch):
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["contextindextest"], document_models=DOCUMENT_MODELS)
+    context_index._index_cache.clear()
+    yield
+    context_index._index_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_short_text_is_sent_whole(index_db):
+    session = await RsvpSession(topic="t", text=TEXT, words=TEXT.split(), user_id="u").insert()
+    assert await build_assistant_context(session, "volcanes") == TEXT
+    assert (await RsvpSession.get(session.id)).context_chunks is None
+
+
+@pytest.mark.asyncio
+async def test_long_text_sends_top_chunks_and_persists_offsets(index_db, monkeypatch):
+    monkeypatch.setattr(context_index.settings, "ASSISTANT_CONTEXT_TOKEN_BUDGET", 60)
+    session = await RsvpSession(topic="t", text=TEXT, words=TEXT.split(), user_id="u").insert()
+
+    context = await build_assistant_context(session, "¿Qué atraviesa el río Amazonas? ¿Y la fotosíntesis?")
+    assert context == f"{PARAGRAPHS[0]}\n[...]\n{PARAGRAPHS[3]}"
+
+    stored = await RsvpSession.get(session.id)
+    assert stored.context_chunks == chunk_offsets(TEXT)
+    # Later queries reuse the cached index
+    await build_assistant_context(stored, "volcanes")
+    assert context_index.get_index_cache_stats()["hits"] == 1
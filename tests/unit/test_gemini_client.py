@@ -0,0 +1,45 @@
+import pytest
+import httpx
+from app.services import gemini_client
+
+
+@pytest.mark.asyncio
+async def test_generate_text_reuses_shared_client_with_task_timeout(monkeypatch):
+    seen = []
+
+    async def mock_post(self, url, headers=None, json=None, timeout=None, **kwargs):
+        seen.append((id(self), timeout))
+        request = httpx.Request('POST', url)
+        return httpx.Response(
+            status_code=200,
+            json={"candidates": [{"content": {"parts": [{"text": "hola"}]}}]},
+            request=request,
+        )
+    monkeypatch.setattr(httpx.AsyncClient, 'post', mock_post)
+
+    assert await gemini_client.generate_text("prompt", task="rsvp") == "hola"
+    assert await gemini_client.generate_text("prompt", task="assistant") == "hola"
+
+    assert seen[0][0] == seen[1][0]
+    assert seen[0][1].read == gemini_client.TASK_TIMEOUTS["rsvp"]
+    assert seen[1][1].read == gemini_client.TASK_TIMEOUTS["assistant"]
+    await gemini_client.close_gemini_client()
+
+
+@pytest.mark.asyncio
+async def test_stream_generate_content_parses_sse_chunks(monkeypatch):
+    def handler(request):
+        assert "streamGenerateContent" in request.url.path
+        assert request.url.params["alt"] == "sse"
+        body = (
+            'data: {"candidates": [{"content": {"parts": [{"text": "Hola "}]}}]}\r\n\r\n'
+            'data: {"candidates": [{"content": {"parts": [{"text": "mundo"}]}}]}\r\n\r\n'
+            'data: {"candidates": [{"finishReason": "STOP"}]}\r\n\r\n'
+        )
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+    monkeypatch.setattr(gemini_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    payload = gemini_client.build_payload("prompt")
+    fragments = [f async for f in gemini_client.stream_generate_content(payload, task="rsvp")]
+    assert fragments == ["Hola ", "mundo"]
+    await gemini_client.close_gemini_client()
@@ -0,0 +1,55 @@
+import pytest
+import httpx
+from app.services import gemini_client
+from app.services.gemini_limiter import AdaptiveConcurrencyLimiter, RetryBudget, parse_retry_after
+
+
+def test_parse_retry_after_accepts_seconds_and_dates():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_retry_budget_limits_attempts_and_total_delay():
+    budget = RetryBudget(max_attempts=3, max_total_delay=5, base_delay=0.5, max_delay=8)
+    assert budget.next_delay(retry_after=2) == 2
+    assert budget.next_delay(retry_after=4) is None  # would exceed the remaining 3s
+    assert budget.next_delay(retry_after=1) == 1
+    assert budget.next_delay(retry_after=0) is None  # max attempts reached
+
+
+def test_aimd_halves_on_overload_and_grows_back():
+    limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=8, decrease_factor=0.5)
+    limiter.on_overload()
+    assert limiter.limit == 4
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.limit <= 5
+
+
+@pytest.mark.asyncio
+async def test_generate_content_retries_429_honoring_retry_after(monkeypatch):
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0"}, json={"error": "quota"}),
+        httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}),
+    ]
+    sleeps = []
+
+    async def mock_post(self, url, headers=None, json=None, **kwargs):
+        res = responses.pop(0)
+        res.request = httpx.Request('POST', url)
+        return res
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(httpx.AsyncClient, 'post', mock_post)
+    monkeypatch.setattr(gemini_client.asyncio, 'sleep', fake_sleep)
+    overloads_before = gemini_client.limiter.overloads
+
+    data = await gemini_client.generate_content(gemini_client.build_payload("hola"), task="assistant")
+    assert gemini_client.extract_text(data) == "ok"
+    assert sleeps == [0.0]
+    assert gemini_client.limiter.overloads == overloads_before + 1
+    await gemini_client.close_gemini_client()
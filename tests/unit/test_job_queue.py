@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+from beanie import init_beanie
+
+from app.db.connection import DOCUMENT_MODELS
+from app.models.job import Job
+from app.services import job_queue
+
+
+@pytest_asyncio.fixture
+async def jobs_db(monkeypatch):
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["jobstest"], document_models=DOCUMENT_MODELS)
+    monkeypatch.setattr(job_queue.settings, "JOB_MAX_ATTEMPTS", 2)
+    yield
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_with_backoff_then_fails(jobs_db, monkeypatch):
+    calls = []
+
+    @job_queue.job_handler("test_flaky")
+    async def flaky(job):
+        calls.append(job.attempts)
+        raise RuntimeError("upstream down")
+
+    job = await job_queue.enqueue_job("test_flaky", {}, dedupe_key="flaky:1")
+    assert await job_queue.process_next_job("w1") is True
+
+    job = await Job.get(job.id)
+    assert job.status == "queued"
+    assert job.error == "upstream down"
+    assert job.run_after > datetime.utcnow()
+    # Not due yet
+    assert await job_queue.process_next_job("w1") is False
+
+    await Job.get_motor_collection().update_one({"_id": job.id}, {"$set": {"run_after": datetime.utcnow()}})
+    assert await job_queue.process_next_job("w1") is True
+
+    job = await Job.get(job.id)
+    assert calls == [1, 2]
+    assert job.status == "failed"
+    assert job.active_key is None
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed_by_another_worker(jobs_db):
+    @job_queue.job_handler("test_ok")
+    async def ok(job):
+        return {"value": job.payload["value"]}
+
+    job = await job_queue.enqueue_job("test_ok", {"value": 7})
+    claimed = await job_queue.claim_job("dead-worker")
+    assert claimed.id == job.id
+    # The first worker died without heartbeating
+    await Job.get_motor_collection().update_one(
+        {"_id": job.id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+    assert await job_queue.process_next_job("w2") is True
+    job = await Job.get(job.id)
+    assert job.status == "succeeded"
+    assert job.worker_id == "w2"
+    assert job.attempts == 2
+    assert job.result == {"value": 7}
+
+
+@pytest.mark.asyncio
+async def test_permanent_error_is_not_retried(jobs_db):
+    @job_queue.job_handler("test_gone")
+    async def gone(job):
+        raise job_queue.PermanentJobError("session deleted")
+
+    job = await job_queue.enqueue_job("test_gone", {})
+    await job_queue.process_next_job("w1")
+    job = await Job.get(job.id)
+    assert job.status == "failed"
+    assert job.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_join_does_not_wait_for_a_job_in_retry_backoff(jobs_db):
+    @job_queue.job_handler("test_down")
+    async def down(job):
+        raise RuntimeError("upstream down")
+
+    job = await job_queue.enqueue_job("test_down", {}, dedupe_key="down:1")
+    started = datetime.utcnow()
+    # The inline attempt fails and puts the job into backoff; join returns instead of waiting
+    joined = await job_queue.join_job(job, timeout=30)
+    assert joined.status == "queued" and joined.attempts == 1
+    # Joined again while still in backoff: no claim, no wait
+    joined = await job_queue.join_job(joined, timeout=30)
+    assert joined.attempts == 1
+    assert datetime.utcnow() - started < timedelta(seconds=5)
@@ -0,0 +1,49 @@
+import pytest
+import httpx
+from app.services import gemini_client, llm_cache
+from app.utils.lru import TTLLRUCache
+
+
+def test_cache_key_ignores_whitespace_but_not_task():
+    payload_a = {"contents": [{"parts": [{"text": "Tema:   fotosíntesis\n"}]}]}
+    payload_b = {"contents": [{"parts": [{"text": "Tema: fotosíntesis"}]}]}
+    assert llm_cache.make_cache_key("m", "rsvp", payload_a) == llm_cache.make_cache_key("m", "rsvp", payload_b)
+    assert llm_cache.make_cache_key("m", "rsvp", payload_a) != llm_cache.make_cache_key("m", "analysis", payload_a)
+
+
+def test_ttl_lru_cache_evicts_least_recently_used():
+    cache = TTLLRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_is_served_from_cache(monkeypatch):
+    calls = []
+
+    async def mock_post(self, url, headers=None, json=None, **kwargs):
+        calls.append(json)
+        request = httpx.Request('POST', url)
+        return httpx.Response(
+            status_code=200,
+            json={"candidates": [{"content": {"parts": [{"text": "texto cacheado"}]}}]},
+            request=request,
+        )
+    monkeypatch.setattr(httpx.AsyncClient, 'post', mock_post)
+    monkeypatch.setattr(llm_cache.settings, "LLM_CACHE_PERSISTENT", False)
+
+    first = await gemini_client.generate_text("Tema único de caché", task="rsvp")
+    second = await gemini_client.generate_text("Tema  único de caché", task="rsvp")
+    assert first == second == "texto cacheado"
+    assert len(calls) == 1
+    assert llm_cache.get_cache_stats()["tasks"]["rsvp"]["memory_hits"] >= 1
+
+    # Tasks without a cache policy always go upstream
+    await gemini_client.generate_text("Pregunta", task="assistant")
+    await gemini_client.generate_text("Pregunta", task="assistant")
+    assert len(calls) == 3
+    await gemini_client.close_gemini_client()
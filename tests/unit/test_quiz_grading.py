@@ -0,0 +1,113 @@
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.db.connection import DOCUMENT_MODELS
+from app.models.rsvp_session import RsvpSession
+from app.models.user import User
+from app.schemas.quiz import QuizAnswerInput, QuizQuestion, QuizQuestionFeedback
+from app.services import quiz_service
+
+
+ITEMS = [
+    {"question_id": "q1", "question_text": "¿Qué?", "correct_answer": "Esto", "user_answer": "Esto"},
+    {"question_id": "q2", "question_text": "¿Por qué?", "correct_answer": "Porque", "user_answer": "No sé"},
+]
+
+
+@pytest.fixture
+def llm_only(monkeypatch):
+    # These answers are clear-cut enough for the local grader; exercise the Gemini paths
+    monkeypatch.setattr(quiz_service.settings, "QUIZ_LOCAL_GRADING", False)
+
+
+@pytest.mark.asyncio
+async def test_grade_open_ended_answers_uses_single_batch_call(monkeypatch, llm_only):
+    calls = []
+
+    async def fake_generate_text(prompt, task="default", generation_config=None, use_cache=True):
+        calls.append(generation_config)
+        return '[{"question_id": "q1", "evaluation": "correct", "feedback": "Bien"},' \
+               ' {"question_id": "q2", "evaluation": "incorrect", "feedback": "Mal"}]'
+
+    async def fail_single(*args, **kwargs):
+        raise AssertionError("per-question evaluation should not be needed")
+
+    monkeypatch.setattr(quiz_service, "generate_text", fake_generate_text)
+    monkeypatch.setattr(quiz_service, "evaluate_open_ended_answer_with_gemini", fail_single)
+
+    evaluations = await quiz_service.grade_open_ended_answers(ITEMS)
+    assert len(calls) == 1
+    assert calls[0]["responseMimeType"] == "application/json"
+    assert evaluations["q1"]["evaluation"] == "correct"
+    assert evaluations["q2"]["feedback"] == "Mal"
+
+
+@pytest.mark.asyncio
+async def test_grade_open_ended_answers_falls_back_to_concurrent_calls(monkeypatch, llm_only):
+    async def broken_generate_text(*args, **kwargs):
+        return "not json"
+
+    async def fake_single(question_text, correct_answer_criteria, user_answer):
+        return {"evaluation": "partially_correct", "feedback": question_text}
+
+    monkeypatch.setattr(quiz_service, "generate_text", broken_generate_text)
+    monkeypatch.setattr(quiz_service, "evaluate_open_ended_answer_with_gemini", fake_single)
+
+    evaluations = await quiz_service.grade_open_ended_answers(ITEMS)
+    assert evaluations == {
+        "q1": {"evaluation": "partially_correct", "feedback": "¿Qué?"},
+        "q2": {"evaluation": "partially_correct", "feedback": "¿Por qué?"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_local_grader_settles_clear_cases_before_gemini(monkeypatch):
+    sent = []
+
+    async def fake_single(question_text, correct_answer_criteria, user_answer):
+        sent.append(user_answer)
+        return {"evaluation": "partially_correct", "feedback": "Gemini"}
+
+    monkeypatch.setattr(quiz_service, "evaluate_open_ended_answer_with_gemini", fake_single)
+    text = "Las plantas producen oxígeno y glucosa. El proceso ocurre en los cloroplastos gracias a la luz."
+    question = "¿Qué producen las plantas?"
+    items = [
+        {"question_id": "exact", "question_text": question, "correct_answer": "Oxígeno y glucosa", "user_answer": "oxigeno y GLUCOSA"},
+        {"question_id": "empty", "question_text": question, "correct_answer": "Oxígeno y glucosa", "user_answer": "  no sé "},
+        {"question_id": "offtopic", "question_text": question, "correct_answer": "Oxígeno y glucosa", "user_answer": "Los perros ladran"},
+        {"question_id": "partial", "question_text": question, "correct_answer": "Oxígeno y glucosa", "user_answer": "Oxígeno"},
+    ]
+
+    evaluations = await quiz_service.grade_open_ended_answers(items, reference_text=text)
+    assert evaluations["exact"]["evaluation"] == "correct"
+    assert evaluations["empty"]["evaluation"] == "incorrect"
+    assert evaluations["offtopic"]["evaluation"] == "incorrect"
+    assert evaluations["partial"]["feedback"] == "Gemini"
+    assert sent == ["Oxígeno"]
+
+
+@pytest.mark.asyncio
+async def test_stream_grades_every_answer_to_a_repeated_question_in_one_batch(monkeypatch, llm_only):
+    await init_beanie(database=AsyncMongoMockClient()["quizstreamtest"], document_models=DOCUMENT_MODELS)
+    question = QuizQuestion(id="q1", question_text="¿Qué?", question_type="open_ended", correct_answer="Esto")
+    session = RsvpSession(topic="t", text="Esto", words=["Esto"], quiz_questions=[question])
+    await session.insert()
+    batches = []
+
+    async def fake_batch(items):
+        batches.append([item["question_id"] for item in items])
+        return {item["question_id"]: {"evaluation": "correct", "feedback": item["user_answer"]} for item in items}
+
+    async def fail_single(*args, **kwargs):
+        raise AssertionError("per-question evaluation should not be needed")
+
+    monkeypatch.setattr(quiz_service, "evaluate_open_ended_answers_batch", fake_batch)
+    monkeypatch.setattr(quiz_service, "evaluate_open_ended_answer_with_gemini", fail_single)
+
+    answers = [QuizAnswerInput(question_id="q1", user_answer="uno"), QuizAnswerInput(question_id="q1", user_answer="dos")]
+    results = [r async for r in quiz_service.iter_quiz_validation(session, answers, User(email="a@example.com", hashed_password="x"))]
+    feedback = [r for r in results if isinstance(r, QuizQuestionFeedback)]
+    assert sorted(f.feedback for f in feedback) == ["dos", "uno"]
+    assert len(batches) == 1 and len(batches[0]) == 2
+    assert len(results[-1].results) == 2
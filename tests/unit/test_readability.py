@@ -0,0 +1,49 @@
+import pytest
+
+from app.services import readability, gemini_service
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("murciélago", 4), # diphthong "ie" with written accent on the strong vowel
+    ("país", 2),       # hiatus: accented í breaks the diphthong
+    ("ciudad", 2),
+    ("leer", 2),       # two strong vowels never share a syllable
+    ("hoy", 1),
+    ("guerra", 2),
+    ("y", 1),
+])
+def test_count_syllables(word, expected):
+    assert readability.count_syllables(word) == expected
+
+
+def test_analyze_text_simple_and_dense_texts():
+    simple = "El sol sale. La luz llega. El día es bueno. Los niños juegan en el parque."
+    dense = (
+        "La caracterización epistemológica de las investigaciones contemporáneas sobre neurociencia "
+        "computacional evidencia complejidades metodológicas significativamente interdisciplinarias, "
+        "particularmente cuando consideramos representaciones probabilísticas jerárquicamente organizadas."
+    )
+    easy = readability.analyze_text(simple)
+    hard = readability.analyze_text(dense)
+
+    assert easy["difficulty"] == "easy"
+    assert hard["difficulty"] == "hard"
+    assert easy["szigriszt_pazos"] > hard["szigriszt_pazos"]
+    assert easy["fernandez_huerta"] > hard["fernandez_huerta"]
+    # 15 words at the easy band's 240 wpm
+    assert easy["ideal_time_seconds"] == round(15 / readability.WPM_BANDS["easy"] * 60)
+
+
+def test_analyze_text_without_words():
+    assert readability.analyze_text("  ... ")["difficulty"] == "unknown"
+
+
+@pytest.mark.asyncio
+async def test_assess_text_parameters_is_local_by_default(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("Gemini should not be called")
+
+    monkeypatch.setattr(gemini_service, "generate_text", fail)
+    result = await gemini_service.assess_text_parameters("Hola mundo. Esto es un texto corto.")
+    assert result["difficulty"] in ("easy", "medium", "hard")
+    assert result["ideal_time_seconds"] >= 1
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core import revocation
+from app.db.connection import DOCUMENT_MODELS
+from app.models.revoked_token import RevokedToken
+from app.utils.bloom import BloomFilter
+
+
+@pytest_asyncio.fixture
+async def revocations():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["revocationtest"], document_models=DOCUMENT_MODELS)
+    await revocation.reload_revocations()
+    for name in revocation._stats:
+        revocation._stats[name] = 0
+    yield revocation
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    # An item whose bits were all set already (a false positive) is not counted
+    assert 990 <= bloom.count <= 1000
+    count = bloom.count
+    assert bloom.add("jti-0") is False
+    assert bloom.count == count
+
+
+@pytest.mark.asyncio
+async def test_unrevoked_tokens_never_reach_the_database(revocations):
+    assert await revocations.is_revoked("never-revoked") is False
+    stats = revocations.get_revocation_stats()
+    assert stats["bloom_negatives"] == 1 and stats["db_checks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_revocation_is_immediate_locally(revocations):
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    await revocations.revoke_token("local-jti", expires_at, user_id="u1")
+    await revocations.revoke_token("local-jti", expires_at, user_id="u1")  # repeated logout
+    assert await revocations.is_revoked("local-jti") is True
+    assert await RevokedToken.find(RevokedToken.jti == "local-jti").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_revocations_from_other_workers_arrive_on_refresh(revocations):
+    # Another worker's logout: only the shared collection knows about it
+    await RevokedToken(jti="remote-jti", expires_at=datetime.utcnow() + timedelta(hours=1)).insert()
+    assert await revocations.is_revoked("remote-jti") is False
+
+    assert await revocations.refresh_revocations() == 1
+    assert await revocations.is_revoked("remote-jti") is True
+
+    # Later passes re-read the overlap window without counting the jti again
+    for _ in range(3):
+        assert await revocations.refresh_revocations() == 0
+    assert revocations.get_revocation_stats()["filter_entries"] == 1
+    assert revocations._synced_until > datetime.utcnow() - timedelta(seconds=5)
+
+
+@pytest.mark.asyncio
+async def test_reload_drops_expired_revocations(revocations):
+    await RevokedToken(jti="expired-jti", expires_at=datetime.utcnow() - timedelta(minutes=1)).insert()
+    await RevokedToken(jti="live-jti", expires_at=datetime.utcnow() + timedelta(hours=1)).insert()
+    await revocations.reload_revocations()
+    assert "live-jti" in revocations._filter
+    assert revocations.get_revocation_stats()["filter_entries"] == 1
@@ -1,20 +1,37 @@
 import pytest
+import pytest_asyncio
+import json
 import httpx
-from app.services import rsvp_service
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+from app.db.connection import DOCUMENT_MODELS
+from app.models.job import Job
+from app.models.rsvp_session import RsvpSession
+from app.schemas.quiz import QuizQuestion
+from app.services import rsvp_service, quiz_service, gemini_service
+from app.services.job_queue import PermanentJobError
+from app.services.readability import analyze_text
 
 class DummySession:
-    def __init__(self, topic, text, words, user_id=None):
+    def __init__(self, topic, text, words, user_id=None, **fields):
         self.topic = topic
         self.text = text
         self.words = words
         self.user_id = user_id
         self.id = 'dummy'
+        self.fields = fields
     async def insert(self):
         pass
 
+@pytest.fixture(autouse=True)
+def no_quiz_prebuild(monkeypatch):
+    async def noop(session):
+        pass
+    monkeypatch.setattr(rsvp_service, 'prebuild_quiz', noop)
+
 @pytest.mark.asyncio
 async def test_ask_gemini_for_rsvp_http_error(monkeypatch):
-    async def mock_post(self, url, headers=None, json=None):
+    async def mock_post(self, url, headers=None, json=None, **kwargs):
         request = httpx.Request('POST', url)
         return httpx.Response(status_code=500, request=request)
     monkeypatch.setattr(httpx.AsyncClient, 'post', mock_post)
@@ -25,7 +42,7 @@ async def test_ask_gemini_for_rsvp_http_error(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_ask_gemini_for_rsvp_network_error(monkeypatch):
-    async def mock_post(self, url, headers=None, json=None):
+    async def mock_post(self, url, headers=None, json=None, **kwargs):
         request = httpx.Request('POST', url)
         raise httpx.RequestError('boom', request=request)
     monkeypatch.setattr(httpx.AsyncClient, 'post', mock_post)
@@ -36,7 +53,7 @@ async def test_ask_gemini_for_rsvp_network_error(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_ask_gemini_for_rsvp_malformed_response(monkeypatch):
-    async def mock_post(self, url, headers=None, json=None):
+    async def mock_post(self, url, headers=None, json=None, **kwargs):
         request = httpx.Request('POST', url)
         return httpx.Response(status_code=200, json={'invalid': 'data'}, request=request)
     monkeypatch.setattr(httpx.AsyncClient, 'post', mock_post)
@@ -44,3 +61,117 @@ async def test_ask_gemini_for_rsvp_malformed_response(monkeypatch):
     with pytest.raises(Exception) as exc:
         await rsvp_service.ask_gemini_for_rsvp('topic', 'test_user_id')
     assert 'Malformed response from AI service' in str(exc.value)
+
+@pytest.mark.asyncio
+async def test_stream_rsvp_generation_emits_words_before_session(monkeypatch):
+    async def fake_stream_text(prompt, task="default", use_cache=True):
+        for fragment in ["Hola mun", "do, esto es", " un texto\n"]:
+            yield fragment
+
+    class StreamDummySession(DummySession):
+        def update_word_count(self):
+            self.word_count = len(self.words)
+
+    monkeypatch.setattr(rsvp_service, 'stream_text', fake_stream_text)
+    monkeypatch.setattr(rsvp_service, 'RsvpSession', StreamDummySession)
+
+    events = [event async for event in rsvp_service.stream_rsvp_generation('topic', 'test_user_id')]
+    streamed_words = [w for name, data in events if name == 'words' for w in data['words']]
+    assert streamed_words == ['Hola', 'mundo,', 'esto', 'es', 'un', 'texto']
+    assert events[0] == ('words', {'words': ['Hola']})
+    assert events[-1] == ('session', {'id': 'dummy', 'word_count': 6})
+
+@pytest.mark.asyncio
+async def test_generate_rsvp_session_bundle_fills_session_in_one_call(monkeypatch):
+    calls = []
+    bundle = {
+        "text": "Un texto breve sobre el agua.",
+        "questions": [
+            {"question_text": "¿De qué trata?", "question_type": "open_ended", "correct_answer": "Del agua"},
+            {"question_text": "Pregunta incompleta"},
+        ],
+        "assessment": {"ideal_time_seconds": 42, "difficulty": "Easy"},
+    }
+
+    async def fake_generate_content(payload, task="default", **kwargs):
+        calls.append((payload, task))
+        return {"candidates": [{"content": {"parts": [{"text": json.dumps(bundle)}]}}]}
+
+    class BundleDummySession(DummySession):
+        def __init__(self, topic, text, words, user_id=None, **fields):
+            super().__init__(topic, text, words, user_id, **fields)
+            created.append(self)
+        def update_word_count(self):
+            self.word_count = len(self.words)
+
+    created = []
+    monkeypatch.setattr(rsvp_service, 'generate_content', fake_generate_content)
+    monkeypatch.setattr(rsvp_service, 'RsvpSession', BundleDummySession)
+
+    output = await rsvp_service.generate_rsvp_session_bundle('agua', 'test_user_id')
+
+    assert len(calls) == 1
+    payload, task = calls[0]
+    assert task == "rsvp_bundle"
+    assert payload["generationConfig"]["responseMimeType"] == "application/json"
+    assert output.words == ["Un", "texto", "breve", "sobre", "el", "agua."]
+    fields = created[0].fields
+    assert [q.question_text for q in fields["quiz_questions"]] == ["¿De qué trata?"]
+    assert fields["quiz_questions"][0].id
+    assert fields["ai_estimated_ideal_reading_time_seconds"] == 42
+    assert fields["ai_text_difficulty"] == "easy"
+
+@pytest_asyncio.fixture
+async def sessions_db():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["rsvpservicetest"], document_models=DOCUMENT_MODELS)
+    yield
+
+@pytest.mark.asyncio
+async def test_llm_assessment_is_stored_for_new_sessions(sessions_db, monkeypatch):
+    gemini_replies = ['{"ideal_time_seconds": 77, "difficulty": "hard"}', "no es JSON"]
+
+    async def fake_generate_text(prompt, task="default", **kwargs):
+        assert task == "assessment"
+        return gemini_replies.pop(0)
+
+    async def fake_quiz_questions(text_content, num_questions=5, num_mc_options=4, use_cache=True):
+        return [QuizQuestion(id="q1", question_text="¿De qué trata?", question_type="open_ended", correct_answer="Del sol")]
+
+    monkeypatch.setattr(rsvp_service.settings, "ASSESSMENT_USE_LLM", True)
+    monkeypatch.setattr(gemini_service, "generate_text", fake_generate_text)
+    monkeypatch.setattr(quiz_service, "generate_quiz_questions_from_text", fake_quiz_questions)
+
+    stored = []
+    for text in ["El sol sale. La luz llega. El día es bueno.", "Los niños juegan en el parque. Hace calor."]:
+        output = await rsvp_service.ask_gemini_for_rsvp(rsvp_service.RAW_TOPIC_PREFIX + text, "test_user_id")
+        # Left for the quiz prebuild, which asks Gemini
+        assert (await RsvpSession.get(output.id)).ai_estimated_ideal_reading_time_seconds is None
+        stored.append(await quiz_service.create_or_update_quiz_for_session(output.id, text))
+
+    assert (stored[0].ai_estimated_ideal_reading_time_seconds, stored[0].ai_text_difficulty) == (77, "hard")
+    # Gemini's reply could not be parsed: the local assessment is stored instead
+    local = analyze_text(stored[1].text)
+    assert stored[1].ai_estimated_ideal_reading_time_seconds == local["ideal_time_seconds"]
+    assert stored[1].ai_text_difficulty == local["difficulty"]
+
+@pytest.mark.asyncio
+async def test_quiz_job_does_not_revive_a_session_deleted_meanwhile(sessions_db, monkeypatch):
+    session = RsvpSession(topic="sol", text="El sol sale. La luz llega.", words=["El"], user_id="test_user_id")
+    await session.insert()
+
+    async def quiz_while_user_deletes(text_content, num_questions=5, num_mc_options=4, use_cache=True):
+        # While Gemini works: the assistant indexes the text, then the user deletes the session
+        await session.set({RsvpSession.context_chunks: [[0, 12], [13, 26]]})
+        await session.set({RsvpSession.deleted: True})
+        return [QuizQuestion(id="q1", question_text="¿De qué trata?", question_type="open_ended", correct_answer="Del sol")]
+
+    monkeypatch.setattr(quiz_service, "generate_quiz_questions_from_text", quiz_while_user_deletes)
+    job = Job(kind="quiz", payload={"rsvp_session_id": str(session.id)})
+    with pytest.raises(PermanentJobError):
+        await quiz_service.run_quiz_job(job)
+
+    stored = await RsvpSession.get(session.id)
+    assert stored.deleted is True
+    assert stored.quiz_questions is None
+    assert stored.context_chunks == [[0, 12], [13, 26]]
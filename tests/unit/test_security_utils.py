@@ -7,3 +7,37 @@ def test_password_hashing():
     assert hashed_password != password
     assert verify_password(password, hashed_password)
     assert not verify_password("wrongpassword", hashed_password)
+
+@pytest.mark.asyncio
+async def test_async_password_helpers_run_on_pool():
+    from app.core.password_pool import get_password_pool_stats
+    from app.core.security import get_password_hash_async, verify_password_async
+
+    before = get_password_pool_stats()["completed"]
+    hashed_password = await get_password_hash_async("mypassword")
+    assert await verify_password_async("mypassword", hashed_password)
+    assert not await verify_password_async("wrongpassword", hashed_password)
+    assert get_password_pool_stats()["completed"] == before + 3
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_beyond_queue_limit(monkeypatch):
+    import asyncio
+    import threading
+    from fastapi import HTTPException
+    from app.core import password_pool
+
+    monkeypatch.setattr(password_pool.settings, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(password_pool.settings, "PASSWORD_HASH_MAX_QUEUE", 1)
+    password_pool.shutdown_password_pool()  # recreated with one worker on first use
+    release = threading.Event()
+    running = [asyncio.create_task(password_pool.run_password_task(release.wait, 5)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    assert password_pool.get_password_pool_stats()["queue_depth"] == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        await password_pool.run_password_task(release.wait, 5)
+    assert exc_info.value.status_code == 503
+
+    release.set()
+    assert await asyncio.gather(*running) == [True, True]
+    password_pool.shutdown_password_pool()
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from beanie import init_beanie
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.db.connection import DOCUMENT_MODELS
+from app.models.rsvp_session import RsvpSession
+from app.services.session_list import list_session_summaries, parse_fields
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+@pytest_asyncio.fixture
+async def sessions():
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["sessionlisttest"], document_models=DOCUMENT_MODELS)
+    same_moment = datetime(2026, 1, 1, 12, 0, 0)
+    created = []
+    for i in range(5):
+        session = RsvpSession(topic=f"t{i}", text="x", words=[f"w{n}" for n in range(20)], user_id="u1", created_at=same_moment)
+        await session.insert()
+        created.append(str(session.id))
+    await RsvpSession(topic="other", text="x", words=["x"], user_id="u2", created_at=same_moment).insert()
+    return created
+
+
+def test_cursor_round_trip():
+    moment, doc_id = datetime(2026, 3, 4, 5, 6, 7, 890000), ObjectId()
+    assert decode_cursor(encode_cursor(moment, doc_id)) == (moment, doc_id)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_parse_fields():
+    assert parse_fields(None) == ("topic", "snippet", "word_count", "quiz_score", "created_at")
+    assert parse_fields("topic, topic,quiz_score") == ("topic", "quiz_score")
+    with pytest.raises(ValueError):
+        parse_fields("topic,text")
+
+
+@pytest.mark.asyncio
+async def test_pages_do_not_skip_or_repeat_sessions_created_together(sessions):
+    seen, cursor = [], None
+    while True:
+        items, cursor = await list_session_summaries("u1", 2, cursor)
+        seen += [item.id for item in items]
+        if cursor is None:
+            break
+    assert seen == sessions[::-1]
+    assert items[0].snippet == " ".join(f"w{n}" for n in range(12)) + "..."
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.core import security, token_cache
+from app.core.security import create_access_token, decode_access_token
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    token_cache.clear_token_cache()
+    yield
+    token_cache.clear_token_cache()
+
+
+@pytest.fixture
+def jwt_decodes(monkeypatch):
+    calls = []
+    original_decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return original_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    return calls
+
+
+def test_verified_token_is_decoded_once(jwt_decodes):
+    token = create_access_token({"sub": "lector@example.com", "uid": "abc"})
+    first = decode_access_token(token)
+    second = decode_access_token(token)
+    assert (first.email, first.user_id) == (second.email, second.user_id) == ("lector@example.com", "abc")
+    assert first is not second
+    assert len(jwt_decodes) == 1
+
+
+def test_cached_token_expires_with_its_exp(jwt_decodes):
+    token = create_access_token({"sub": "lector@example.com"}, expires_delta=timedelta(seconds=2))
+    decode_access_token(token)
+    expires_at, _ = token_cache._verified._data[token_cache.token_digest(token)]
+    assert expires_at - time.monotonic() <= 2
+
+
+def test_invalid_tokens_are_not_cached(jwt_decodes):
+    token = create_access_token({"sub": "lector@example.com"})
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    assert decode_access_token(tampered) is None
+    assert decode_access_token(tampered) is None
+    assert len(jwt_decodes) == 2
+
+    assert decode_access_token(create_access_token({"sub": "not-an-email"})) is None
+    assert token_cache.get_token_cache_stats()["size"] == 0
@@ -0,0 +1,59 @@
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+from beanie import init_beanie
+
+from app.db.connection import DOCUMENT_MODELS
+from app.models.pooled_topic_text import PooledTopicText
+from app.models.rsvp_session import RsvpSession
+from app.services import topic_pool
+
+
+@pytest_asyncio.fixture
+async def pool_db(monkeypatch):
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["pooltest"], document_models=DOCUMENT_MODELS)
+    monkeypatch.setattr(topic_pool.settings, "RSVP_POOL_ENABLED", True)
+    monkeypatch.setattr(topic_pool.settings, "RSVP_POOL_TOPICS", ["Fotosíntesis"])
+    monkeypatch.setattr(topic_pool.settings, "RSVP_POOL_LOW_WATER", 2)
+    monkeypatch.setattr(topic_pool.settings, "RSVP_POOL_TARGET", 3)
+    yield
+
+
+@pytest.mark.asyncio
+async def test_refill_then_take_from_pool(pool_db, monkeypatch):
+    generated = []
+
+    async def fake_generate_text(prompt, task="default", generation_config=None, use_cache=True):
+        assert use_cache is False
+        generated.append(prompt)
+        return f"Texto {len(generated)}"
+
+    monkeypatch.setattr(topic_pool, "generate_text", fake_generate_text)
+    await RsvpSession(topic="Historia", text="t", words=["t"], user_id="u").insert()
+
+    assert await topic_pool.refill_pool_once() == 6  # configured topic + popular topic
+    assert await PooledTopicText.find(PooledTopicText.topic_key == "fotosíntesis").count() == 3
+
+    # Above the low-water mark nothing is generated
+    assert await topic_pool.refill_pool_once() == 0
+
+    assert await topic_pool.take_pooled_text("  fotosíntesis ") == "Texto 1"
+    assert await topic_pool.take_pooled_text("historia") == "Texto 4"
+    stats = await topic_pool.get_pool_stats()
+    assert stats["topics"]["fotosíntesis"]["depth"] == 2
+    assert stats["topics"]["fotosíntesis"]["hits"] >= 1
+    # Popular topics are users' own words: reported only in aggregate
+    assert set(stats["topics"]) == {"fotosíntesis"}
+    assert stats["popular_topics"]["depth"] == 2 and stats["popular_topics"]["hits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_take_from_empty_pool_counts_a_miss(pool_db):
+    before = (await topic_pool.get_pool_stats())["other_topics"]["misses"]
+    assert await topic_pool.take_pooled_text("Tema vacío") is None
+    assert await topic_pool.take_pooled_text("Mi tema privado") is None
+    stats = await topic_pool.get_pool_stats()
+    assert stats["other_topics"]["misses"] == before + 2
+    assert "tema vacío" not in stats["topics"] and "tema vacío" not in topic_pool._stats
+    assert set(stats["topics"]) == {"fotosíntesis"}
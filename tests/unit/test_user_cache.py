@@ -0,0 +1,70 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+from beanie import init_beanie
+
+from app.core import user_cache
+from app.core.security import create_access_token, get_current_active_user
+from app.db.connection import DOCUMENT_MODELS
+from app.models.user import User
+
+
+@pytest_asyncio.fixture
+async def user(monkeypatch):
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["usercachetest"], document_models=DOCUMENT_MODELS)
+    user_cache.clear_user_cache()
+    user = User(email="lector@example.com", hashed_password="x")
+    await user.insert()
+    yield user
+    user_cache.clear_user_cache()
+
+
+def count_lookups(monkeypatch):
+    lookups = []
+    original_get = User.get.__func__
+
+    async def counting_get(cls, document_id, *args, **kwargs):
+        lookups.append(document_id)
+        return await original_get(cls, document_id, *args, **kwargs)
+
+    monkeypatch.setattr(User, "get", classmethod(counting_get))
+    return lookups
+
+
+@pytest.mark.asyncio
+async def test_user_is_loaded_once_per_worker(user, monkeypatch):
+    lookups = count_lookups(monkeypatch)
+    token = create_access_token({"sub": user.email, "uid": str(user.id)})
+
+    first = await get_current_active_user(token)
+    second = await get_current_active_user(token)
+    assert first.id == second.id == user.id
+    assert first is not second
+    assert lookups == [str(user.id)]
+
+
+@pytest.mark.asyncio
+async def test_saving_the_user_invalidates_the_cache(user, monkeypatch):
+    token = create_access_token({"sub": user.email, "uid": str(user.id)})
+    await get_current_active_user(token)
+
+    user.is_active = False
+    await user.save()
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_active_user(token)
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_tokens_without_uid_still_work(user, monkeypatch):
+    lookups = count_lookups(monkeypatch)
+    assert (await get_current_active_user(create_access_token({"sub": user.email}))).id == user.id
+    assert lookups == []
+
+    # A uid whose user now has another email is rejected
+    token = create_access_token({"sub": "otro@example.com", "uid": str(user.id)})
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_active_user(token)
+    assert exc_info.value.status_code == 401